@@ -1,33 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 from app.models.schemas import Activity, ActivityCreate
-from app.core.database import get_supabase
+from app.core.cache import dashboard_cache
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.etag import etag_matches, make_etag, not_modified, table_watermark, validator_headers
+from app.core.responses import trusted_response
+from app.api.fields import field_selection, select_columns
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Activity])
-async def get_activities():
-    """Get all active activities"""
-    supabase = get_supabase()
-    response = supabase.table("activities").select("*").eq("is_active", True).order("created_at").execute()
-    return response.data
+async def get_activities(
+    request: Request,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selection(Activity.model_fields)),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """Get all active activities (`fields=` limits the returned columns, If-None-Match gives 304)"""
+    count, latest = await table_watermark(supabase.table("activities").select("updated_at", count="exact"))
+    headers = validator_headers(make_etag("activities", count, latest, fields), latest)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    response = await supabase.table("activities").select(select_columns(Activity, fields)).eq("is_active", True).order("created_at").execute()
+    return trusted_response(Activity, response.data, fields, headers)
 
 @router.post("/", response_model=Activity)
-async def create_activity(activity: ActivityCreate):
+async def create_activity(activity: ActivityCreate, supabase: InstrumentedClient = Depends(get_supabase)):
     """Create a new activity"""
-    supabase = get_supabase()
-    response = supabase.table("activities").insert(activity.model_dump()).execute()
+    response = await supabase.table("activities").insert(activity.model_dump()).execute()
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to create activity")
     
+    dashboard_cache.invalidate_all()
     return response.data[0]
 
 @router.get("/{activity_id}", response_model=Activity)
-async def get_activity(activity_id: str):
+async def get_activity(activity_id: str, supabase: InstrumentedClient = Depends(get_supabase)):
     """Get a specific activity"""
-    supabase = get_supabase()
-    response = supabase.table("activities").select("*").eq("id", activity_id).execute()
+    response = await supabase.table("activities").select("*").eq("id", activity_id).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Activity not found")
@@ -35,12 +47,15 @@ async def get_activity(activity_id: str):
     return response.data[0]
 
 @router.delete("/{activity_id}")
-async def delete_activity(activity_id: str):
-    """Soft delete an activity (set is_active to False)"""
-    supabase = get_supabase()
-    response = supabase.table("activities").update({"is_active": False}).eq("id", activity_id).execute()
+async def delete_activity(activity_id: str, supabase: InstrumentedClient = Depends(get_supabase)):
+    """Soft delete an activity (is_active False, deactivated_at now; /api/sync sends it as a tombstone)"""
+    response = await supabase.table("activities").update({
+        "is_active": False,
+        "deactivated_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("id", activity_id).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Activity not found")
     
+    dashboard_cache.invalidate_all()
     return {"message": "Activity deleted successfully"}
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date, datetime
+from typing import List, Literal, Optional, Tuple
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.responses import FastJSONResponse
+from app.services.analytics import build_analytics, build_moving_averages, build_period_comparison, build_trends
+from app.services.history_index import history_index
+
+router = APIRouter()
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Formato de fecha inválido en {name}. Use YYYY-MM-DD")
+
+@router.get("/")
+async def get_analytics(
+    as_of: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Análisis de todas las actividades activas en una sola llamada.
+
+    Para cada actividad:
+    - current_streak: días seguidos con valor > 0 hasta `as_of` (hoy por defecto)
+    - longest_streak: racha más larga del historial
+    - stats: totales, media, máximo y consistency_rate entre start_date y end_date
+      (por defecto, de la primera a la última entrada)
+    - weekday_patterns: media y número de entradas por día de la semana (0 = domingo)
+    """
+    as_of_date = _parse_date(as_of, "as_of") or date.today()
+    analytics = await build_analytics(
+        supabase,
+        as_of_date,
+        _parse_date(start_date, "start_date"),
+        _parse_date(end_date, "end_date"),
+    )
+    return FastJSONResponse(analytics)
+
+@router.get("/moving-average")
+async def get_moving_average(
+    days: int = Query(7, ge=1, le=366),
+    end_date: Optional[str] = None,
+    activity_id: Optional[str] = None,
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Promedio móvil de `days` días de cada entrada hasta end_date (hoy por
+    defecto), para todas las actividades activas o solo activity_id.
+    """
+    end = _parse_date(end_date, "end_date") or date.today()
+    return FastJSONResponse(await build_moving_averages(supabase, days, end, activity_id))
+
+@router.get("/trends")
+async def get_trends(
+    period: Literal["week", "month"] = "week",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    activity_id: Optional[str] = None,
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Totales por semana o por mes de cada actividad activa (tabla
+    activity_rollups), filtrando por el inicio del periodo.
+    """
+    start = _parse_date(start_date, "start_date")
+    end = _parse_date(end_date, "end_date")
+    trends = await build_trends(
+        supabase,
+        period,
+        start.isoformat() if start else None,
+        end.isoformat() if end else None,
+        activity_id,
+    )
+    return FastJSONResponse(trends)
+
+# Periodos por petición de comparación (dos años de meses)
+MAX_COMPARE_PERIODS = 24
+
+def _parse_period(value: str) -> Tuple[date, date]:
+    start, separator, end = value.partition("..")
+    first, last = _parse_date(start, "period"), _parse_date(end, "period") if separator else None
+    if last is None or last < first:
+        raise HTTPException(status_code=400, detail=f"Periodo inválido: {value}. Use YYYY-MM-DD..YYYY-MM-DD")
+    return first, last
+
+@router.get("/compare")
+async def compare_periods(
+    periods: List[str] = Query(..., alias="period", min_length=2, max_length=MAX_COMPARE_PERIODS),
+    activity_ids: Optional[List[str]] = Query(None, alias="activity_id"),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Comparación de periodos consecutivos, igual que la función SQL
+    compare_periods, para todas las actividades activas (o las de
+    `activity_id`, repetible) en una sola llamada.
+
+    `period=YYYY-MM-DD..YYYY-MM-DD` se repite por cada periodo (2 a 24); cada
+    periodo se compara con el anterior: totales, promedios y días con entrada
+    de ambos, change_percentage y trend (improving/declining/stable).
+    """
+    parsed = [_parse_period(value) for value in periods]
+    return FastJSONResponse(await build_period_comparison(supabase, parsed, activity_ids))
+
+@router.get("/history-index")
+async def get_history_index_stats():
+    """Memory footprint of the in-memory entry history index (HISTORY_INDEX)"""
+    return history_index.stats()
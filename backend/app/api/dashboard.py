@@ -1,11 +1,77 @@
-from fastapi import APIRouter, HTTPException
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from datetime import datetime, timedelta
-from app.core.database import get_supabase
+from typing import Optional, Tuple
+from app.core.cache import dashboard_cache
+from app.core.config import settings
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.etag import etag_matches, make_etag, not_modified, validator_headers
+from app.core.responses import FastJSONResponse
+from app.services.dashboard import (
+    DASHBOARD_ACTIVITY_FIELDS,
+    build_dashboard,
+    build_range_dashboard,
+    dashboard_version,
+    project_dashboard,
+)
+from app.api.fields import field_selection
+from app.services.rollover import rollover_week
 
 router = APIRouter()
 
+# Límite de semanas por petición de rango (dos años)
+MAX_RANGE_WEEKS = 106
+
+@router.get("/cache/stats")
+async def get_dashboard_cache_stats():
+    """Hit/miss/eviction counters of the dashboard cache"""
+    return dashboard_cache.stats()
+
+@router.get("/range")
+async def get_dashboard_range(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    fields: Optional[Tuple[str, ...]] = Depends(field_selection(DASHBOARD_ACTIVITY_FIELDS)),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Dashboards de varias semanas (vista trimestral o anual) en una sola llamada.
+    `from` y `to` (YYYY-MM-DD) se amplían al lunes de su semana.
+
+    Retorna la misma estructura por actividad que /{week_start_date} y un
+    weekly_summary para cada semana. Admite también ?fields=.
+    """
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d").date()
+        end = datetime.strptime(to_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="'from' debe ser anterior o igual a 'to'")
+
+    first_week = start - timedelta(days=start.weekday())
+    last_week = end - timedelta(days=end.weekday())
+    if (last_week - first_week).days // 7 + 1 > MAX_RANGE_WEEKS:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_RANGE_WEEKS} semanas")
+
+    include_reflections = fields is None or "reflection_text" in fields
+    weeks = await build_range_dashboard(supabase, first_week, last_week, include_reflections)
+    # El payload ya es JSON puro: se codifica directamente sin jsonable_encoder
+    return FastJSONResponse({
+        "from": first_week.strftime("%Y-%m-%d"),
+        "to": (last_week + timedelta(days=6)).strftime("%Y-%m-%d"),
+        "weeks": [project_dashboard(week, fields) for week in weeks]
+    })
+
 @router.get("/{week_start_date}")
-async def get_dashboard(week_start_date: str):
+async def get_dashboard(
+    request: Request,
+    week_start_date: str,
+    rollover: bool = False,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selection(DASHBOARD_ACTIVITY_FIELDS)),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
     """
     Endpoint principal del dashboard.
     Carga todos los datos para una semana específica (debe ser lunes).
@@ -15,9 +81,17 @@ async def get_dashboard(week_start_date: str):
     - Para cada actividad: meta, reflexión, 7 entradas diarias
     - Cálculos: realized_hours, percentage_complete
     - Resumen semanal total
+
+    Con ?rollover=true antes se copian las metas pendientes de la semana
+    anterior (ver POST /api/goals/rollover/{week_start_date}).
+
+    Con ?fields=name,realized_value solo se devuelven esos campos por actividad;
+    si no se pide reflection_text no se consultan las reflexiones.
+
+    Devuelve ETag/Last-Modified; con If-None-Match de la versión actual
+    responde 304 sin construir el dashboard. Un dashboard en caché se sirve
+    sin consultar la base de datos durante DASHBOARD_VERSION_TTL segundos.
     """
-    supabase = get_supabase()
-    
     # Validar que sea lunes
     try:
         week_date = datetime.strptime(week_start_date, "%Y-%m-%d").date()
@@ -26,82 +100,40 @@ async def get_dashboard(week_start_date: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
     
-    # Calcular fechas de la semana
-    week_dates = [(week_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-    
-    # Obtener actividades activas
-    activities_response = supabase.table("activities").select("*").eq("is_active", True).order("created_at").execute()
-    
-    if not activities_response.data:
-        return {
-            "week_start_date": week_start_date,
-            "week_dates": week_dates,
-            "activities": [],
-            "weekly_summary": {
-                "total_target_hours": 0,
-                "total_realized_hours": 0,
-                "overall_percentage": 0
-            }
-        }
-    
-    activities = []
-    total_target_hours = 0
-    total_realized_hours = 0
-    
-    for activity in activities_response.data:
-        activity_id = activity["id"]
-        activity_type = activity.get("activity_type", "time")
-        target_unit = activity.get("target_unit", "horas")
-        
-        # Obtener meta semanal
-        goal_response = supabase.table("weekly_goals").select("*").eq("activity_id", activity_id).eq("week_start_date", week_start_date).execute()
-        target_value = goal_response.data[0]["target_value"] if goal_response.data else 0
-        
-        # Obtener reflexión semanal
-        reflection_response = supabase.table("weekly_reflections").select("*").eq("activity_id", activity_id).eq("week_start_date", week_start_date).execute()
-        reflection_text = reflection_response.data[0]["reflection_text"] if reflection_response.data else ""
-        
-        # Obtener entradas diarias de la semana
-        entries_response = supabase.table("daily_entries").select("*").eq("activity_id", activity_id).in_("entry_date", week_dates).execute()
-        
-        # Crear diccionario de entradas por fecha
-        daily_values = {date: 0.0 for date in week_dates}
-        for entry in entries_response.data:
-            daily_values[entry["entry_date"]] = entry["value_amount"]
-        
-        # Calcular valor realizado
-        realized_value = sum(daily_values.values())
-        
-        # Calcular porcentaje
-        percentage_complete = (realized_value / target_value * 100) if target_value > 0 else 0
-        
-        # Acumular totales (solo para actividades de tiempo para el resumen)
-        if activity_type == "time":
-            total_target_hours += target_value
-            total_realized_hours += realized_value
-        
-        activities.append({
-            "activity_id": activity_id,
-            "name": activity["name"],
-            "activity_type": activity_type,
-            "target_unit": target_unit,
-            "target_value": target_value,
-            "realized_value": realized_value,
-            "percentage_complete": round(percentage_complete, 2),
-            "reflection_text": reflection_text,
-            "daily_values": daily_values
-        })
-    
-    # Calcular porcentaje general
-    overall_percentage = (total_realized_hours / total_target_hours * 100) if total_target_hours > 0 else 0
-    
-    return {
-        "week_start_date": week_start_date,
-        "week_dates": week_dates,
-        "activities": activities,
-        "weekly_summary": {
-            "total_target_hours": total_target_hours,
-            "total_realized_hours": total_realized_hours,
-            "overall_percentage": round(overall_percentage, 2)
-        }
-    }
+    week_key = week_date.strftime("%Y-%m-%d")
+    if rollover:
+        result = await rollover_week(supabase, week_date)
+        if result["goals_copied"]:
+            dashboard_cache.invalidate(week_key)
+
+    # Las escrituras de la API ya invalidan la caché: una copia comprobada
+    # hace poco se sirve con su versión guardada, sin ir a la base de datos
+    cached = dashboard_cache.get(week_key)
+    if cached is not None and time.time() - cached.get("checked_at", 0) <= settings.DASHBOARD_VERSION_TTL:
+        headers = validator_headers(make_etag(cached["version"], fields), cached["last_modified"])
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        return FastJSONResponse(project_dashboard(cached["dashboard"], fields), headers=headers)
+
+    # Pasado el TTL la marca de agua detecta también escrituras que no pasan por esta API
+    token = dashboard_cache.begin(week_key)
+    version, last_modified = await dashboard_version(supabase, week_date)
+    headers = validator_headers(make_etag(version, fields), last_modified)
+    checked = {"version": version, "last_modified": last_modified, "checked_at": time.time()}
+    if cached is not None and cached["version"] == version:
+        dashboard_cache.set(week_key, {**checked, "dashboard": cached["dashboard"]}, token)
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        return FastJSONResponse(project_dashboard(cached["dashboard"], fields), headers=headers)
+
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+
+    if fields is not None and "reflection_text" not in fields:
+        # Payload incompleto (sin reflexiones): no se guarda en la caché
+        dashboard = await build_dashboard(supabase, week_date, include_reflections=False)
+        return FastJSONResponse(project_dashboard(dashboard, fields), headers=headers)
+
+    dashboard = await build_dashboard(supabase, week_date)
+    dashboard_cache.set(week_key, {**checked, "dashboard": dashboard}, token)
+    return FastJSONResponse(project_dashboard(dashboard, fields), headers=headers)
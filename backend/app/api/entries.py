@@ -1,42 +1,132 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models.schemas import DailyEntry, DailyEntryCreate
-from app.core.database import get_supabase
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from app.models.schemas import BatchResult, DailyEntry, DailyEntryCreate
+from app.core.cache import dashboard_cache, week_start_of
+from app.core.database import InstrumentedClient, PAGE_SIZE, decode_cursor, encode_cursor, get_supabase, iter_keyset_pages, keyset_query
+from app.services.batch import MAX_BATCH_ITEMS
+from app.services.entry_buffer import entry_buffer
+from app.services.goals import evaluate_goals, goal_evaluator
+from app.services.history_index import history_index
+from app.core.responses import FastJSONResponse, dumps, trusted_response, trusted_rows
+from app.api.fields import field_selection, select_columns
 
 router = APIRouter()
 
+# Orden de paginación: más recientes primero; id desempata dentro del mismo día
+ENTRY_KEYS = ("entry_date", "id")
+
 @router.get("/", response_model=List[DailyEntry])
-async def get_entries(activity_id: str = None, start_date: str = None, end_date: str = None):
-    """Get daily entries with optional filters"""
-    supabase = get_supabase()
-    query = supabase.table("daily_entries").select("*")
-    
-    if activity_id:
-        query = query.eq("activity_id", activity_id)
-    if start_date:
-        query = query.gte("entry_date", start_date)
-    if end_date:
-        query = query.lte("entry_date", end_date)
-    
-    response = query.order("entry_date", desc=True).execute()
-    return response.data
-
-@router.post("/", response_model=DailyEntry)
-async def create_or_update_entry(entry: DailyEntryCreate):
-    """Create or update a daily entry"""
-    supabase = get_supabase()
-    response = supabase.table("daily_entries").upsert(entry.model_dump()).execute()
+async def get_entries(
+    activity_id: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selection(DailyEntry.model_fields)),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Get daily entries with optional filters, newest first.
+
+    With `limit` the entries are paged by keyset on (entry_date, id): pass the
+    X-Next-Cursor header of a page as `cursor` to get the next one. With
+    `stream=true` the whole result is sent as NDJSON while it is read page by page.
+    `fields=` limits the returned columns.
+    """
+    # Las claves del cursor se leen siempre aunque no se devuelvan
+    columns = select_columns(DailyEntry, fields, extra=ENTRY_KEYS)
+
+    def build_query():
+        query = supabase.table("daily_entries").select(columns)
+        if activity_id:
+            query = query.eq("activity_id", activity_id)
+        if start_date:
+            query = query.gte("entry_date", start_date)
+        if end_date:
+            query = query.lte("entry_date", end_date)
+        return query
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, len(ENTRY_KEYS))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    if stream:
+        pages = iter_keyset_pages(build_query, ENTRY_KEYS, after)
+        return StreamingResponse(_ndjson(pages, fields), media_type="application/x-ndjson")
+
+    if limit is None and after is None:
+        page = await build_query().order("entry_date", desc=True).execute()
+        return trusted_response(DailyEntry, page.data, fields)
+
+    page_size = limit or PAGE_SIZE
+    page = await keyset_query(build_query(), ENTRY_KEYS, after, page_size).execute()
+    paged = trusted_response(DailyEntry, page.data, fields)
+    
+    # Página completa: puede haber más (la siguiente puede venir vacía)
+    if len(page.data) == page_size:
+        paged.headers["X-Next-Cursor"] = encode_cursor([page.data[-1][key] for key in ENTRY_KEYS])
+    return paged
+
+async def _ndjson(pages: AsyncIterator[List[dict]], fields: Optional[Tuple[str, ...]]) -> AsyncIterator[bytes]:
+    # Una línea JSON por entrada, con la misma forma que la respuesta normal
+    async for rows in pages:
+        yield b"".join(dumps(row) + b"\n" for row in trusted_rows(DailyEntry, rows, fields))
+
+@router.get("/buffer/stats")
+async def get_entry_buffer_stats():
+    """Pending/flush counters of the write-behind entry buffer"""
+    return entry_buffer.stats()
+
+@router.post("/", response_model=DailyEntry, responses={
+    202: {"description": "Entrada aceptada en el buffer de escritura diferida"},
+    503: {"description": "Buffer de escritura diferida lleno (ENTRY_BUFFER_MAX_PENDING)"},
+})
+async def create_or_update_entry(entry: DailyEntryCreate, supabase: InstrumentedClient = Depends(get_supabase)):
+    """Create or update a daily entry (202 and written shortly after when ENTRY_WRITE_BEHIND is on, 503 while its buffer is full)"""
+    if entry_buffer.enabled:
+        if not await entry_buffer.known_activity(supabase, entry.activity_id):
+            raise HTTPException(status_code=404, detail="Activity not found")
+        if not entry_buffer.has_room(entry.activity_id, entry.entry_date):
+            # La base de datos no da abasto: no se aceptan más escrituras sin límite
+            raise HTTPException(status_code=503, detail="Buffer de escritura lleno", headers={"Retry-After": "5"})
+        row = entry_buffer.put(entry.model_dump())
+        dashboard_cache.invalidate(week_start_of(entry.entry_date))
+        return FastJSONResponse({**row, "pending": True}, status_code=202)
+    
+    response = await supabase.table("daily_entries").upsert(entry.model_dump(), on_conflict="activity_id,entry_date").execute()
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to save entry")
     
+    history_index.record(response.data)
+    dashboard_cache.invalidate(week_start_of(entry.entry_date))
+    goal_evaluator.schedule([(entry.activity_id, week_start_of(entry.entry_date))])
     return response.data[0]
 
+@router.post("/batch", response_model=BatchResult)
+async def create_or_update_entries_batch(items: List[Any] = Body(...), supabase: InstrumentedClient = Depends(get_supabase)):
+    """Create or update many daily entries at once (one upsert per chunk, per-item results)"""
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_BATCH_ITEMS} elementos por lote")
+    
+    # El lote es más reciente que lo que quede en el buffer para esas claves
+    result, saved = await entry_buffer.upsert_entries(supabase, items)
+    
+    if saved:
+        history_index.record(saved)
+        dashboard_cache.invalidate(*{week_start_of(row["entry_date"]) for row in saved})
+        await evaluate_goals(supabase, {(row["activity_id"], week_start_of(row["entry_date"])) for row in saved})
+    return result
+
 @router.get("/{entry_id}", response_model=DailyEntry)
-async def get_entry(entry_id: str):
+async def get_entry(entry_id: str, supabase: InstrumentedClient = Depends(get_supabase)):
     """Get a specific daily entry"""
-    supabase = get_supabase()
-    response = supabase.table("daily_entries").select("*").eq("id", entry_id).execute()
+    response = await supabase.table("daily_entries").select("*").eq("id", entry_id).execute()
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Entry not found")
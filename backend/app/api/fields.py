@@ -0,0 +1,37 @@
+"""
+Proyección de columnas (?fields=) para los endpoints de listado.
+
+La selección se traslada al select() de PostgREST, de modo que solo viajan
+las columnas pedidas, y la respuesta se proyecta sobre esos mismos campos
+(ver app/core/responses.py).
+"""
+from typing import Callable, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+def field_selection(allowed: Sequence[str]) -> Callable:
+    """Dependency parsing ?fields=a,b into a tuple of allowed names (None means all)"""
+    allowed = tuple(allowed)
+
+    def dependency(
+        fields: Optional[str] = Query(None, description=f"Campos a devolver, separados por comas: {', '.join(allowed)}")
+    ) -> Optional[Tuple[str, ...]]:
+        if fields is None:
+            return None
+        names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        if not names:
+            raise HTTPException(status_code=400, detail="fields no puede estar vacío")
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(allowed)}",
+            )
+        return names
+
+    return dependency
+
+def select_columns(model: Type[BaseModel], fields: Optional[Tuple[str, ...]], extra: Sequence[str] = ()) -> str:
+    """PostgREST select list: the requested fields (or every model field) plus extra"""
+    names = fields or tuple(model.model_fields)
+    return ",".join(dict.fromkeys((*names, *extra)))
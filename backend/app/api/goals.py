@@ -1,29 +1,81 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models.schemas import WeeklyGoal, WeeklyGoalCreate
-from app.core.database import get_supabase
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from app.models.schemas import BatchResult, RolloverResult, WeeklyGoal, WeeklyGoalCreate
+from app.core.cache import dashboard_cache
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.etag import etag_matches, make_etag, not_modified, table_watermark, validator_headers
+from app.core.responses import trusted_response
+from app.api.fields import field_selection, select_columns
+from app.services.batch import MAX_BATCH_ITEMS, upsert_batch
+from app.services.goals import evaluate_goals, goal_evaluator
+from app.services.rollover import rollover_week
 
 router = APIRouter()
 
 @router.get("/", response_model=List[WeeklyGoal])
-async def get_goals(week_start_date: str = None):
-    """Get weekly goals, optionally filtered by week"""
-    supabase = get_supabase()
-    query = supabase.table("weekly_goals").select("*")
+async def get_goals(
+    request: Request,
+    week_start_date: str = None,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selection(WeeklyGoal.model_fields)),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """Get weekly goals, optionally filtered by week (`fields=` limits the returned columns, If-None-Match gives 304)"""
+    watermark_query = supabase.table("weekly_goals").select("updated_at", count="exact")
+    query = supabase.table("weekly_goals").select(select_columns(WeeklyGoal, fields))
     
     if week_start_date:
+        watermark_query = watermark_query.eq("week_start_date", week_start_date)
         query = query.eq("week_start_date", week_start_date)
     
-    response = query.order("created_at", desc=True).execute()
-    return response.data
+    count, latest = await table_watermark(watermark_query)
+    headers = validator_headers(make_etag("weekly_goals", week_start_date, count, latest, fields), latest)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    response = await query.order("created_at", desc=True).execute()
+    return trusted_response(WeeklyGoal, response.data, fields, headers)
 
 @router.post("/", response_model=WeeklyGoal)
-async def create_or_update_goal(goal: WeeklyGoalCreate):
+async def create_or_update_goal(goal: WeeklyGoalCreate, supabase: InstrumentedClient = Depends(get_supabase)):
     """Create or update a weekly goal"""
-    supabase = get_supabase()
-    response = supabase.table("weekly_goals").upsert(goal.model_dump()).execute()
+    response = await supabase.table("weekly_goals").upsert(goal.model_dump(), on_conflict="activity_id,week_start_date").execute()
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to save goal")
     
+    dashboard_cache.invalidate(goal.week_start_date)
+    goal_evaluator.schedule([(goal.activity_id, goal.week_start_date)])
     return response.data[0]
+
+@router.post("/batch", response_model=BatchResult)
+async def create_or_update_goals_batch(items: List[Any] = Body(...), supabase: InstrumentedClient = Depends(get_supabase)):
+    """Create or update many weekly goals at once (one upsert per chunk, per-item results)"""
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_BATCH_ITEMS} elementos por lote")
+    
+    result, saved = await upsert_batch(supabase, "weekly_goals", items, WeeklyGoalCreate, ("activity_id", "week_start_date"))
+    
+    if saved:
+        dashboard_cache.invalidate(*{row["week_start_date"] for row in saved})
+        await evaluate_goals(supabase, {(row["activity_id"], row["week_start_date"]) for row in saved})
+    return result
+
+@router.post("/rollover/{week_start_date}", response_model=RolloverResult)
+async def rollover_goals(week_start_date: str, supabase: InstrumentedClient = Depends(get_supabase)):
+    """
+    Copy last week's targets and uncompleted checkbox goals into this week for
+    every active activity that has none yet. Idempotent.
+    """
+    try:
+        week_date = datetime.strptime(week_start_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+    if week_date.weekday() != 0:
+        raise HTTPException(status_code=400, detail="week_start_date debe ser un lunes")
+    
+    result = await rollover_week(supabase, week_date)
+    
+    if result["goals_copied"]:
+        dashboard_cache.invalidate(result["week_start_date"])
+    return result
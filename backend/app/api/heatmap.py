@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Path, Query
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.responses import FastJSONResponse
+from app.services.heatmap import MAX_LEVELS, build_heatmap
+
+router = APIRouter()
+
+@router.get("/{year}")
+async def get_heatmap(
+    year: int = Path(..., ge=1970, le=9999),
+    levels: int = Query(0, ge=0, le=MAX_LEVELS),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Mapa de calor del año para todas las actividades activas.
+
+    - start_date / days: el día i de cada array es start_date + i
+    - values: valor de cada día (0 sin entrada)
+    - con `levels=N` (1-9), en lugar de values: `levels`, un dígito por día
+      (0 sin actividad, 1..N por cuantiles de los días con valor > 0 de la
+      actividad) y `thresholds`, el valor mínimo de los niveles 2..N
+    """
+    return FastJSONResponse(await build_heatmap(supabase, year, levels))
@@ -1,29 +1,57 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models.schemas import WeeklyReflection, WeeklyReflectionCreate
-from app.core.database import get_supabase
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from typing import Any, List, Optional, Tuple
+from app.models.schemas import BatchResult, WeeklyReflection, WeeklyReflectionCreate
+from app.core.cache import dashboard_cache
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.etag import etag_matches, make_etag, not_modified, table_watermark, validator_headers
+from app.core.responses import trusted_response
+from app.api.fields import field_selection, select_columns
+from app.services.batch import MAX_BATCH_ITEMS, upsert_batch
 
 router = APIRouter()
 
 @router.get("/", response_model=List[WeeklyReflection])
-async def get_reflections(week_start_date: str = None):
-    """Get weekly reflections, optionally filtered by week"""
-    supabase = get_supabase()
-    query = supabase.table("weekly_reflections").select("*")
+async def get_reflections(
+    request: Request,
+    week_start_date: str = None,
+    fields: Optional[Tuple[str, ...]] = Depends(field_selection(WeeklyReflection.model_fields)),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """Get weekly reflections, optionally filtered by week (`fields=` limits the returned columns, If-None-Match gives 304)"""
+    watermark_query = supabase.table("weekly_reflections").select("updated_at", count="exact")
+    query = supabase.table("weekly_reflections").select(select_columns(WeeklyReflection, fields))
     
     if week_start_date:
+        watermark_query = watermark_query.eq("week_start_date", week_start_date)
         query = query.eq("week_start_date", week_start_date)
     
-    response = query.order("created_at", desc=True).execute()
-    return response.data
+    count, latest = await table_watermark(watermark_query)
+    headers = validator_headers(make_etag("weekly_reflections", week_start_date, count, latest, fields), latest)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    response = await query.order("created_at", desc=True).execute()
+    return trusted_response(WeeklyReflection, response.data, fields, headers)
 
 @router.post("/", response_model=WeeklyReflection)
-async def create_or_update_reflection(reflection: WeeklyReflectionCreate):
+async def create_or_update_reflection(reflection: WeeklyReflectionCreate, supabase: InstrumentedClient = Depends(get_supabase)):
     """Create or update a weekly reflection"""
-    supabase = get_supabase()
-    response = supabase.table("weekly_reflections").upsert(reflection.model_dump()).execute()
+    response = await supabase.table("weekly_reflections").upsert(reflection.model_dump(), on_conflict="activity_id,week_start_date").execute()
     
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to save reflection")
     
+    dashboard_cache.invalidate(reflection.week_start_date)
     return response.data[0]
+
+@router.post("/batch", response_model=BatchResult)
+async def create_or_update_reflections_batch(items: List[Any] = Body(...), supabase: InstrumentedClient = Depends(get_supabase)):
+    """Create or update many weekly reflections at once (one upsert per chunk, per-item results)"""
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_BATCH_ITEMS} elementos por lote")
+    
+    result, saved = await upsert_batch(supabase, "weekly_reflections", items, WeeklyReflectionCreate, ("activity_id", "week_start_date"))
+    
+    if saved:
+        dashboard_cache.invalidate(*{row["week_start_date"] for row in saved})
+    return result
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.core.config import settings
+from app.core.database import InstrumentedClient, PAGE_SIZE, get_supabase
+from app.core.responses import FastJSONResponse
+from app.services.sync import STREAMS, decode_sync_cursor, read_changes
+
+router = APIRouter()
+
+@router.get("/")
+async def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=PAGE_SIZE),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Filas de activities, daily_entries, weekly_goals, weekly_reflections y
+    activity_goals cambiadas desde el cursor `since` (sin él, todas).
+
+    - changes: filas nuevas o modificadas por tabla, para aplicar como upsert por id
+    - tombstones: {table, id, deleted_at} de actividades desactivadas y filas borradas
+    - cursor: valor de `since` para la siguiente llamada
+    - has_more: alguna tabla llegó a `limit` filas; volver a llamar enseguida
+
+    Las filas de los últimos segundos pueden repetirse en la siguiente llamada.
+    """
+    positions = [None] * len(STREAMS)
+    if since:
+        try:
+            positions = decode_sync_cursor(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    return FastJSONResponse(await read_changes(supabase, positions, limit, settings.SYNC_OVERLAP_SECONDS))
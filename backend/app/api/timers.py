@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from postgrest.exceptions import APIError
+from app.models.schemas import Timer, TimerCreate, TimerUpdate
+from app.core.database import InstrumentedClient, get_supabase
+from app.services.timers import timer_hub
+
+router = APIRouter()
+
+@router.get("/", response_model=List[Timer])
+async def get_timers(for_date: Optional[str] = None, supabase: InstrumentedClient = Depends(get_supabase)):
+    """Get the timers of every device, optionally filtered by date"""
+    await timer_hub.load(supabase)
+    return timer_hub.list(for_date)
+
+@router.get("/events")
+async def timer_events(request: Request, supabase: InstrumentedClient = Depends(get_supabase)):
+    """
+    Server-Sent Events stream of timer changes: a `snapshot` event with every
+    timer, then `timer` (created/updated) and `deleted` events as they happen.
+    """
+    await timer_hub.load(supabase)
+    return StreamingResponse(
+        timer_hub.stream(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/", response_model=Timer)
+async def start_timer(timer: TimerCreate, supabase: InstrumentedClient = Depends(get_supabase)):
+    """Get the timer of the activity and date, creating it if there is none"""
+    try:
+        return await timer_hub.create(supabase, timer.model_dump())
+    except APIError as error:
+        raise HTTPException(status_code=400, detail=error.message)
+
+@router.patch("/{timer_id}", response_model=Timer)
+async def update_timer(timer_id: str, changes: TimerUpdate, supabase: InstrumentedClient = Depends(get_supabase)):
+    """Pause, resume or adjust a timer (pushed to every device at once, saved shortly after)"""
+    await timer_hub.load(supabase)
+    timer = timer_hub.update(timer_id, changes.model_dump(exclude_none=True))
+    
+    if timer is None:
+        raise HTTPException(status_code=404, detail="Timer not found")
+    
+    return timer
+
+@router.delete("/{timer_id}")
+async def delete_timer(timer_id: str, supabase: InstrumentedClient = Depends(get_supabase)):
+    """Stop or cancel a timer"""
+    await timer_hub.load(supabase)
+    
+    if not timer_hub.delete(timer_id):
+        raise HTTPException(status_code=404, detail="Timer not found")
+    
+    return {"message": "Timer deleted successfully"}
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.core.database import InstrumentedClient, get_supabase
+from app.core.responses import FastJSONResponse
+from app.services.transfer import (
+    EXPORT_TABLES,
+    export_csv,
+    export_ndjson,
+    get_import,
+    parse_csv,
+    parse_ndjson,
+    start_import,
+)
+
+router = APIRouter()
+
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+def _check_table(table: Optional[str], format: str) -> None:
+    if table is not None and table not in EXPORT_TABLES:
+        raise HTTPException(status_code=400, detail=f"Tabla desconocida: {table}")
+    if format == "csv" and table is None:
+        raise HTTPException(status_code=400, detail="El formato csv necesita el parámetro table")
+
+@router.get("/export")
+async def export_data(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN),
+    table: Optional[str] = None,
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Exporta el historial página a página sin cargarlo entero en memoria.
+
+    - ndjson: una línea {"table", "data"} por fila, de todas las tablas o solo de `table`
+    - csv: una tabla (`table` obligatorio) con cabecera
+    """
+    _check_table(table, format)
+    if format == "csv":
+        body, media_type, filename = export_csv(supabase, table), "text/csv; charset=utf-8", f"{table}.csv"
+    else:
+        tables = (table,) if table else EXPORT_TABLES
+        body, media_type, filename = export_ndjson(supabase, tables), "application/x-ndjson", f"{table or 'export'}.ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/import")
+async def import_data(
+    request: Request,
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN),
+    table: Optional[str] = None,
+    import_id: Optional[str] = Query(None, max_length=64),
+    supabase: InstrumentedClient = Depends(get_supabase),
+):
+    """
+    Importa un fichero de /api/export (upsert por clave única, idempotente).
+
+    El cuerpo se procesa a medida que llega, en bloques; con `import_id`
+    el progreso se puede consultar en GET /api/import/{import_id} durante
+    la carga. Responde con el resumen final por tabla.
+    """
+    _check_table(table, format)
+    if import_id and (job := get_import(import_id)) and job.status == "running":
+        raise HTTPException(status_code=409, detail="Ya hay una importación en curso con ese id")
+
+    job = start_import(supabase, import_id)
+    records = parse_csv(request.stream(), table) if format == "csv" else parse_ndjson(request.stream())
+    try:
+        async for line, record_table, row in records:
+            if table and format == "ndjson" and record_table != table:
+                continue
+            await job.add(line, record_table, row)
+        await job.finish()
+    except Exception as error:
+        job.fail(str(error))
+        raise
+    return FastJSONResponse(job.progress())
+
+@router.get("/import/{import_id}")
+async def import_progress(import_id: str):
+    """Progress of a running or recent import"""
+    job = get_import(import_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return FastJSONResponse(job.progress())
@@ -0,0 +1,165 @@
+"""
+Caché de dashboards semanales invalidada por escrituras.
+
+Nivel local: LRU acotado con TTL por proceso. Nivel compartido (opcional):
+un fichero SQLite que comparten todos los workers de uvicorn de la máquina,
+de modo que un dashboard calculado por un worker sirve también a los demás.
+Cada invalidación incrementa una "época" en el nivel compartido; un worker
+descarta sus copias locales en cuanto ve que la época ha cambiado.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+def week_start_of(day: str) -> str:
+    """Monday (YYYY-MM-DD) of the week containing the given ISO date"""
+    parsed = datetime.strptime(day, "%Y-%m-%d").date()
+    return (parsed - timedelta(days=parsed.weekday())).strftime("%Y-%m-%d")
+
+class _SharedTier:
+    """Dashboard payloads shared between worker processes through SQLite"""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS dashboard_cache (week TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS cache_epoch (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)")
+        self._connection.execute("INSERT OR IGNORE INTO cache_epoch (id, value) VALUES (1, 0)")
+
+    def epoch(self) -> int:
+        return self._connection.execute("SELECT value FROM cache_epoch WHERE id = 1").fetchone()[0]
+
+    def get(self, week: str, ttl: float) -> Optional[dict]:
+        row = self._connection.execute("SELECT payload, stored_at FROM dashboard_cache WHERE week = ?", (week,)).fetchone()
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, week: str, payload: dict) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO dashboard_cache (week, payload, stored_at) VALUES (?, ?, ?)",
+            (week, json.dumps(payload), time.time()),
+        )
+
+    def invalidate(self, weeks: Optional[Iterable[str]]) -> None:
+        with self._connection:
+            if weeks is None:
+                self._connection.execute("DELETE FROM dashboard_cache")
+            else:
+                self._connection.executemany("DELETE FROM dashboard_cache WHERE week = ?", [(week,) for week in weeks])
+            self._connection.execute("UPDATE cache_epoch SET value = value + 1 WHERE id = 1")
+
+class DashboardCache:
+    """Bounded LRU + TTL cache of computed dashboard payloads keyed by week_start_date"""
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 300, shared_path: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._generations = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._shared = _SharedTier(shared_path) if shared_path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _epoch(self) -> int:
+        return self._shared.epoch() if self._shared else 0
+
+    def get(self, week: str) -> Optional[dict]:
+        """Return the cached payload (do not mutate it) or None"""
+        epoch = self._epoch()
+        with self._lock:
+            cached = self._entries.get(week)
+            if cached is not None:
+                stored_at, cached_epoch, payload = cached
+                if cached_epoch == epoch and time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(week)
+                    self.hits += 1
+                    return payload
+                del self._entries[week]
+                self.expirations += 1
+
+        if self._shared is not None:
+            payload = self._shared.get(week, self.ttl_seconds)
+            if payload is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._store_local(week, payload, epoch)
+                return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def begin(self, week: str) -> Tuple[int, int, int]:
+        """Token to pass to set(); a write in between makes set() a no-op"""
+        epoch = self._epoch()
+        with self._lock:
+            return self._generation, self._generations.get(week, 0), epoch
+
+    def set(self, week: str, payload: dict, token: Tuple[int, int, int]) -> None:
+        epoch = self._epoch()
+        with self._lock:
+            if token != (self._generation, self._generations.get(week, 0), epoch):
+                return
+            self._store_local(week, payload, epoch)
+        if self._shared is not None:
+            self._shared.set(week, payload)
+
+    def _store_local(self, week: str, payload: dict, epoch: int) -> None:
+        self._entries[week] = (time.monotonic(), epoch, payload)
+        self._entries.move_to_end(week)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *weeks: str) -> None:
+        """Drop the given weeks (after a write to entries, goals or reflections)"""
+        with self._lock:
+            for week in weeks:
+                self._entries.pop(week, None)
+                self._generations[week] = self._generations.get(week, 0) + 1
+            self.invalidations += len(weeks)
+        if self._shared is not None and weeks:
+            self._shared.invalidate(weeks)
+
+    def invalidate_all(self) -> None:
+        """Drop every week (after a write to activities)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+        if self._shared is not None:
+            self._shared.invalidate(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "shared": self._shared is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+dashboard_cache = DashboardCache(
+    max_entries=settings.DASHBOARD_CACHE_SIZE,
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL,
+    shared_path=settings.DASHBOARD_CACHE_SHARED_PATH,
+)
@@ -1,16 +1,54 @@
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 from pydantic_settings import BaseSettings
 
-load_dotenv()
+# backend/.env, independiente del directorio desde el que se arranque
+ENV_FILE = Path(__file__).resolve().parents[2] / ".env"
 
 class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    SUPABASE_TIMEOUT: float = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    # "supabase" (remoto) o "sqlite" (embebido, para un solo nodo o pruebas de carga)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "supabase")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "momentum.db")
+    # Caché de dashboards (DASHBOARD_CACHE_SHARED_PATH activa el nivel compartido entre workers)
+    DASHBOARD_CACHE_SIZE: int = int(os.getenv("DASHBOARD_CACHE_SIZE", "128"))
+    DASHBOARD_CACHE_TTL: float = float(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+    DASHBOARD_CACHE_SHARED_PATH: str = os.getenv("DASHBOARD_CACHE_SHARED_PATH", "")
+    # Segundos en que un dashboard en caché se sirve sin volver a comprobar su versión
+    # en la base de datos (escrituras que no pasan por la API tardan como mucho esto en verse)
+    DASHBOARD_VERSION_TTL: float = float(os.getenv("DASHBOARD_VERSION_TTL", "5"))
+    # Evaluación de metas tras escrituras sueltas: espera sin escrituras / espera máxima (segundos)
+    GOAL_EVALUATION_DELAY: float = float(os.getenv("GOAL_EVALUATION_DELAY", "2"))
+    GOAL_EVALUATION_MAX_DELAY: float = float(os.getenv("GOAL_EVALUATION_MAX_DELAY", "10"))
+    # Cronómetros: cada cuánto se escriben en timer_sync los cambios acumulados (segundos)
+    TIMER_SYNC_FLUSH_INTERVAL: float = float(os.getenv("TIMER_SYNC_FLUSH_INTERVAL", "2"))
+    # Escritura diferida de entradas (POST /api/entries responde 202 y se escribe en bloque)
+    ENTRY_WRITE_BEHIND: bool = os.getenv("ENTRY_WRITE_BEHIND", "false").lower() == "true"
+    ENTRY_FLUSH_INTERVAL: float = float(os.getenv("ENTRY_FLUSH_INTERVAL", "1"))
+    ENTRY_FLUSH_MAX_PENDING: int = int(os.getenv("ENTRY_FLUSH_MAX_PENDING", "500"))
+    ENTRY_SPILL_PATH: str = os.getenv("ENTRY_SPILL_PATH", "pending_entries.jsonl")
+    # Tope de claves pendientes: por encima, POST /api/entries responde 503
+    ENTRY_BUFFER_MAX_PENDING: int = int(os.getenv("ENTRY_BUFFER_MAX_PENDING", "5000"))
+    # Trazas de queries por petición: fracción de peticiones trazadas (todas en desarrollo),
+    # cabecera Server-Timing y umbral del log de peticiones lentas (milisegundos)
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "false").lower() == "true"
+    SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+    # GET /api/sync: segundos recientes que se reenvían por si una transacción termina tarde
+    SYNC_OVERLAP_SECONDS: float = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+    # Índice en memoria del historial de entradas (solo con un proceso de la API)
+    HISTORY_INDEX: bool = os.getenv("HISTORY_INDEX", "false").lower() == "true"
+    # Procesos de uvicorn en modo producción (0 = uno por CPU). Uno por defecto:
+    # cronómetros, buffer de entradas e índice del historial viven en cada proceso
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
     
     class Config:
-        env_file = ".env"
+        env_file = ENV_FILE
+        # El .env lo comparten los scripts de setup (p. ej. SUPABASE_DB_PASSWORD)
+        extra = "ignore"
 
 settings = Settings()
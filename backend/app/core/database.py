@@ -1,7 +1,244 @@
-from supabase import create_client, Client
+import asyncio
+import base64
+import json
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
 from app.core.config import settings
+from app.core.sqlite_backend import SQLiteClient
 
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
-def get_supabase() -> Client:
-    return supabase
+# Cliente compartido por todo el proceso. Se crea en el arranque (lifespan,
+# warm_up_supabase) o en la primera petición; con Supabase reutiliza la misma
+# sesión httpx (pool de conexiones keep-alive) para todas las queries a PostgREST.
+_client: Union["AsyncClient", SQLiteClient, None] = None
+_instrumented: Optional["InstrumentedClient"] = None
+_client_lock = asyncio.Lock()
+
+async def _create_supabase_client() -> "AsyncClient":
+    # Import diferido: el SDK completo (auth, storage, realtime) es lo más lento de importar
+    from supabase import AsyncClientOptions, acreate_client
+
+    return await acreate_client(
+        settings.SUPABASE_URL,
+        settings.SUPABASE_KEY,
+        options=AsyncClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT),
+    )
+
+async def _create_sqlite_client() -> SQLiteClient:
+    return SQLiteClient(settings.SQLITE_PATH)
+
+# Backends de almacenamiento disponibles, seleccionados con STORAGE_BACKEND.
+# Todos exponen la misma API de query builder (table().select()...execute()).
+STORAGE_BACKENDS = {
+    "supabase": _create_supabase_client,
+    "sqlite": _create_sqlite_client,
+}
+
+class QueryEvent(NamedTuple):
+    """One executed query, as seen by the query observers"""
+    table: str
+    operation: str  # select, insert, upsert, update, delete o rpc
+    duration: float  # segundos
+    rows: int
+    ok: bool
+    filters: Tuple = ()  # (método, args, kwargs) encadenados tras la operación: eq, in_, order...
+
+# Funciones llamadas con cada QueryEvent (métricas, trazas)
+_query_observers: List[Callable[[QueryEvent], None]] = []
+
+def add_query_observer(observer: Callable[[QueryEvent], None]) -> None:
+    """Register a callback run after every query of the shared client"""
+    if observer not in _query_observers:
+        _query_observers.append(observer)
+
+def _notify(event: QueryEvent) -> None:
+    for observer in _query_observers:
+        observer(event)
+
+# Métodos del query builder que deciden el tipo de operación
+_OPERATIONS = {"select", "insert", "upsert", "update", "delete"}
+
+class QueryProxy:
+    """
+    Envuelve un query builder (de PostgREST o de SQLite) y mide su execute().
+
+    Cada método encadenado devuelve otro QueryProxy mientras el resultado
+    siga siendo un builder, así que el código que construye las queries no
+    cambia. Los filtros se guardan tal cual (sin formatear) para las trazas.
+    """
+
+    __slots__ = ("_builder", "_table", "_operation", "_filters")
+
+    def __init__(self, builder, table: str, operation: str, filters: Tuple = ()):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._filters = filters
+
+    def _wrap(self, result, name: str, args: tuple, kwargs: dict):
+        if not hasattr(result, "execute"):
+            return result
+        if name in _OPERATIONS:
+            # Columnas o filas de la operación: no son filtros
+            return QueryProxy(result, self._table, name, self._filters)
+        return QueryProxy(result, self._table, self._operation, self._filters + ((name, args, kwargs),))
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            # Propiedades como not_ devuelven el propio builder
+            return self._wrap(attribute, name, (), {})
+
+        def call(*args, **kwargs):
+            return self._wrap(attribute(*args, **kwargs), name, args, kwargs)
+
+        return call
+
+    async def execute(self):
+        started = time.perf_counter()
+        ok = False
+        rows = 0
+        try:
+            response = await self._builder.execute()
+            data = response.data
+            rows = len(data) if isinstance(data, list) else int(data is not None)
+            ok = True
+            return response
+        finally:
+            _notify(QueryEvent(self._table, self._operation, time.perf_counter() - started, rows, ok, self._filters))
+
+class InstrumentedClient:
+    """Shared client whose table()/rpc() queries report to the query observers"""
+
+    def __init__(self, client: Union["AsyncClient", SQLiteClient]):
+        self.client = client
+
+    def table(self, table_name: str) -> QueryProxy:
+        return QueryProxy(self.client.table(table_name), table_name, "select")
+
+    def from_(self, table_name: str) -> QueryProxy:
+        return self.table(table_name)
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> QueryProxy:
+        return QueryProxy(self.client.rpc(fn, params), fn, "rpc")
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+async def get_supabase() -> InstrumentedClient:
+    """FastAPI dependency returning the shared client of the configured backend"""
+    global _client, _instrumented
+    if _instrumented is None:
+        async with _client_lock:
+            if _instrumented is None:
+                if settings.STORAGE_BACKEND not in STORAGE_BACKENDS:
+                    raise RuntimeError(f"STORAGE_BACKEND desconocido: {settings.STORAGE_BACKEND}")
+                _client = await STORAGE_BACKENDS[settings.STORAGE_BACKEND]()
+                _instrumented = InstrumentedClient(_client)
+    return _instrumented
+
+async def ping_supabase(timeout: float) -> float:
+    """Run a one-row query and return its latency in seconds (raises on failure)"""
+    started = time.perf_counter()
+    supabase = await get_supabase()
+    await asyncio.wait_for(supabase.table("activities").select("id").limit(1).execute(), timeout)
+    return time.perf_counter() - started
+
+async def warm_up_supabase(timeout: float) -> Optional[float]:
+    """
+    Create the shared client and open its first connection (DNS, TLS) before
+    serving requests. Returns the latency, or None if the database did not
+    answer; the server starts anyway and /health reports the problem.
+    """
+    try:
+        return await ping_supabase(timeout)
+    except Exception:
+        return None
+
+async def close_supabase() -> None:
+    """Close the pooled connections of the shared client"""
+    global _client, _instrumented
+    if isinstance(_client, SQLiteClient):
+        _client.close()
+    elif _client is not None:
+        await _client.postgrest.aclose()
+    _client = None
+    _instrumented = None
+
+# PostgREST limita cada respuesta (max-rows = 1000 por defecto en Supabase)
+PAGE_SIZE = 1000
+
+async def fetch_all(build_query: Callable, page_size: int = PAGE_SIZE) -> List[dict]:
+    """
+    Run a select page by page until a short page comes back.
+
+    build_query must return a fresh, deterministically ordered query builder
+    on each call (builders are single use).
+    """
+    rows: List[dict] = []
+    offset = 0
+    while True:
+        response = await build_query().range(offset, offset + page_size - 1).execute()
+        rows.extend(response.data)
+        if len(response.data) < page_size:
+            return rows
+        offset += page_size
+
+def encode_cursor(values: Sequence[str]) -> str:
+    """Opaque token for a keyset position (the sort key values of the last row)"""
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, size: int) -> List[str]:
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, str) and '"' not in value and "\\" not in value for value in values)
+    ):
+        raise ValueError("invalid cursor")
+    return values
+
+def _keyset_filter(keys: Sequence[str], values: Sequence[str], operator: str = "lt") -> str:
+    # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), en sintaxis de PostgREST
+    branches = []
+    for position, key in enumerate(keys):
+        conditions = [f'{previous}.eq."{value}"' for previous, value in zip(keys[:position], values)]
+        conditions.append(f'{key}.{operator}."{values[position]}"')
+        branches.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+    return ",".join(branches)
+
+def keyset_query(query, keys: Sequence[str], after: Optional[Sequence[str]], page_size: int, desc: bool = True):
+    """
+    Order a select by keys (all descending, or all ascending with desc=False)
+    and keep the page_size rows that come strictly after the position
+    `after`. The last key must be unique.
+    """
+    if after:
+        query = query.or_(_keyset_filter(keys, after, "lt" if desc else "gt"))
+    for key in keys:
+        query = query.order(key, desc=desc)
+    return query.limit(page_size)
+
+async def iter_keyset_pages(
+    build_query: Callable,
+    keys: Sequence[str],
+    after: Optional[Sequence[str]] = None,
+    page_size: int = PAGE_SIZE,
+    desc: bool = True,
+) -> AsyncIterator[List[dict]]:
+    """
+    Yield the rows of a select page by page using keyset pagination.
+
+    Unlike fetch_all, each page is an index seek instead of an ever larger
+    OFFSET and only one page is held in memory at a time.
+    """
+    while True:
+        response = await keyset_query(build_query(), keys, after, page_size, desc).execute()
+        if response.data:
+            yield response.data
+        if len(response.data) < page_size:
+            return
+        after = [str(response.data[-1][key]) for key in keys]
@@ -0,0 +1,56 @@
+"""
+GET condicional (ETag / If-None-Match) a partir de marcas de versión.
+
+La versión de un recurso se calcula con una query mínima por tabla: número
+de filas y último updated_at (los triggers de las migraciones lo mantienen
+al día). Cualquier inserción, modificación o borrado cambia uno de los dos,
+así que si coinciden la respuesta anterior del cliente sigue siendo válida y
+se contesta 304 sin construir ni serializar el cuerpo.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+async def table_watermark(query) -> Tuple[int, Optional[str]]:
+    """
+    (row count, latest updated_at) of a filtered select.
+
+    query must be a fresh builder from .select("updated_at", count="exact")
+    with the resource's filters applied.
+    """
+    response = await query.order("updated_at", desc=True).limit(1).execute()
+    latest = response.data[0]["updated_at"] if response.data else None
+    return response.count or 0, latest
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag derived from the given version parts"""
+    return f'W/"{hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()}"'
+
+def latest_timestamp(timestamps: Iterable[Optional[str]]) -> Optional[str]:
+    """Most recent of several ISO timestamps (None values are ignored)"""
+    parsed = [datetime.fromisoformat(value) for value in timestamps if value]
+    return max(parsed).isoformat() if parsed else None
+
+def validator_headers(etag: str, last_modified: Optional[str] = None) -> Dict[str, str]:
+    """ETag/Last-Modified headers; no-cache makes browsers revalidate on every use"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        moment = datetime.fromisoformat(last_modified).astimezone(timezone.utc)
+        headers["Last-Modified"] = format_datetime(moment, usegmt=True)
+    return headers
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of the request's If-None-Match against etag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
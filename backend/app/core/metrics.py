@@ -0,0 +1,184 @@
+"""
+Métricas de la API en formato de texto de Prometheus.
+
+MetricsMiddleware mide cada petición por método y plantilla de ruta
+(/api/dashboard/{week_start_date}, no la URL concreta): latencia, peticiones
+en curso (por método), códigos de estado y tamaño de respuesta. Las conexiones
+SSE (text/event-stream) no entran en la latencia: duran lo que el cliente quiera. observe_query recibe cada
+query del cliente instrumentado de app/core/database.py (llamadas y
+duración por tabla y operación). GET /metrics devuelve todo con render().
+
+Sin dependencias externas. Los valores son por proceso: con varios workers
+cada uno expone los suyos.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Límites de los histogramas (segundos / bytes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Por etiquetas: [cuentas por bucket (no acumuladas) + +Inf, suma]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self._header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="{}"'.format("+Inf" if bound == float("inf") else _number(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """Callback that renders extra lines at scrape time (state owned elsewhere)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter("http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")))
+REQUEST_DURATION = registry.register(Histogram("http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")))
+REQUESTS_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "Peticiones HTTP en curso", ("method",)))
+RESPONSE_SIZE = registry.register(Histogram("http_response_size_bytes", "Tamaño del cuerpo de las respuestas", ("method", "route"), SIZE_BUCKETS))
+UPSTREAM_QUERIES = registry.register(Counter("upstream_queries_total", "Queries a la base de datos", ("table", "operation", "outcome")))
+UPSTREAM_DURATION = registry.register(Histogram("upstream_query_duration_seconds", "Duración de las queries a la base de datos", ("table", "operation")))
+
+def observe_query(event) -> None:
+    """Query observer (see app.core.database.add_query_observer)"""
+    UPSTREAM_QUERIES.inc(event.table, event.operation, "ok" if event.ok else "error")
+    UPSTREAM_DURATION.observe(event.duration, event.table, event.operation)
+
+def sample_lines(name: str, kind: str, documentation: str, value: float) -> List[str]:
+    """Lines of a label-less counter or gauge for Registry.add_collector"""
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    # Sin plantilla (404) se agrupa todo para no crear una serie por URL
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (streaming responses are not buffered)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status = "500"
+        size = 0
+        streaming = False
+        # La ruta solo se conoce tras el enrutado: en curso se cuenta por método
+        REQUESTS_IN_FLIGHT.inc(method)
+
+        async def send_wrapper(message):
+            nonlocal status, size, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream") for name, value in message.get("headers", [])
+                )
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec(method)
+            route = _route_label(scope)
+            REQUESTS.inc(method, route, status)
+            if not streaming:
+                REQUEST_DURATION.observe(time.perf_counter() - started, method, route)
+            RESPONSE_SIZE.observe(size, method, route)
@@ -0,0 +1,574 @@
+"""
+Backend de almacenamiento embebido sobre SQLite.
+
+Implementa el mismo subconjunto del query builder de Supabase/PostgREST que
+usan los routers (table().select().eq()...execute()), de modo que la API
+puede servir desde un fichero local sin salto de red. El esquema replica el
+de supabase/migrations/20251117000004_reset_and_optimize_for_analytics.sql,
+incluidos sus índices compuestos y los triggers de updated_at, más las
+tablas y triggers de migraciones posteriores que usa la API. No hay
+funciones rpc(): la API ya no llama a ninguna.
+"""
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from postgrest.base_request_builder import APIResponse
+from postgrest.exceptions import APIError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT 1,
+    activity_type TEXT NOT NULL DEFAULT 'time' CHECK (activity_type IN ('time', 'count')),
+    target_unit TEXT DEFAULT 'horas',
+    display_order INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    deactivated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_activities_active ON activities(is_active);
+CREATE INDEX IF NOT EXISTS idx_activities_display_order ON activities(display_order);
+CREATE INDEX IF NOT EXISTS idx_activities_type ON activities(activity_type);
+CREATE INDEX IF NOT EXISTS idx_activities_created ON activities(created_at);
+
+CREATE TABLE IF NOT EXISTS daily_entries (
+    id TEXT PRIMARY KEY,
+    activity_id TEXT NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    entry_date TEXT NOT NULL,
+    value_amount REAL NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    UNIQUE(activity_id, entry_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_entries_date ON daily_entries(entry_date);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_activity ON daily_entries(activity_id);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_activity_date ON daily_entries(activity_id, entry_date);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_value ON daily_entries(value_amount);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_created ON daily_entries(created_at);
+
+CREATE TABLE IF NOT EXISTS weekly_goals (
+    id TEXT PRIMARY KEY,
+    activity_id TEXT NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    week_start_date TEXT NOT NULL,
+    target_value REAL NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    achieved BOOLEAN DEFAULT 0,
+    achieved_at TEXT,
+    UNIQUE(activity_id, week_start_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_week ON weekly_goals(week_start_date);
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_activity ON weekly_goals(activity_id);
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_activity_week ON weekly_goals(activity_id, week_start_date);
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_achieved ON weekly_goals(achieved);
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_target ON weekly_goals(target_value);
+
+CREATE TABLE IF NOT EXISTS activity_goals (
+    id TEXT PRIMARY KEY,
+    activity_id TEXT NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    week_start_date TEXT NOT NULL,
+    goal_text TEXT NOT NULL,
+    completed BOOLEAN DEFAULT 0,
+    display_order INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    completed_at TEXT,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    UNIQUE(activity_id, week_start_date, goal_text)
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_goals_activity ON activity_goals(activity_id);
+CREATE INDEX IF NOT EXISTS idx_activity_goals_week ON activity_goals(week_start_date);
+CREATE INDEX IF NOT EXISTS idx_activity_goals_activity_week ON activity_goals(activity_id, week_start_date);
+CREATE INDEX IF NOT EXISTS idx_activity_goals_completed ON activity_goals(completed);
+
+CREATE TABLE IF NOT EXISTS weekly_reflections (
+    id TEXT PRIMARY KEY,
+    activity_id TEXT NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    week_start_date TEXT NOT NULL,
+    reflection_text TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    UNIQUE(activity_id, week_start_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weekly_reflections_week ON weekly_reflections(week_start_date);
+CREATE INDEX IF NOT EXISTS idx_weekly_reflections_activity ON weekly_reflections(activity_id);
+
+-- 20251129_analytics_enhancements.sql
+CREATE TABLE IF NOT EXISTS milestones (
+    id TEXT PRIMARY KEY,
+    activity_id TEXT REFERENCES activities(id) ON DELETE CASCADE,
+    milestone_type TEXT NOT NULL CHECK (milestone_type IN ('streak', 'goal', 'record', 'other')),
+    title TEXT NOT NULL,
+    description TEXT,
+    achieved_at TEXT NOT NULL,
+    value_amount REAL,
+    metadata JSONB DEFAULT '{}',
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_milestones_activity ON milestones(activity_id);
+CREATE INDEX IF NOT EXISTS idx_milestones_type ON milestones(milestone_type);
+CREATE INDEX IF NOT EXISTS idx_milestones_achieved ON milestones(achieved_at);
+
+-- 20251128_timer_sync.sql
+CREATE TABLE IF NOT EXISTS timer_sync (
+    id TEXT PRIMARY KEY,
+    activity_id TEXT NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    activity_name TEXT NOT NULL,
+    for_date TEXT NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT 1,
+    start_time INTEGER NOT NULL,
+    paused_time INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+-- 20251201_activity_rollups.sql
+CREATE TABLE IF NOT EXISTS activity_rollups (
+    activity_id TEXT NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    period TEXT NOT NULL CHECK (period IN ('week', 'month')),
+    period_start TEXT NOT NULL,
+    total_value REAL NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    days_active INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+    PRIMARY KEY (activity_id, period, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_rollups_period ON activity_rollups(period, period_start);
+
+-- 20251203_delta_sync.sql
+CREATE INDEX IF NOT EXISTS idx_activities_sync ON activities(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_sync ON daily_entries(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_sync ON weekly_goals(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_weekly_reflections_sync ON weekly_reflections(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_activity_goals_sync ON activity_goals(updated_at, id);
+
+CREATE TABLE IF NOT EXISTS sync_deletions (
+    id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    table_name TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_deletions_sync ON sync_deletions(updated_at, id);
+
+-- Equivalente a update_updated_at_column() de la migración
+CREATE TRIGGER IF NOT EXISTS update_activities_updated_at AFTER UPDATE ON activities
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN UPDATE activities SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id; END;
+
+CREATE TRIGGER IF NOT EXISTS update_daily_entries_updated_at AFTER UPDATE ON daily_entries
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN UPDATE daily_entries SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id; END;
+
+CREATE TRIGGER IF NOT EXISTS update_weekly_goals_updated_at AFTER UPDATE ON weekly_goals
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN UPDATE weekly_goals SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id; END;
+
+CREATE TRIGGER IF NOT EXISTS update_weekly_reflections_updated_at AFTER UPDATE ON weekly_reflections
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN UPDATE weekly_reflections SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id; END;
+
+CREATE TRIGGER IF NOT EXISTS update_timer_sync_updated_at AFTER UPDATE ON timer_sync
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN UPDATE timer_sync SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id; END;
+
+CREATE TRIGGER IF NOT EXISTS update_activity_goals_updated_at AFTER UPDATE ON activity_goals
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN UPDATE activity_goals SET updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now') WHERE id = NEW.id; END;
+
+-- Equivalente a record_sync_deletion() de 20251203_delta_sync.sql
+CREATE TRIGGER IF NOT EXISTS record_activities_deletion AFTER DELETE ON activities
+    BEGIN INSERT INTO sync_deletions (table_name, row_id) VALUES ('activities', OLD.id); END;
+
+CREATE TRIGGER IF NOT EXISTS record_daily_entries_deletion AFTER DELETE ON daily_entries
+    BEGIN INSERT INTO sync_deletions (table_name, row_id) VALUES ('daily_entries', OLD.id); END;
+
+CREATE TRIGGER IF NOT EXISTS record_weekly_goals_deletion AFTER DELETE ON weekly_goals
+    BEGIN INSERT INTO sync_deletions (table_name, row_id) VALUES ('weekly_goals', OLD.id); END;
+
+CREATE TRIGGER IF NOT EXISTS record_weekly_reflections_deletion AFTER DELETE ON weekly_reflections
+    BEGIN INSERT INTO sync_deletions (table_name, row_id) VALUES ('weekly_reflections', OLD.id); END;
+
+CREATE TRIGGER IF NOT EXISTS record_activity_goals_deletion AFTER DELETE ON activity_goals
+    BEGIN INSERT INTO sync_deletions (table_name, row_id) VALUES ('activity_goals', OLD.id); END;
+
+-- Equivalente a sync_entry_rollups() de 20251204_rollup_triggers.sql
+CREATE TRIGGER IF NOT EXISTS sync_daily_entries_rollups_insert AFTER INSERT ON daily_entries
+    BEGIN
+        INSERT INTO activity_rollups (activity_id, period, period_start, total_value, entry_count, days_active)
+        VALUES (NEW.activity_id, 'week', date(NEW.entry_date, '-6 days', 'weekday 1'), NEW.value_amount, 1, NEW.value_amount > 0),
+               (NEW.activity_id, 'month', strftime('%Y-%m-01', NEW.entry_date), NEW.value_amount, 1, NEW.value_amount > 0)
+        ON CONFLICT (activity_id, period, period_start) DO UPDATE SET
+            total_value = total_value + excluded.total_value,
+            entry_count = entry_count + excluded.entry_count,
+            days_active = days_active + excluded.days_active,
+            updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+    END;
+
+CREATE TRIGGER IF NOT EXISTS sync_daily_entries_rollups_update AFTER UPDATE OF activity_id, entry_date, value_amount ON daily_entries
+    WHEN NEW.activity_id IS NOT OLD.activity_id OR NEW.entry_date IS NOT OLD.entry_date OR NEW.value_amount IS NOT OLD.value_amount
+    BEGIN
+        UPDATE activity_rollups SET
+            total_value = total_value - OLD.value_amount,
+            entry_count = entry_count - 1,
+            days_active = days_active - (OLD.value_amount > 0),
+            updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+        WHERE activity_id = OLD.activity_id
+          AND ((period = 'week' AND period_start = date(OLD.entry_date, '-6 days', 'weekday 1'))
+            OR (period = 'month' AND period_start = strftime('%Y-%m-01', OLD.entry_date)));
+        INSERT INTO activity_rollups (activity_id, period, period_start, total_value, entry_count, days_active)
+        VALUES (NEW.activity_id, 'week', date(NEW.entry_date, '-6 days', 'weekday 1'), NEW.value_amount, 1, NEW.value_amount > 0),
+               (NEW.activity_id, 'month', strftime('%Y-%m-01', NEW.entry_date), NEW.value_amount, 1, NEW.value_amount > 0)
+        ON CONFLICT (activity_id, period, period_start) DO UPDATE SET
+            total_value = total_value + excluded.total_value,
+            entry_count = entry_count + excluded.entry_count,
+            days_active = days_active + excluded.days_active,
+            updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now');
+    END;
+
+CREATE TRIGGER IF NOT EXISTS sync_daily_entries_rollups_delete AFTER DELETE ON daily_entries
+    BEGIN
+        UPDATE activity_rollups SET
+            total_value = total_value - OLD.value_amount,
+            entry_count = entry_count - 1,
+            days_active = days_active - (OLD.value_amount > 0),
+            updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+        WHERE activity_id = OLD.activity_id
+          AND ((period = 'week' AND period_start = date(OLD.entry_date, '-6 days', 'weekday 1'))
+            OR (period = 'month' AND period_start = strftime('%Y-%m-01', OLD.entry_date)));
+    END;
+"""
+
+# Columnas añadidas por migraciones a tablas que ya existían: (tabla, columna, relleno)
+ADDED_COLUMNS = (
+    ("activity_goals", "updated_at", "UPDATE activity_goals SET updated_at = COALESCE(completed_at, created_at)"),
+)
+
+def _add_missing_columns(connection: sqlite3.Connection) -> None:
+    """ALTER TABLE for files created before a column existed (CREATE TABLE IF NOT EXISTS skips them)"""
+    for table, column, backfill in ADDED_COLUMNS:
+        existing = {row[1] for row in connection.execute(f'PRAGMA table_info("{table}")').fetchall()}
+        if existing and column not in existing:
+            connection.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" TEXT')
+            connection.execute(backfill)
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Campo de una columna JSONB como en PostgREST: metadata->>week_start_date
+_JSON_FIELD = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)->>([A-Za-z_][A-Za-z0-9_]*)$")
+
+# Operadores de PostgREST admitidos dentro de or_()
+_LOGIC_OPERATORS = {"eq": "=", "neq": "IS NOT", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+def _split_logic(body: str) -> List[str]:
+    """Split a PostgREST logic tree body on its top-level commas"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in body:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+def _integrity_code(message: str) -> str:
+    """Map a SQLite constraint error to the PostgreSQL SQLSTATE PostgREST reports"""
+    if "FOREIGN KEY" in message:
+        return "23503"
+    if "NOT NULL" in message:
+        return "23502"
+    if "CHECK" in message:
+        return "23514"
+    return "23505"
+
+class SQLiteQueryBuilder:
+    """Subset of the postgrest-py request builder executed against SQLite"""
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        self._client = client
+        self._table = table
+        self._columns = client.columns(table)
+        self._action = "select"
+        self._select: List[str] = []
+        self._payload: Union[dict, list, None] = None
+        self._on_conflict: List[str] = []
+        self._ignore_duplicates = False
+        self._count: Optional[str] = None
+        self._where: List[Tuple[str, list]] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    # --- acciones ---
+
+    def select(self, *columns: str, count: Optional[str] = None, head: Optional[bool] = None):
+        self._action = "select"
+        self._count = count
+        names = [name.strip() for column in (columns or ("*",)) for name in column.split(",")]
+        self._select = [] if "*" in names else [self._column(name) for name in names if name]
+        return self
+
+    def insert(self, json: Union[dict, list], *, count: Optional[str] = None, returning: Any = None, upsert: bool = False, default_to_null: bool = True):
+        return self.upsert(json, count=count) if upsert else self._write("insert", json, count)
+
+    def upsert(self, json: Union[dict, list], *, count: Optional[str] = None, returning: Any = None, ignore_duplicates: bool = False, on_conflict: str = "", default_to_null: bool = True):
+        self._write("upsert", json, count)
+        self._ignore_duplicates = ignore_duplicates
+        self._on_conflict = [self._column(name.strip()) for name in on_conflict.split(",") if name.strip()] or ["id"]
+        return self
+
+    def update(self, json: dict, *, count: Optional[str] = None, returning: Any = None):
+        return self._write("update", json, count)
+
+    def delete(self, *, count: Optional[str] = None, returning: Any = None):
+        return self._write("delete", None, count)
+
+    def _write(self, action: str, payload, count):
+        self._action = action
+        self._payload = payload
+        self._count = count
+        return self
+
+    # --- filtros ---
+
+    def eq(self, column: str, value: Any):
+        return self._filter(f"{self._column(column)} = ?", [value])
+
+    def neq(self, column: str, value: Any):
+        return self._filter(f"{self._column(column)} IS NOT ?", [value])
+
+    def gt(self, column: str, value: Any):
+        return self._filter(f"{self._column(column)} > ?", [value])
+
+    def gte(self, column: str, value: Any):
+        return self._filter(f"{self._column(column)} >= ?", [value])
+
+    def lt(self, column: str, value: Any):
+        return self._filter(f"{self._column(column)} < ?", [value])
+
+    def lte(self, column: str, value: Any):
+        return self._filter(f"{self._column(column)} <= ?", [value])
+
+    def is_(self, column: str, value: Any):
+        value = None if value in (None, "null") else value
+        return self._filter(f"{self._column(column)} IS ?", [value])
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if not values:
+            return self._filter("0", [])
+        placeholders = ", ".join("?" for _ in values)
+        return self._filter(f"{self._column(column)} IN ({placeholders})", values)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None):
+        clause, params = self._logic("or", filters)
+        return self._filter(clause, params)
+
+    def _logic(self, operator: str, body: str) -> Tuple[str, list]:
+        # Árbol lógico de PostgREST: "a.lt.1,and(a.eq.1,b.lt.2)"
+        clauses, params = [], []
+        for item in _split_logic(body):
+            nested = re.match(r"^(and|or)\((.*)\)$", item.strip())
+            if nested:
+                clause, nested_params = self._logic(nested.group(1), nested.group(2))
+                clauses.append(clause)
+                params.extend(nested_params)
+                continue
+            parts = item.strip().split(".", 2)
+            if len(parts) != 3 or parts[1] not in _LOGIC_OPERATORS:
+                raise APIError({"message": f"failed to parse logic tree ({body})", "code": "PGRST100", "hint": None, "details": None})
+            column, operation, value = parts
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            clauses.append(f"{self._column(column)} {_LOGIC_OPERATORS[operation]} ?")
+            params.append(value)
+        return "(" + f" {operator.upper()} ".join(clauses) + ")", params
+
+    def _filter(self, clause: str, params: list):
+        self._where.append((clause, params))
+        return self
+
+    # --- modificadores ---
+
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool = False, foreign_table: Optional[str] = None):
+        # Mismo orden de nulos que PostgreSQL: últimos en ASC, primeros en DESC
+        nulls = "FIRST" if nullsfirst or desc else "LAST"
+        self._order.append(f"{self._column(column)} {'DESC' if desc else 'ASC'} NULLS {nulls}")
+        return self
+
+    def limit(self, size: int, *, foreign_table: Optional[str] = None):
+        self._limit = int(size)
+        return self
+
+    def range(self, start: int, end: int, foreign_table: Optional[str] = None):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # --- ejecución ---
+
+    async def execute(self) -> APIResponse:
+        try:
+            with self._client.lock:
+                data, count = getattr(self, f"_execute_{self._action}")()
+        except sqlite3.IntegrityError as error:
+            raise APIError({"message": str(error), "code": _integrity_code(str(error)), "hint": None, "details": None})
+        except sqlite3.Error as error:
+            raise APIError({"message": str(error), "code": "PGRST000", "hint": None, "details": None})
+        return APIResponse(data=data, count=count)
+
+    def _column(self, name: str) -> str:
+        field = _JSON_FIELD.match(name)
+        if field:
+            return f"json_extract({self._column(field.group(1))}, '$.{field.group(2)}')"
+        if not _IDENTIFIER.match(name) or name not in self._columns:
+            raise APIError({"message": f"column {self._table}.{name} does not exist", "code": "42703", "hint": None, "details": None})
+        return f'"{name}"'
+
+    def _where_sql(self) -> Tuple[str, list]:
+        if not self._where:
+            return "", []
+        params = [param for _, clause_params in self._where for param in clause_params]
+        return " WHERE " + " AND ".join(clause for clause, _ in self._where), params
+
+    def _count_rows(self) -> Optional[int]:
+        if not self._count:
+            return None
+        where, params = self._where_sql()
+        return self._client.connection.execute(f'SELECT COUNT(*) FROM "{self._table}"{where}', params).fetchone()[0]
+
+    def _execute_select(self):
+        columns = ", ".join(self._select) or "*"
+        where, params = self._where_sql()
+        sql = f'SELECT {columns} FROM "{self._table}"{where}'
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None or self._offset is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [-1 if self._limit is None else self._limit, self._offset or 0]
+        rows = self._client.connection.execute(sql, params).fetchall()
+        return [self._client.to_dict(self._table, row) for row in rows], self._count_rows()
+
+    def _execute_insert(self):
+        return self._insert_rows(upsert=False)
+
+    def _execute_upsert(self):
+        return self._insert_rows(upsert=True)
+
+    def _insert_rows(self, upsert: bool):
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        target = ", ".join(self._on_conflict)
+        connection = self._client.connection
+        result = []
+        with connection:
+            for row in rows:
+                row = dict(row)
+                columns = [self._column(name) for name in row]
+                updates = [column for column in columns if column.strip('"') not in self._on_conflict and column != '"id"']
+                if "id" not in row and "id" in self._columns:
+                    # En conflicto se conserva el id existente (igual que PostgREST)
+                    row["id"] = str(uuid.uuid4())
+                    columns.append('"id"')
+
+                sql = f'INSERT INTO "{self._table}" ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})'
+                if upsert and self._ignore_duplicates:
+                    sql += f" ON CONFLICT({target}) DO NOTHING"
+                elif upsert:
+                    # Sin columnas que actualizar se reescribe la clave para devolver la fila
+                    assignments = [f"{column} = excluded.{column}" for column in updates or [f'"{self._on_conflict[0]}"']]
+                    sql += f" ON CONFLICT({target}) DO UPDATE SET " + ", ".join(assignments + self._touch_updated_at(row))
+                fetched = connection.execute(sql + " RETURNING *", self._client.encode(self._table, row)).fetchone()
+                if fetched is not None:
+                    result.append(self._client.to_dict(self._table, fetched))
+        return result, len(result) if self._count else None
+
+    def _touch_updated_at(self, payload: dict) -> List[str]:
+        # Igual que el trigger update_updated_at_column(), pero visible en RETURNING
+        if "updated_at" in self._columns and "updated_at" not in payload:
+            return [f"\"updated_at\" = {_NOW}"]
+        return []
+
+    def _execute_update(self):
+        assignments = ", ".join([f"{self._column(name)} = ?" for name in self._payload] + self._touch_updated_at(self._payload))
+        where, params = self._where_sql()
+        sql = f'UPDATE "{self._table}" SET {assignments}{where} RETURNING *'
+        with self._client.connection:
+            rows = self._client.connection.execute(sql, self._client.encode(self._table, self._payload) + params).fetchall()
+        data = [self._client.to_dict(self._table, row) for row in rows]
+        return data, len(data) if self._count else None
+
+    def _execute_delete(self):
+        where, params = self._where_sql()
+        with self._client.connection:
+            rows = self._client.connection.execute(f'DELETE FROM "{self._table}"{where} RETURNING *', params).fetchall()
+        data = [self._client.to_dict(self._table, row) for row in rows]
+        return data, len(data) if self._count else None
+
+class SQLiteClient:
+    """Embedded drop-in for the Supabase AsyncClient table API"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA busy_timeout = 5000")
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+        _add_missing_columns(self.connection)
+        self.connection.executescript(SCHEMA)
+        self._columns: Dict[str, List[str]] = {}
+        self._booleans: Dict[str, set] = {}
+        self._json: Dict[str, set] = {}
+        for (table,) in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+            info = self.connection.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self._columns[table] = [column["name"] for column in info]
+            self._booleans[table] = {column["name"] for column in info if column["type"].upper() == "BOOLEAN"}
+            self._json[table] = {column["name"] for column in info if column["type"].upper() == "JSONB"}
+
+    def table(self, table_name: str) -> SQLiteQueryBuilder:
+        return SQLiteQueryBuilder(self, table_name)
+
+    def from_(self, table_name: str) -> SQLiteQueryBuilder:
+        return self.table(table_name)
+
+    def columns(self, table: str) -> List[str]:
+        if table not in self._columns:
+            raise APIError({"message": f'relation "{table}" does not exist', "code": "42P01", "hint": None, "details": None})
+        return self._columns[table]
+
+    def to_dict(self, table: str, row: sqlite3.Row) -> dict:
+        data = dict(row)
+        for column in self._booleans[table]:
+            if data.get(column) is not None:
+                data[column] = bool(data[column])
+        for column in self._json[table]:
+            if data.get(column) is not None:
+                data[column] = json.loads(data[column])
+        return data
+
+    def encode(self, table: str, row: dict) -> list:
+        """Parameter values of a written row (JSONB columns are stored as text)"""
+        return [json.dumps(value) if name in self._json[table] and value is not None else value for name, value in row.items()]
+
+    def close(self) -> None:
+        self.connection.close()
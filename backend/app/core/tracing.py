@@ -0,0 +1,155 @@
+"""
+Trazas de las queries de cada petición.
+
+TracingMiddleware abre una RequestTrace para una fracción de las peticiones
+(TRACE_SAMPLE_RATE; todas en desarrollo) y record_query, registrado como
+observador del cliente compartido, le añade cada query: tabla, operación,
+filtros, filas y duración. Las tareas lanzadas con asyncio.gather heredan
+el contexto, así que las queries en paralelo también se cuentan.
+
+Con la petición trazada:
+- en desarrollo o con SERVER_TIMING=true se añade la cabecera Server-Timing
+  con el tiempo de base de datos por tabla;
+- si tarda más de SLOW_REQUEST_THRESHOLD_MS se escribe una línea JSON en el
+  log "app.slow_requests" con el desglose de todas sus queries.
+
+Sin traza activa, record_query solo consulta una ContextVar.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import QueryEvent
+
+logger = logging.getLogger("app.slow_requests")
+
+# Valores de in_() a partir de los cuales solo se registra cuántos hay
+MAX_LOGGED_VALUES = 5
+
+class RequestTrace:
+    __slots__ = ("method", "path", "started", "queries", "closed")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries: List[QueryEvent] = []
+        self.closed = False
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def by_table(self) -> Dict[str, List[float]]:
+        """{table: [queries, total ms]} in first-use order"""
+        tables: Dict[str, List[float]] = {}
+        for query in self.queries:
+            entry = tables.setdefault(query.table, [0, 0.0])
+            entry[0] += 1
+            entry[1] += query.duration * 1000
+        return tables
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+def record_query(event: QueryEvent) -> None:
+    """Query observer (see app.core.database.add_query_observer)"""
+    trace = _current_trace.get()
+    # Las tareas en segundo plano heredan la traza aunque la petición ya haya terminado
+    if trace is not None and not trace.closed:
+        trace.queries.append(event)
+
+def _format_value(value) -> str:
+    if isinstance(value, (list, tuple, set)):
+        if len(value) > MAX_LOGGED_VALUES:
+            return f"<{len(value)} values>"
+        return "[" + ",".join(str(item) for item in value) + "]"
+    return str(value)
+
+def describe_filters(filters) -> str:
+    """Readable form of QueryEvent.filters, e.g. "eq(period,week) in_(activity_id,<40 values>)" """
+    calls = []
+    for name, args, kwargs in filters:
+        arguments = [_format_value(arg) for arg in args]
+        arguments.extend(f"{key}={_format_value(value)}" for key, value in kwargs.items())
+        calls.append(f"{name}({','.join(arguments)})")
+    return " ".join(calls)
+
+def server_timing(trace: RequestTrace) -> str:
+    """Server-Timing value: total database time plus one metric per table"""
+    tables = trace.by_table()
+    parts = [f'db;dur={sum(ms for _, ms in tables.values()):.1f};desc="{len(trace.queries)} queries"']
+    parts.extend(f'{table};dur={ms:.1f};desc="{count} queries"' for table, (count, ms) in tables.items())
+    parts.append(f"app;dur={trace.elapsed_ms():.1f}")
+    return ", ".join(parts)
+
+def slow_request_record(trace: RequestTrace, route: Optional[str], status: int, duration_ms: float) -> dict:
+    return {
+        "method": trace.method,
+        "path": trace.path,
+        "route": route,
+        "status": status,
+        "duration_ms": round(duration_ms, 2),
+        "db_ms": round(sum(query.duration for query in trace.queries) * 1000, 2),
+        "query_count": len(trace.queries),
+        "queries": [
+            {
+                "table": query.table,
+                "operation": query.operation,
+                "filters": describe_filters(query.filters),
+                "rows": query.rows,
+                "duration_ms": round(query.duration * 1000, 2),
+                "ok": query.ok,
+            }
+            for query in trace.queries
+        ],
+    }
+
+class TracingMiddleware:
+    """Pure ASGI middleware that opens a RequestTrace for sampled requests"""
+
+    def __init__(self, app):
+        self.app = app
+        debug = settings.ENVIRONMENT == "development"
+        self.sample_rate = 1.0 if debug else settings.TRACE_SAMPLE_RATE
+        self.server_timing = debug or settings.SERVER_TIMING
+        self.slow_threshold_ms = settings.SLOW_REQUEST_THRESHOLD_MS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Las conexiones SSE duran lo que el cliente quiera: no son peticiones lentas
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream") for name, value in message.get("headers", [])
+                )
+                if self.server_timing:
+                    # En respuestas en streaming solo incluye las queries previas a la cabecera
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(trace).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            trace.closed = True
+            _current_trace.reset(token)
+            duration_ms = trace.elapsed_ms()
+            if duration_ms >= self.slow_threshold_ms and not streaming:
+                route = getattr(scope.get("route"), "path", None)
+                logger.warning(json.dumps(slow_request_record(trace, route, status, duration_ms), ensure_ascii=False))
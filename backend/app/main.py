@@ -1,11 +1,58 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import activities, entries, goals, reflections, dashboard
+from fastapi.responses import PlainTextResponse
+from app.api import activities, analytics, entries, goals, reflections, dashboard, heatmap, sync, timers, transfer
+from app.core.cache import dashboard_cache
+from app.core.config import settings
+from app.core.database import add_query_observer, close_supabase, get_supabase, ping_supabase, warm_up_supabase
+from app.core.metrics import MetricsMiddleware, observe_query, registry, sample_lines
+from app.core.tracing import TracingMiddleware, record_query
+from app.core.responses import FastJSONResponse
+from app.services.entry_buffer import entry_buffer
+from app.services.goals import goal_evaluator
+from app.services.history_index import history_index
+from app.services.timers import timer_hub
+
+logger = logging.getLogger(__name__)
+
+# Tiempo máximo de la query de comprobación de /health y del arranque (segundos)
+HEALTH_CHECK_TIMEOUT = 2.0
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Crear el cliente y abrir la primera conexión antes de aceptar peticiones
+    if await warm_up_supabase(HEALTH_CHECK_TIMEOUT) is None:
+        logger.warning("La base de datos no responde al arrancar (%s)", settings.STORAGE_BACKEND)
+    # Reintentar las entradas que no se pudieron escribir en el último apagado
+    try:
+        await entry_buffer.recover()
+    except Exception:
+        logger.exception("No se pudieron reintentar las entradas guardadas en %s", settings.ENTRY_SPILL_PATH)
+    if history_index.enabled:
+        try:
+            entries = await history_index.load(await get_supabase())
+            logger.info("Índice del historial cargado: %d entradas", entries)
+        except Exception:
+            # Sin índice el dashboard y el análisis consultan las entradas como siempre
+            logger.exception("No se pudo cargar el índice del historial")
+    yield
+    # Escribir las entradas aceptadas antes de evaluar metas y cerrar el cliente
+    await entry_buffer.drain()
+    # Evaluar las metas y guardar los cronómetros pendientes antes de cerrar el cliente
+    await goal_evaluator.flush()
+    await timer_hub.flush()
+    # Cerrar el pool de conexiones HTTP al apagar el servidor
+    await close_supabase()
 
 app = FastAPI(
     title="Momentum Tracker API",
     description="API para seguimiento de hábitos y objetivos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configurar CORS para permitir requests desde React
@@ -20,14 +67,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing"],
 )
 
+# Trazas de queries por petición: Server-Timing y log de peticiones lentas
+app.add_middleware(TracingMiddleware)
+add_query_observer(record_query)
+
+# Métricas: latencia por ruta y queries por tabla (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+add_query_observer(observe_query)
+
+def _service_metrics():
+    cache = dashboard_cache.stats()
+    buffer = entry_buffer.stats()
+    return (
+        sample_lines("dashboard_cache_hits_total", "counter", "Aciertos de la caché del dashboard", cache["hits"])
+        + sample_lines("dashboard_cache_misses_total", "counter", "Fallos de la caché del dashboard", cache["misses"])
+        + sample_lines("dashboard_cache_entries", "gauge", "Semanas en la caché del dashboard", cache["size"])
+        + sample_lines("entry_buffer_pending", "gauge", "Entradas aceptadas pendientes de escribir", buffer["pending"])
+        + sample_lines("entry_buffer_flushes_total", "counter", "Escrituras del buffer de entradas", buffer["flushes"])
+        + sample_lines("entry_buffer_refused_total", "counter", "Escrituras rechazadas con 503 por el buffer lleno", buffer["refused"])
+        + sample_lines("entry_buffer_rejected_total", "counter", "Entradas aceptadas que la base de datos rechazó al escribir", buffer["rejected"])
+        + sample_lines("history_index_bytes", "gauge", "Memoria de los arrays del índice del historial", history_index.memory_bytes())
+    )
+
+registry.add_collector(_service_metrics)
+
 # Incluir routers
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(activities.router, prefix="/api/activities", tags=["Activities"])
 app.include_router(entries.router, prefix="/api/entries", tags=["Daily Entries"])
 app.include_router(goals.router, prefix="/api/goals", tags=["Weekly Goals"])
 app.include_router(reflections.router, prefix="/api/reflections", tags=["Weekly Reflections"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(heatmap.router, prefix="/api/heatmap", tags=["Analytics"])
+app.include_router(timers.router, prefix="/api/timers", tags=["Timers"])
+app.include_router(sync.router, prefix="/api/sync", tags=["Sync"])
+app.include_router(transfer.router, prefix="/api", tags=["Export / Import"])
 
 @app.get("/")
 async def root():
@@ -37,6 +114,25 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of this process"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """Liveness plus a one-row query to check the database is reachable"""
+    upstream = {"reachable": True, "latency_ms": None, "error": None}
+    try:
+        upstream["latency_ms"] = round(await ping_supabase(HEALTH_CHECK_TIMEOUT) * 1000, 2)
+    except asyncio.TimeoutError:
+        upstream.update(reachable=False, error=f"timeout after {HEALTH_CHECK_TIMEOUT:g}s")
+    except Exception as error:
+        upstream.update(reachable=False, error=str(error) or type(error).__name__)
+
+    body = {
+        "status": "healthy" if upstream["reachable"] else "unhealthy",
+        "backend": settings.STORAGE_BACKEND,
+        "upstream": upstream,
+    }
+    return FastJSONResponse(body, status_code=200 if upstream["reachable"] else 503)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 
 class ActivityBase(BaseModel):
     name: str
@@ -44,6 +44,8 @@ class WeeklyGoalCreate(WeeklyGoalBase):
 class WeeklyGoal(WeeklyGoalBase):
     id: str
     created_at: datetime
+    achieved: bool = False
+    achieved_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -62,3 +64,67 @@ class WeeklyReflection(WeeklyReflectionBase):
 
     class Config:
         from_attributes = True
+
+class BatchItemResult(BaseModel):
+    index: int  # Posición del elemento en la lista enviada
+    status: Literal["ok", "error", "skipped"]
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchResult(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+# Filas de /api/import: conservan el id exportado para que las referencias
+# entre tablas sigan valiendo (updated_at lo fija la base de datos)
+class ActivityImport(ActivityBase):
+    id: str
+    display_order: int = 0
+    created_at: str  # ordena las actividades en el dashboard
+    deactivated_at: Optional[str] = None
+
+class DailyEntryImport(DailyEntryBase):
+    id: str
+
+class WeeklyGoalImport(WeeklyGoalBase):
+    id: str
+
+class WeeklyReflectionImport(WeeklyReflectionBase):
+    id: str
+    reflection_text: Optional[str] = None
+
+class ActivityGoalImport(BaseModel):
+    id: str
+    activity_id: str
+    week_start_date: str
+    goal_text: str
+    completed: bool = False
+    display_order: int = 0
+    completed_at: Optional[str] = None
+
+class RolloverResult(BaseModel):
+    week_start_date: str
+    goals_copied: int
+    activity_goals_copied: int
+
+class TimerBase(BaseModel):
+    activity_id: str
+    activity_name: str
+    for_date: str
+    is_active: bool = True
+    start_time: int  # Timestamp en milisegundos
+    paused_time: int = 0  # Segundos acumulados en pausa
+
+class TimerCreate(TimerBase):
+    pass
+
+class TimerUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    start_time: Optional[int] = None
+    paused_time: Optional[int] = None
+
+class Timer(TimerBase):
+    id: str
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,466 @@
+"""
+Motor de análisis en proceso sobre una matriz densa actividad x día.
+
+Las funciones SQL de las migraciones (get_current_streak, get_longest_streak,
+get_moving_average, get_weekday_patterns, get_activity_stats, compare_periods) se llaman una
+vez por actividad y algunas iteran día a día con una query por iteración.
+Aquí se lee el historial de entradas de todas las actividades con un único
+recorrido paginado y se calcula todo con operaciones vectorizadas de NumPy.
+
+Los resultados reproducen los de las funciones SQL, incluidos la suma en
+float4 de SUM(REAL) y el redondeo a REAL (float32) de sus columnas de
+salida; tests/test_analytics.py los compara con una traducción fila a fila
+de las funciones sobre un fixture común.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.database import fetch_all, iter_keyset_pages
+from app.services.history_index import ActivitySeries, history_index
+from app.services.rollups import read_trends
+
+# Mismos nombres que get_weekday_patterns (EXTRACT(DOW): 0 = domingo)
+WEEKDAY_NAMES = ("Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado")
+
+def _real(value) -> float:
+    """Round to PostgreSQL REAL (float32) and back to the shortest float that prints the same"""
+    return float(str(np.float32(value)))
+
+def real_sums(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    SUM(value_amount) per row over the masked days: sum(real) keeps a REAL
+    (float4) running total, so it is accumulated in float32 in date order.
+    """
+    masked = np.where(mask, values, 0.0).astype(np.float32)
+    if masked.shape[1] == 0:
+        return np.zeros(masked.shape[0], dtype=np.float32)
+    return np.cumsum(masked, axis=1, dtype=np.float32)[:, -1]
+
+class EntryMatrix:
+    """
+    Daily entries of several activities as dense (activities x days) arrays.
+
+    values[a, d] holds the value_amount of activity a on first_day + d and
+    present[a, d] tells whether that entry exists (an entry of 0 is not the
+    same as no entry for counts and averages).
+    """
+
+    def __init__(self, activity_ids: Sequence[str], rows: Sequence[dict], last_day: Optional[date] = None):
+        self.activity_ids = list(activity_ids)
+        index = {activity_id: position for position, activity_id in enumerate(self.activity_ids)}
+        rows = [row for row in rows if row["activity_id"] in index]
+
+        ordinals = np.array([date.fromisoformat(row["entry_date"]).toordinal() for row in rows], dtype=np.int64)
+        first = int(ordinals.min()) if rows else (last_day or date.today()).toordinal()
+        last = max(int(ordinals.max()) if rows else first, last_day.toordinal() if last_day else first)
+
+        self.first_ordinal = first
+        self.n_days = last - first + 1
+        self.values = np.zeros((len(self.activity_ids), self.n_days), dtype=np.float64)
+        self.present = np.zeros((len(self.activity_ids), self.n_days), dtype=bool)
+        if rows:
+            activity_index = np.array([index[row["activity_id"]] for row in rows], dtype=np.int64)
+            # value_amount es REAL en PostgreSQL: se suma como float32 promovido a double
+            amounts = np.array([row["value_amount"] for row in rows], dtype=np.float32).astype(np.float64)
+            self.values[activity_index, ordinals - first] = amounts
+            self.present[activity_index, ordinals - first] = True
+
+    @classmethod
+    def from_history(cls, activity_ids: Sequence[str], series: Sequence[Optional[ActivitySeries]], last_day: Optional[date] = None) -> "EntryMatrix":
+        """Same matrix built from history index series (one array copy per activity)"""
+        matrix = cls(activity_ids, [], last_day)
+        stored = [item for item in series if item is not None and item.values]
+        if stored:
+            first = min(item.first_ordinal for item in stored)
+            last = max([item.last_ordinal for item in stored] + ([last_day.toordinal()] if last_day else []))
+            matrix.first_ordinal = first
+            matrix.n_days = last - first + 1
+            matrix.values = np.zeros((len(matrix.activity_ids), matrix.n_days), dtype=np.float64)
+            matrix.present = np.zeros((len(matrix.activity_ids), matrix.n_days), dtype=bool)
+            for row, item in enumerate(series):
+                if item is not None and item.values:
+                    columns = slice(item.first_ordinal - first, item.last_ordinal - first + 1)
+                    # Mismo redondeo a REAL que al leer las filas
+                    matrix.values[row, columns] = np.frombuffer(item.values, dtype=np.float64).astype(np.float32)
+                    matrix.present[row, columns] = np.frombuffer(item.present, dtype=bool)
+        return matrix
+
+    def day(self, column: int) -> date:
+        return date.fromordinal(self.first_ordinal + int(column))
+
+    def column(self, day: date) -> int:
+        """Column of day, clipped to [-1, n_days] for days outside the matrix"""
+        return min(max(day.toordinal() - self.first_ordinal, -1), self.n_days)
+
+    def weekdays(self) -> np.ndarray:
+        """EXTRACT(DOW) of every column (0 = Sunday); date.toordinal() of a Monday is 1 mod 7"""
+        return (self.first_ordinal + np.arange(self.n_days)) % 7
+
+def current_streaks(matrix: EntryMatrix, as_of: date) -> np.ndarray:
+    """
+    Days in a row with value > 0 ending on as_of, per activity
+    (get_current_streak with CURRENT_DATE = as_of).
+    """
+    end = matrix.column(as_of)
+    if end < 0 or end >= matrix.n_days:
+        return np.zeros(len(matrix.activity_ids), dtype=np.int64)
+    positive = (matrix.present & (matrix.values > 0))[:, : end + 1][:, ::-1]
+    # Posición del primer día sin entrada contando hacia atrás; toda la fila si no hay ninguno
+    broken = ~positive
+    return np.where(broken.any(axis=1), broken.argmax(axis=1), end + 1)
+
+def longest_streaks(matrix: EntryMatrix) -> List[Tuple[int, Optional[date], Optional[date]]]:
+    """
+    (longest_streak, streak_start_date, streak_end_date) per activity, like
+    get_longest_streak: the earliest run wins on ties, (0, None, None) without data.
+    """
+    positive = matrix.present & (matrix.values > 0)
+    padded = np.zeros((len(matrix.activity_ids), matrix.n_days + 2), dtype=np.int8)
+    padded[:, 1:-1] = positive
+    edges = np.diff(padded, axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+
+    result: List[Tuple[int, Optional[date], Optional[date]]] = [(0, None, None)] * len(matrix.activity_ids)
+    if len(starts) == 0:
+        return result
+
+    # Las rachas salen en orden fila-columna, así que inicios y finales se emparejan
+    rows, start_columns = starts[:, 0], starts[:, 1]
+    lengths = ends[:, 1] - start_columns
+    order = np.lexsort((start_columns, -lengths, rows))
+    _, first_of_row = np.unique(rows[order], return_index=True)
+    for run in order[first_of_row]:
+        result[rows[run]] = (
+            int(lengths[run]),
+            matrix.day(start_columns[run]),
+            matrix.day(start_columns[run] + lengths[run] - 1),
+        )
+    return result
+
+def moving_averages(matrix: EntryMatrix, days: int, end_date: date) -> List[List[dict]]:
+    """
+    Trailing moving average per activity and entry date up to end_date.
+
+    moving_avg is the mean of the entries in (entry_date - days, entry_date],
+    which is what the LEFT JOIN of get_moving_average selects. The SQL version
+    also applies a ROWS window over the joined rows, which repeats each date
+    once per joined entry; that duplication is not reproduced.
+    """
+    end = min(matrix.column(end_date), matrix.n_days - 1)
+    if end < 0:
+        return [[] for _ in matrix.activity_ids]
+
+    present = matrix.present[:, : end + 1]
+    values = np.where(present, matrix.values[:, : end + 1], 0.0)
+    # Sumas acumuladas con un cero delante: ventana (d - days, d] = c[d + 1] - c[d + 1 - days]
+    sums = np.concatenate([np.zeros((len(matrix.activity_ids), 1)), np.cumsum(values, axis=1)], axis=1)
+    counts = np.concatenate([np.zeros((len(matrix.activity_ids), 1), dtype=np.int64), np.cumsum(present, axis=1)], axis=1)
+    upper = np.arange(1, end + 2)
+    lower = np.maximum(upper - days, 0)
+    window_sums = sums[:, upper] - sums[:, lower]
+    window_counts = counts[:, upper] - counts[:, lower]
+
+    series = []
+    for row in range(len(matrix.activity_ids)):
+        columns = np.flatnonzero(present[row])
+        series.append([
+            {
+                "entry_date": matrix.day(column).isoformat(),
+                "daily_value": _real(matrix.values[row, column]),
+                "moving_avg": _real(window_sums[row, column] / window_counts[row, column]),
+            }
+            for column in columns
+        ])
+    return series
+
+def weekday_patterns(matrix: EntryMatrix, start_date: Optional[date], end_date: date) -> List[List[dict]]:
+    """get_weekday_patterns for every activity: only weekdays with entries, ordered by DOW"""
+    first = max(matrix.column(start_date), 0) if start_date else 0
+    last = min(matrix.column(end_date), matrix.n_days - 1)
+    window = slice(first, last + 1) if last >= first else slice(0, 0)
+
+    present = matrix.present[:, window]
+    values = np.where(present, matrix.values[:, window], 0.0)
+    weekdays = matrix.weekdays()[window]
+    by_weekday = np.stack([weekdays == day for day in range(7)], axis=1).astype(np.float64)  # (días, 7)
+    counts = present.astype(np.float64) @ by_weekday
+    sums = values @ by_weekday
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = (sums / counts).astype(np.float32)
+    best = np.where(counts > 0, averages, -np.inf).max(axis=1)
+
+    patterns = []
+    for row in range(len(matrix.activity_ids)):
+        patterns.append([
+            {
+                "weekday": day,
+                "weekday_name": WEEKDAY_NAMES[day],
+                "avg_value": _real(averages[row, day]),
+                "total_entries": int(counts[row, day]),
+                "best_day": bool(averages[row, day] == best[row]),
+            }
+            for day in range(7)
+            if counts[row, day] > 0
+        ])
+    return patterns
+
+def activity_stats(matrix: EntryMatrix, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[dict]:
+    """
+    get_activity_stats for every activity. Without start/end the range of
+    each activity runs from its first to its last entry.
+    """
+    present = matrix.present
+    has_data = present.any(axis=1)
+    first_entry = np.where(has_data, present.argmax(axis=1), -1)
+    last_entry = np.where(has_data, matrix.n_days - 1 - present[:, ::-1].argmax(axis=1), -1)
+
+    starts = np.full(len(matrix.activity_ids), start_date.toordinal() - matrix.first_ordinal) if start_date else first_entry
+    ends = np.full(len(matrix.activity_ids), end_date.toordinal() - matrix.first_ordinal) if end_date else last_entry
+    # Sin entradas y sin fechas explícitas el rango de la función SQL es NULL
+    defined = (has_data | (start_date is not None)) & (has_data | (end_date is not None))
+
+    columns = np.arange(matrix.n_days)
+    in_range = present & (columns >= starts[:, None]) & (columns <= ends[:, None]) & defined[:, None]
+    counts = in_range.sum(axis=1)
+    totals = real_sums(matrix.values, in_range)
+    # AVG(real) acumula en double
+    sums = np.where(in_range, matrix.values, 0.0).sum(axis=1)
+    maxima = np.where(in_range, matrix.values, -np.inf).max(axis=1)
+
+    stats = []
+    for row in range(len(matrix.activity_ids)):
+        count = int(counts[row])
+        total_days = int(ends[row] - starts[row] + 1) if defined[row] else None
+        consistency = 0.0
+        if total_days and total_days > 0:
+            # count::REAL / total_days::REAL * 100 se evalúa en float4
+            consistency = _real(np.float32(count) / np.float32(total_days) * np.float32(100))
+        stats.append({
+            "total_value": _real(totals[row]),
+            "avg_daily_value": _real(sums[row] / count) if count else 0.0,
+            "max_daily_value": _real(maxima[row]) if count else 0.0,
+            "days_with_data": count,
+            "total_days": total_days,
+            "consistency_rate": consistency,
+        })
+    return stats
+
+def compare_periods(matrix: EntryMatrix, periods: Sequence[Tuple[date, date]]) -> List[List[dict]]:
+    """
+    compare_periods for every activity and every pair of consecutive
+    periods (period1 = periods[i], period2 = periods[i + 1]).
+    """
+    totals, sums, counts = [], [], []
+    for start, end in periods:
+        first = max(matrix.column(start), 0)
+        last = min(matrix.column(end), matrix.n_days - 1)
+        window = slice(first, last + 1) if last >= first else slice(0, 0)
+        present = matrix.present[:, window]
+        totals.append(real_sums(matrix.values[:, window], present))
+        sums.append(np.where(present, matrix.values[:, window], 0.0).sum(axis=1))
+        counts.append(present.sum(axis=1))
+
+    comparisons = []
+    for row in range(len(matrix.activity_ids)):
+        items = []
+        for index in range(len(periods) - 1):
+            c1, c2 = int(counts[index][row]), int(counts[index + 1][row])
+            # SUM(REAL) acumula en float4 y AVG(REAL) en double
+            avg1 = sums[index][row] / c1 if c1 else 0.0
+            avg2 = sums[index + 1][row] / c2 if c2 else 0.0
+            items.append({
+                "period1_start": periods[index][0].isoformat(),
+                "period1_end": periods[index][1].isoformat(),
+                "period2_start": periods[index + 1][0].isoformat(),
+                "period2_end": periods[index + 1][1].isoformat(),
+                "period1_total": _real(totals[index][row]),
+                "period1_avg": _real(avg1),
+                "period1_days": c1,
+                "period2_total": _real(totals[index + 1][row]),
+                "period2_avg": _real(avg2),
+                "period2_days": c2,
+                "change_percentage": _real((avg2 - avg1) / avg1 * 100) if avg1 > 0 else 0.0,
+                "trend": "improving" if avg2 > avg1 else "declining" if avg2 < avg1 else "stable",
+            })
+        comparisons.append(items)
+    return comparisons
+
+async def load_entry_matrix(
+    supabase,
+    activity_ids: List[str],
+    last_day: Optional[date] = None,
+    first_day: Optional[date] = None,
+) -> EntryMatrix:
+    """
+    Read the entry history of the given activities with one paged range scan
+    (or from the history index). With first_day only the entries from
+    first_day to last_day are read.
+    """
+    if history_index.ready:
+        return EntryMatrix.from_history(activity_ids, [history_index.series(activity_id) for activity_id in activity_ids], last_day)
+
+    def build_query():
+        query = supabase.table("daily_entries").select("id,activity_id,entry_date,value_amount").in_("activity_id", activity_ids)
+        if first_day:
+            query = query.gte("entry_date", first_day.isoformat())
+            if last_day:
+                query = query.lte("entry_date", last_day.isoformat())
+        return query
+
+    rows: List[dict] = []
+    if activity_ids:
+        pages = iter_keyset_pages(build_query, ("entry_date", "id"))
+        async for page in pages:
+            rows.extend(page)
+    return EntryMatrix(activity_ids, rows, last_day)
+
+async def _active_activities(supabase) -> List[dict]:
+    response = await supabase.table("activities").select("id,name,activity_type").eq("is_active", True).order("created_at").execute()
+    return response.data
+
+def _only(activities: List[dict], activity_ids: Optional[Sequence[str]]) -> List[dict]:
+    """The activities whose id is in activity_ids (all of them without a filter)"""
+    if not activity_ids:
+        return activities
+    # PostgREST devuelve los uuid en minúsculas
+    wanted = {activity_id.lower() for activity_id in activity_ids}
+    return [activity for activity in activities if activity["id"].lower() in wanted]
+
+async def build_analytics(
+    supabase,
+    as_of: date,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> dict:
+    """
+    Rachas, estadísticas de consistencia y patrones por día de la semana de
+    todas las actividades activas: 2 lecturas (actividades + historial
+    paginado) en lugar de varias llamadas por actividad.
+    """
+    activities = await _active_activities(supabase)
+    matrix = await load_entry_matrix(supabase, [activity["id"] for activity in activities], as_of)
+
+    current = current_streaks(matrix, as_of)
+    longest = longest_streaks(matrix)
+    stats = activity_stats(matrix, start_date, end_date)
+    patterns = weekday_patterns(matrix, start_date, end_date or as_of)
+
+    return {
+        "as_of": as_of.isoformat(),
+        "activities": [
+            {
+                "activity_id": activity["id"],
+                "name": activity["name"],
+                "current_streak": int(current[row]),
+                "longest_streak": {
+                    "longest_streak": longest[row][0],
+                    "streak_start_date": longest[row][1].isoformat() if longest[row][1] else None,
+                    "streak_end_date": longest[row][2].isoformat() if longest[row][2] else None,
+                },
+                "stats": stats[row],
+                "weekday_patterns": patterns[row],
+            }
+            for row, activity in enumerate(activities)
+        ],
+    }
+
+async def build_moving_averages(supabase, days: int, end_date: date, activity_id: Optional[str] = None) -> dict:
+    """Serie de promedio móvil de las actividades activas (o de una sola)"""
+    activities = _only(await _active_activities(supabase), [activity_id] if activity_id else None)
+    matrix = await load_entry_matrix(supabase, [activity["id"] for activity in activities], end_date)
+    series = moving_averages(matrix, days, end_date)
+
+    return {
+        "days": days,
+        "end_date": end_date.isoformat(),
+        "activities": [
+            {"activity_id": activity["id"], "name": activity["name"], "series": series[row]}
+            for row, activity in enumerate(activities)
+        ],
+    }
+
+async def build_trends(
+    supabase,
+    period: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    activity_id: Optional[str] = None,
+) -> dict:
+    """
+    Totales por semana o por mes leídos de activity_rollups (O(periodos)
+    filas), con los mismos campos que las vistas weekly_activity_summary y
+    monthly_trends. days_active cuenta los días con valor > 0 y entry_count
+    los días con entrada.
+    """
+    activities = _only(await _active_activities(supabase), [activity_id] if activity_id else None)
+    activity_ids = [activity["id"] for activity in activities]
+
+    rows = await read_trends(supabase, period, activity_ids, start, end)
+    targets: Dict[Tuple[str, str], float] = {}
+    if period == "week" and activity_ids:
+        def goals_query():
+            query = supabase.table("weekly_goals").select("activity_id,week_start_date,target_value").in_("activity_id", activity_ids)
+            if start:
+                query = query.gte("week_start_date", start)
+            if end:
+                query = query.lte("week_start_date", end)
+            return query.order("id")
+        targets = {(goal["activity_id"], goal["week_start_date"]): goal["target_value"] for goal in await fetch_all(goals_query)}
+
+    periods: Dict[str, List[dict]] = {activity_id: [] for activity_id in activity_ids}
+    for row in rows:
+        total = row["total_value"]
+        item = {
+            "period_start": row["period_start"],
+            "total_value": _real(total),
+            "avg_daily_value": _real(total / row["entry_count"]) if row["entry_count"] else 0.0,
+            "entry_count": row["entry_count"],
+            "days_active": row["days_active"],
+        }
+        if period == "week":
+            target = targets.get((row["activity_id"], row["period_start"]))
+            item["target_value"] = target
+            item["completion_percentage"] = _real(total / target * 100) if target else 0.0
+        periods[row["activity_id"]].append(item)
+
+    return {
+        "period": period,
+        "activities": [
+            {
+                "activity_id": activity["id"],
+                "name": activity["name"],
+                "activity_type": activity.get("activity_type", "time"),
+                "periods": periods[activity["id"]],
+            }
+            for activity in activities
+        ],
+    }
+
+async def build_period_comparison(
+    supabase,
+    periods: Sequence[Tuple[date, date]],
+    activity_ids: Optional[Sequence[str]] = None,
+) -> dict:
+    """
+    compare_periods de cada par de periodos consecutivos para todas las
+    actividades activas (o las de activity_ids): una lectura de actividades
+    y un recorrido de las entradas entre el primer y el último día de los
+    periodos, en lugar de una llamada a la función SQL por actividad y par.
+    """
+    activities = _only(await _active_activities(supabase), activity_ids)
+    first_day = min(start for start, _ in periods)
+    last_day = max(end for _, end in periods)
+    matrix = await load_entry_matrix(supabase, [activity["id"] for activity in activities], last_day, first_day)
+    comparisons = compare_periods(matrix, periods)
+
+    return {
+        "periods": [{"start_date": start.isoformat(), "end_date": end.isoformat()} for start, end in periods],
+        "activities": [
+            {"activity_id": activity["id"], "name": activity["name"], "comparisons": comparisons[row]}
+            for row, activity in enumerate(activities)
+        ],
+    }
@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Sequence, Tuple, Type
+from postgrest.exceptions import APIError
+from pydantic import BaseModel, ValidationError
+from app.models.schemas import BatchItemResult, BatchResult
+
+# Filas por upsert; mantiene cada petición a PostgREST en un tamaño razonable
+BATCH_CHUNK_SIZE = 500
+
+# Máximo de elementos aceptados en una sola petición batch
+MAX_BATCH_ITEMS = 5000
+
+async def upsert_batch(
+    supabase,
+    table: str,
+    items: List[Dict[str, Any]],
+    model: Type[BaseModel],
+    key_fields: Sequence[str],
+) -> Tuple[BatchResult, List[dict]]:
+    """
+    Validate a list of rows and upsert them in chunks on their unique key.
+
+    Every item is validated first; invalid items are reported and skipped.
+    Valid items are deduplicated on key_fields (the last occurrence wins) and
+    written with one upsert per chunk. If a chunk is rejected (for example a
+    foreign key violation) its rows are retried one by one so a single bad
+    row does not fail the rest.
+
+    Returns the per-item result and the rows that were saved.
+    """
+    results: Dict[int, BatchItemResult] = {}
+    valid: Dict[Tuple, Tuple[int, dict]] = {}
+
+    for index, item in enumerate(items):
+        try:
+            row = model.model_validate(item).model_dump()
+        except ValidationError as error:
+            results[index] = BatchItemResult(index=index, status="error", error=_validation_message(error))
+            continue
+
+        key = tuple(row[field] for field in key_fields)
+        if key in valid:
+            previous_index = valid[key][0]
+            results[previous_index] = BatchItemResult(
+                index=previous_index,
+                status="skipped",
+                error=f"Duplicado en el lote; se aplica el elemento {index}",
+            )
+        valid[key] = (index, row)
+
+    pending = list(valid.items())
+    saved: List[dict] = []
+    on_conflict = ",".join(key_fields)
+
+    for start in range(0, len(pending), BATCH_CHUNK_SIZE):
+        chunk = pending[start:start + BATCH_CHUNK_SIZE]
+        try:
+            response = await supabase.table(table).upsert([row for _, (_, row) in chunk], on_conflict=on_conflict).execute()
+            stored = {tuple(_key_value(row[field]) for field in key_fields): row for row in response.data}
+            for key, (index, _) in chunk:
+                row = stored.get(tuple(_key_value(value) for value in key))
+                results[index] = BatchItemResult(index=index, status="ok", data=row)
+            saved.extend(response.data)
+        except APIError:
+            # Aislar las filas problemáticas reintentando de una en una
+            for key, (index, row) in chunk:
+                try:
+                    response = await supabase.table(table).upsert(row, on_conflict=on_conflict).execute()
+                    results[index] = BatchItemResult(index=index, status="ok", data=response.data[0] if response.data else None)
+                    saved.extend(response.data)
+                except APIError as error:
+                    results[index] = BatchItemResult(index=index, status="error", error=error.message)
+
+    ordered = [results[index] for index in sorted(results)]
+    succeeded = sum(1 for result in ordered if result.status == "ok")
+    failed = sum(1 for result in ordered if result.status == "error")
+    return BatchResult(total=len(items), succeeded=succeeded, failed=failed, results=ordered), saved
+
+def _key_value(value: Any) -> str:
+    # PostgREST devuelve fechas y uuids como texto (uuids en minúsculas)
+    return str(value).lower()
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'item'}: {detail['msg']}" for detail in error.errors()
+    )
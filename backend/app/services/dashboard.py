@@ -0,0 +1,261 @@
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.database import fetch_all
+from app.core.etag import latest_timestamp, make_etag, table_watermark
+from app.services.entry_buffer import entry_buffer
+from app.services.history_index import history_index
+
+# Campos de cada actividad en el payload del dashboard (proyectables con ?fields=)
+DASHBOARD_ACTIVITY_FIELDS = (
+    "activity_id",
+    "name",
+    "activity_type",
+    "target_unit",
+    "target_value",
+    "realized_value",
+    "percentage_complete",
+    "reflection_text",
+    "daily_values",
+)
+
+# Columnas que necesita assemble_dashboard de cada tabla
+ACTIVITY_COLUMNS = "id,name,activity_type,target_unit"
+GOAL_COLUMNS = "activity_id,week_start_date,target_value"
+REFLECTION_COLUMNS = "activity_id,week_start_date,reflection_text"
+ENTRY_COLUMNS = "activity_id,entry_date,value_amount"
+
+def get_week_dates(week_date: date) -> List[str]:
+    """Return the 7 ISO dates of the week starting at week_date"""
+    return [(week_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+
+def empty_dashboard(week_start_date: str, week_dates: List[str]) -> dict:
+    return {
+        "week_start_date": week_start_date,
+        "week_dates": week_dates,
+        "activities": [],
+        "weekly_summary": {
+            "total_target_hours": 0,
+            "total_realized_hours": 0,
+            "overall_percentage": 0
+        }
+    }
+
+async def dashboard_version(supabase, week_date: date) -> Tuple[str, Optional[str]]:
+    """
+    Versión de los datos de una semana y su último updated_at.
+
+    Combina número de filas y último updated_at de actividades, metas,
+    reflexiones y entradas de la semana: 4 queries de una fila en paralelo,
+    mucho más baratas que construir el dashboard. Incluye la generación de
+    la semana en el buffer de escritura diferida (escrituras aún no guardadas).
+    """
+    week_start_date = week_date.strftime("%Y-%m-%d")
+    watermarks = await asyncio.gather(
+        table_watermark(supabase.table("activities").select("updated_at", count="exact")),
+        table_watermark(supabase.table("weekly_goals").select("updated_at", count="exact").eq("week_start_date", week_start_date)),
+        table_watermark(supabase.table("weekly_reflections").select("updated_at", count="exact").eq("week_start_date", week_start_date)),
+        table_watermark(supabase.table("daily_entries").select("updated_at", count="exact").in_("entry_date", get_week_dates(week_date))),
+    )
+    version = make_etag(week_start_date, watermarks, entry_buffer.week_generation(week_start_date))
+    return version, latest_timestamp(latest for _, latest in watermarks)
+
+async def _no_reflections():
+    return []
+
+async def build_dashboard(supabase, week_date: date, include_reflections: bool = True) -> dict:
+    """
+    Construye el dashboard de una semana con un número fijo de queries.
+
+    En lugar de 3 queries por actividad se hacen 4 en total (actividades,
+    metas, reflexiones y entradas) filtrando con in_("activity_id", ...),
+    y los resultados se combinan en memoria. Las tres últimas son
+    independientes entre sí y se lanzan en paralelo. Solo se piden las
+    columnas que se usan; con include_reflections=False no se leen las
+    reflexiones (reflection_text queda vacío).
+    """
+    week_start_date = week_date.strftime("%Y-%m-%d")
+    week_dates = get_week_dates(week_date)
+
+    # Obtener actividades activas
+    activities_response = await supabase.table("activities").select(ACTIVITY_COLUMNS).eq("is_active", True).order("created_at").execute()
+
+    if not activities_response.data:
+        return empty_dashboard(week_start_date, week_dates)
+
+    activity_ids = [activity["id"] for activity in activities_response.data]
+
+    # Cargar metas, reflexiones y entradas de todas las actividades a la vez
+    goals_response, reflections_data, entries_data = await asyncio.gather(
+        supabase.table("weekly_goals").select(GOAL_COLUMNS).in_("activity_id", activity_ids).eq("week_start_date", week_start_date).execute(),
+        _week_reflections(supabase, activity_ids, week_start_date) if include_reflections else _no_reflections(),
+        _week_entries(supabase, activity_ids, week_dates),
+    )
+
+    return assemble_dashboard(
+        week_start_date,
+        week_dates,
+        activities_response.data,
+        goals_response.data,
+        reflections_data,
+        entry_buffer.overlay(entries_data, activity_ids, week_dates[0], week_dates[-1]),
+    )
+
+async def _week_reflections(supabase, activity_ids: List[str], week_start_date: str) -> List[dict]:
+    response = await supabase.table("weekly_reflections").select(REFLECTION_COLUMNS).in_("activity_id", activity_ids).eq("week_start_date", week_start_date).execute()
+    return response.data
+
+# Con el índice del historial cargado las entradas se leen de memoria
+async def _week_entries(supabase, activity_ids: List[str], week_dates: List[str]) -> List[dict]:
+    if history_index.ready:
+        return history_index.entries(activity_ids, week_dates[0], week_dates[-1])
+    response = await supabase.table("daily_entries").select(ENTRY_COLUMNS).in_("activity_id", activity_ids).in_("entry_date", week_dates).execute()
+    return response.data
+
+async def range_entries(supabase, activity_ids: List[str], first_day: str, last_day: str) -> List[dict]:
+    if history_index.ready:
+        return history_index.entries(activity_ids, first_day, last_day)
+    return await fetch_all(
+        lambda: supabase.table("daily_entries").select(ENTRY_COLUMNS).in_("activity_id", activity_ids).gte("entry_date", first_day).lte("entry_date", last_day).order("id")
+    )
+
+async def build_range_dashboard(supabase, first_week: date, last_week: date, include_reflections: bool = True) -> List[dict]:
+    """
+    Construye los dashboards de todas las semanas entre first_week y last_week
+    (lunes, ambos incluidos) con las mismas 4 queries que una sola semana.
+
+    Metas, reflexiones y entradas del periodo se cargan en bloque (paginadas)
+    y se reparten por semana ISO en una sola pasada antes de montar cada
+    semana con assemble_dashboard.
+    """
+    week_starts = [first_week + timedelta(weeks=i) for i in range((last_week - first_week).days // 7 + 1)]
+    week_keys = [week.strftime("%Y-%m-%d") for week in week_starts]
+    week_dates = {key: get_week_dates(week) for key, week in zip(week_keys, week_starts)}
+
+    activities_response = await supabase.table("activities").select(ACTIVITY_COLUMNS).eq("is_active", True).order("created_at").execute()
+    if not activities_response.data:
+        return [empty_dashboard(key, week_dates[key]) for key in week_keys]
+
+    activity_ids = [activity["id"] for activity in activities_response.data]
+    first_week_key, last_week_key = week_keys[0], week_keys[-1]
+    last_day = week_dates[last_week_key][-1]
+
+    goals, reflections, entries = await asyncio.gather(
+        fetch_all(lambda: supabase.table("weekly_goals").select(GOAL_COLUMNS).in_("activity_id", activity_ids).gte("week_start_date", first_week_key).lte("week_start_date", last_week_key).order("id")),
+        fetch_all(lambda: supabase.table("weekly_reflections").select(REFLECTION_COLUMNS).in_("activity_id", activity_ids).gte("week_start_date", first_week_key).lte("week_start_date", last_week_key).order("id"))
+        if include_reflections else _no_reflections(),
+        range_entries(supabase, activity_ids, first_week_key, last_day),
+    )
+
+    entries = entry_buffer.overlay(entries, activity_ids, first_week_key, last_day)
+
+    # Repartir las filas por semana en una sola pasada
+    week_of_day = {day: key for key in week_keys for day in week_dates[key]}
+    buckets: Dict[str, Dict[str, List[dict]]] = {
+        key: {"goals": [], "reflections": [], "entries": []} for key in week_keys
+    }
+    for goal in goals:
+        if goal["week_start_date"] in buckets:
+            buckets[goal["week_start_date"]]["goals"].append(goal)
+    for reflection in reflections:
+        if reflection["week_start_date"] in buckets:
+            buckets[reflection["week_start_date"]]["reflections"].append(reflection)
+    for entry in entries:
+        buckets[week_of_day[entry["entry_date"]]]["entries"].append(entry)
+
+    return [
+        assemble_dashboard(
+            key,
+            week_dates[key],
+            activities_response.data,
+            buckets[key]["goals"],
+            buckets[key]["reflections"],
+            buckets[key]["entries"],
+        )
+        for key in week_keys
+    ]
+
+def assemble_dashboard(
+    week_start_date: str,
+    week_dates: List[str],
+    activities_data: List[dict],
+    goals_data: List[dict],
+    reflections_data: List[dict],
+    entries_data: List[dict],
+) -> dict:
+    """Join the rows of one week in memory and compute the dashboard payload"""
+    if not activities_data:
+        return empty_dashboard(week_start_date, week_dates)
+
+    # Indexar por actividad
+    targets: Dict[str, float] = {goal["activity_id"]: goal["target_value"] for goal in goals_data}
+    reflections: Dict[str, str] = {
+        reflection["activity_id"]: reflection["reflection_text"] for reflection in reflections_data
+    }
+    entries_by_activity: Dict[str, Dict[str, float]] = {}
+    for entry in entries_data:
+        entries_by_activity.setdefault(entry["activity_id"], {})[entry["entry_date"]] = entry["value_amount"]
+
+    activities = []
+    total_target_hours = 0
+    total_realized_hours = 0
+
+    for activity in activities_data:
+        activity_id = activity["id"]
+        activity_type = activity.get("activity_type", "time")
+        target_unit = activity.get("target_unit", "horas")
+
+        target_value = targets.get(activity_id, 0)
+        reflection_text = reflections.get(activity_id, "")
+
+        # Crear diccionario de entradas por fecha
+        daily_values = {day: 0.0 for day in week_dates}
+        for entry_date, value_amount in entries_by_activity.get(activity_id, {}).items():
+            if entry_date in daily_values:
+                daily_values[entry_date] = value_amount
+
+        # Calcular valor realizado
+        realized_value = sum(daily_values.values())
+
+        # Calcular porcentaje
+        percentage_complete = (realized_value / target_value * 100) if target_value > 0 else 0
+
+        # Acumular totales (solo para actividades de tiempo para el resumen)
+        if activity_type == "time":
+            total_target_hours += target_value
+            total_realized_hours += realized_value
+
+        activities.append({
+            "activity_id": activity_id,
+            "name": activity["name"],
+            "activity_type": activity_type,
+            "target_unit": target_unit,
+            "target_value": target_value,
+            "realized_value": realized_value,
+            "percentage_complete": round(percentage_complete, 2),
+            "reflection_text": reflection_text,
+            "daily_values": daily_values
+        })
+
+    # Calcular porcentaje general
+    overall_percentage = (total_realized_hours / total_target_hours * 100) if total_target_hours > 0 else 0
+
+    return {
+        "week_start_date": week_start_date,
+        "week_dates": week_dates,
+        "activities": activities,
+        "weekly_summary": {
+            "total_target_hours": total_target_hours,
+            "total_realized_hours": total_realized_hours,
+            "overall_percentage": round(overall_percentage, 2)
+        }
+    }
+
+def project_dashboard(dashboard: dict, fields: Optional[Sequence[str]]) -> dict:
+    """Copy of a dashboard payload keeping only the given activity fields"""
+    if fields is None:
+        return dashboard
+    return {
+        **dashboard,
+        "activities": [{name: activity[name] for name in fields} for activity in dashboard["activities"]],
+    }
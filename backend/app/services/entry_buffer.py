@@ -0,0 +1,271 @@
+"""
+Buffer de escritura diferida (write-behind) para daily_entries.
+
+Paradas del cronómetro y ediciones rápidas en la matriz diaria generan
+ráfagas de upserts sobre la misma (actividad, fecha). Con
+ENTRY_WRITE_BEHIND=true, POST /api/entries responde 202 al momento y la
+escritura queda aquí: las repetidas de una misma clave se reducen a la
+última y se escriben todas con un upsert por bloque cada
+ENTRY_FLUSH_INTERVAL segundos, o antes si se acumulan ENTRY_FLUSH_MAX_PENDING.
+Nunca hay más de una escritura en curso, y con ENTRY_BUFFER_MAX_PENDING
+claves pendientes (la base de datos no responde) POST /api/entries deja de
+aceptar claves nuevas con 503 en lugar de crecer sin límite.
+
+El dashboard superpone lo pendiente a lo leído de la base de datos (lee sus
+propias escrituras) y su ETag incluye una generación por semana. Al apagar
+se vacía el buffer; lo que no se haya podido escribir se guarda en
+ENTRY_SPILL_PATH y se reintenta al arrancar, de modo que no se pierde
+ninguna escritura aceptada. Las que la base de datos rechaza al escribir
+(p. ej. la actividad se borró fuera de la API) se registran en el log y se
+cuentan en rejected. El buffer es por proceso.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.core.cache import dashboard_cache, week_start_of
+from app.core.config import settings
+from app.core.database import get_supabase
+from app.models.schemas import BatchResult, DailyEntryCreate
+from app.services.batch import upsert_batch
+from app.services.goals import evaluate_goals
+from app.services.history_index import history_index
+
+logger = logging.getLogger(__name__)
+
+EntryKey = Tuple[str, str]  # (activity_id, entry_date)
+
+# Espera máxima entre reintentos tras un fallo de escritura (segundos)
+MAX_RETRY_DELAY = 30.0
+
+# Intentos de escritura al apagar antes de volcar al fichero
+DRAIN_ATTEMPTS = 3
+
+class EntryWriteBuffer:
+    """Pending daily entries keyed by (activity_id, entry_date), last write wins"""
+
+    def __init__(self, enabled: bool, flush_interval: float, max_pending: int, spill_path: str, max_buffered: int = 5000):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_buffered = max_buffered
+        self.spill_path = spill_path
+        self._pending: Dict[EntryKey, dict] = {}
+        self._week_generations: Dict[str, int] = {}
+        self._known_activities: Set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self.flushes = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.refused = 0
+
+    @staticmethod
+    def _key(activity_id: str, entry_date: str) -> EntryKey:
+        # PostgREST devuelve los uuid en minúsculas
+        return activity_id.lower(), entry_date
+
+    async def known_activity(self, supabase, activity_id: str) -> bool:
+        """Whether the activity exists (checked once per id, so a queued write cannot hit the FK later)"""
+        activity_id = activity_id.lower()
+        if activity_id not in self._known_activities:
+            response = await supabase.table("activities").select("id").eq("id", activity_id).execute()
+            if not response.data:
+                return False
+            self._known_activities.add(activity_id)
+        return True
+
+    def has_room(self, activity_id: str, entry_date: str) -> bool:
+        """Whether a write can be buffered (rewriting a pending key never grows the buffer)"""
+        if self._key(activity_id, entry_date) in self._pending or len(self._pending) < self.max_buffered:
+            return True
+        self.refused += 1
+        return False
+
+    def put(self, row: dict) -> dict:
+        """Queue an entry; replaces a pending write of the same key"""
+        key = self._key(row["activity_id"], row["entry_date"])
+        row = {**row, "activity_id": key[0]}
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = row
+        week = week_start_of(key[1])
+        self._week_generations[week] = self._week_generations.get(week, 0) + 1
+
+        # Tras un fallo se respeta la espera de reintento aunque el bloque esté lleno
+        if len(self._pending) >= self.max_pending and not self._failures:
+            self._start_flush()
+        else:
+            self._wake(self.flush_interval)
+        return row
+
+    async def upsert_entries(self, supabase, items: List[Any], model: Type[BaseModel] = DailyEntryCreate) -> Tuple[BatchResult, List[dict]]:
+        """
+        upsert_batch() of entries written directly (entries batch, import).
+        Holds the flush lock so a flush cannot write older pending values over
+        the batch, and then drops only the pending writes the batch replaced:
+        keys that were saved and not written again in the meantime.
+        """
+        async with self._flush_lock:
+            superseded: Dict[EntryKey, dict] = {}
+            for item in items if self._pending else ():
+                if isinstance(item, dict) and isinstance(item.get("activity_id"), str) and isinstance(item.get("entry_date"), str):
+                    key = self._key(item["activity_id"], item["entry_date"])
+                    if key in self._pending:
+                        superseded[key] = self._pending[key]
+
+            result, saved = await upsert_batch(supabase, "daily_entries", items, model, ("activity_id", "entry_date"))
+
+            for row in saved:
+                key = self._key(row["activity_id"], row["entry_date"])
+                if key in superseded and self._pending.get(key) is superseded[key]:
+                    del self._pending[key]
+        return result, saved
+
+    def week_generation(self, week_start_date: str) -> int:
+        """Counter of buffered writes to a week (part of the dashboard ETag)"""
+        return self._week_generations.get(week_start_date, 0)
+
+    def overlay(self, entries: List[dict], activity_ids: Iterable[str], first_day: str, last_day: str) -> List[dict]:
+        """Entries read from the database with the pending writes of the range applied"""
+        if not self._pending:
+            return entries
+        wanted = {activity_id.lower() for activity_id in activity_ids}
+        pending = {
+            key: row for key, row in self._pending.items()
+            if key[0] in wanted and first_day <= key[1] <= last_day
+        }
+        if not pending:
+            return entries
+        merged = [entry for entry in entries if self._key(entry["activity_id"], entry["entry_date"]) not in pending]
+        return merged + list(pending.values())
+
+    # --- escritura ---
+
+    def _wake(self, delay: float) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Una sola escritura en curso: al terminar se programa la siguiente
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._background_flush())
+
+    async def _background_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            # Las filas siguen pendientes; se reintenta con espera creciente
+            self._flush_task = None
+            self._failures += 1
+            logger.exception("Fallo al escribir %d entradas pendientes", len(self._pending))
+            self._wake(min(self.flush_interval * 2 ** self._failures, MAX_RETRY_DELAY))
+            return
+        self._flush_task = None
+        self._failures = 0
+        if len(self._pending) >= self.max_pending:
+            self._start_flush()
+        elif self._pending:
+            self._wake(self.flush_interval)
+
+    async def flush(self) -> None:
+        """Write every pending entry now (one upsert per chunk)"""
+        async with self._flush_lock:
+            batch = dict(self._pending)
+            if not batch:
+                return
+            supabase = await get_supabase()
+            rows = list(batch.values())
+            result, saved = await upsert_batch(supabase, "daily_entries", rows, DailyEntryCreate, ("activity_id", "entry_date"))
+
+            # Se conservan las claves reescritas mientras se escribía el bloque
+            for key, row in batch.items():
+                if self._pending.get(key) is row:
+                    del self._pending[key]
+            self.flushes += 1
+            await self._written(supabase, rows, result, saved)
+
+    async def _written(self, supabase, rows: List[dict], result: BatchResult, saved: List[dict]) -> None:
+        failed = [item for item in result.results if item.status == "error"]
+        if failed:
+            # Rechazadas por la base de datos: reintentar no las arreglaría
+            self.rejected += len(failed)
+            logger.error("Entradas rechazadas al escribir: %s", [(rows[item.index], item.error) for item in failed])
+            # Si la actividad ya no existe, la próxima escritura vuelve a comprobarla y responde 404
+            for item in failed:
+                self._known_activities.discard(rows[item.index]["activity_id"])
+        if saved:
+            history_index.record(saved)
+            dashboard_cache.invalidate(*{week_start_of(row["entry_date"]) for row in saved})
+            await evaluate_goals(supabase, {(row["activity_id"], week_start_of(row["entry_date"])) for row in saved})
+
+    async def drain(self) -> None:
+        """Flush everything on shutdown; spill what cannot be written to disk"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+
+        for attempt in range(DRAIN_ATTEMPTS):
+            if not self._pending:
+                return
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Fallo al vaciar el buffer de entradas (intento %d)", attempt + 1)
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+        if self._pending:
+            with open(self.spill_path, "a", encoding="utf-8") as spill:
+                for row in self._pending.values():
+                    spill.write(json.dumps(row) + "\n")
+            logger.error("%d entradas sin escribir guardadas en %s", len(self._pending), self.spill_path)
+            self._pending.clear()
+
+    async def recover(self) -> int:
+        """
+        Retry the entries spilled by a previous shutdown (on startup): queued
+        when the buffer is enabled, written right away when it is not.
+        """
+        if not os.path.exists(self.spill_path):
+            return 0
+        with open(self.spill_path, encoding="utf-8") as spill:
+            rows = [json.loads(line) for line in spill if line.strip()]
+        if not self.enabled:
+            # Si la base de datos no responde el fichero se queda para el próximo arranque
+            supabase = await get_supabase()
+            result, saved = await self.upsert_entries(supabase, rows)
+            await self._written(supabase, rows, result, saved)
+        else:
+            for row in rows:
+                self.put(row)
+        os.remove(self.spill_path)
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "refused": self.refused,
+        }
+
+entry_buffer = EntryWriteBuffer(
+    enabled=settings.ENTRY_WRITE_BEHIND,
+    flush_interval=settings.ENTRY_FLUSH_INTERVAL,
+    max_pending=settings.ENTRY_FLUSH_MAX_PENDING,
+    spill_path=settings.ENTRY_SPILL_PATH,
+    max_buffered=settings.ENTRY_BUFFER_MAX_PENDING,
+)
@@ -0,0 +1,157 @@
+"""
+Evaluación de metas semanales cumplidas y sus hitos.
+
+Sustituye al trigger check_goal_after_entry, que por cada fila de
+daily_entries volvía a sumar la semana (y comparaba weekly_goals.id con
+activity_id, así que nunca acertaba). Aquí se evalúan de una vez solo los
+pares (actividad, semana) afectados por un lote de escrituras: una lectura
+de metas y otra de totales semanales (activity_rollups), y como mucho dos
+updates y un insert de hitos. Las escrituras sueltas se agrupan con
+GoalEvaluator, que espera a que dejen de llegar antes de evaluar.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.database import fetch_all, get_supabase
+from app.services.rollups import TOTAL_TOLERANCE
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]  # (activity_id, week_start_date)
+
+async def evaluate_goals(supabase, pairs: Iterable[Pair]) -> dict:
+    """
+    Recompute weekly_goals.achieved/achieved_at for the given (activity, week)
+    pairs and add a 'goal' milestone the first time each goal is reached.
+    """
+    # PostgREST devuelve los uuid en minúsculas
+    wanted = {(activity_id.lower(), week) for activity_id, week in pairs}
+    if not wanted:
+        return {"evaluated": 0, "achieved": 0, "lost": 0}
+
+    activity_ids = sorted({activity_id for activity_id, _ in wanted})
+    weeks = sorted({week for _, week in wanted})
+    # Filtro por columnas por separado (superconjunto) y se recorta en memoria
+    goals, totals = await asyncio.gather(
+        fetch_all(lambda: supabase.table("weekly_goals").select("id,activity_id,week_start_date,target_value,achieved").in_(
+            "activity_id", activity_ids
+        ).in_("week_start_date", weeks).order("id")),
+        fetch_all(lambda: supabase.table("activity_rollups").select("activity_id,period_start,total_value").eq("period", "week").in_(
+            "activity_id", activity_ids
+        ).in_("period_start", weeks).order("activity_id").order("period_start")),
+    )
+    week_totals: Dict[Pair, float] = {(row["activity_id"], row["period_start"]): float(row["total_value"]) for row in totals}
+
+    reached: List[str] = []
+    lost: List[str] = []
+    evaluated = 0
+    for goal in goals:
+        key = (goal["activity_id"], goal["week_start_date"])
+        if key not in wanted:
+            continue
+        evaluated += 1
+        target = float(goal["target_value"])
+        achieved = target > 0 and week_totals.get(key, 0.0) >= target - TOTAL_TOLERANCE
+        if achieved and not goal["achieved"]:
+            reached.append(goal["id"])
+        elif not achieved and goal["achieved"]:
+            lost.append(goal["id"])
+
+    now = datetime.now(timezone.utc).isoformat()
+    flipped: List[dict] = []
+    if reached:
+        # Solo quien cambia achieved de false a true crea el hito (evaluaciones concurrentes)
+        response = await supabase.table("weekly_goals").update({"achieved": True, "achieved_at": now}).in_("id", reached).eq("achieved", False).execute()
+        flipped = response.data
+    if lost:
+        await supabase.table("weekly_goals").update({"achieved": False, "achieved_at": None}).in_("id", lost).eq("achieved", True).execute()
+    if flipped:
+        await _create_goal_milestones(supabase, flipped, week_totals, now)
+
+    return {"evaluated": evaluated, "achieved": len(flipped), "lost": len(lost)}
+
+async def _create_goal_milestones(supabase, goals: List[dict], week_totals: Dict[Pair, float], achieved_at: str) -> None:
+    # Una meta que se pierde y se vuelve a cumplir no repite el hito
+    activity_ids = sorted({goal["activity_id"] for goal in goals})
+    weeks = sorted({goal["week_start_date"] for goal in goals})
+    existing = await fetch_all(
+        lambda: supabase.table("milestones").select("activity_id,metadata").eq("milestone_type", "goal").in_(
+            "activity_id", activity_ids
+        ).in_("metadata->>week_start_date", weeks).order("id")
+    )
+    seen = {(row["activity_id"], (row.get("metadata") or {}).get("week_start_date")) for row in existing}
+
+    rows = []
+    for goal in goals:
+        key = (goal["activity_id"], goal["week_start_date"])
+        if key in seen:
+            continue
+        total = week_totals.get(key, 0.0)
+        target = float(goal["target_value"])
+        rows.append({
+            "activity_id": goal["activity_id"],
+            "milestone_type": "goal",
+            "title": "¡Meta semanal cumplida!",
+            "description": f"Alcanzaste {total:g} de {target:g} la semana del {goal['week_start_date']}",
+            "achieved_at": achieved_at,
+            "value_amount": total,
+            "metadata": {"week_start_date": goal["week_start_date"], "target_value": target},
+        })
+    if rows:
+        await supabase.table("milestones").insert(rows).execute()
+
+class GoalEvaluator:
+    """
+    Debounced evaluate_goals() for single writes: touched pairs accumulate
+    until no write arrives for `delay` seconds (at most `max_delay` after the
+    first one) and are then evaluated in a single pass.
+    """
+
+    def __init__(self, delay: float = 2.0, max_delay: float = 10.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending: Set[Pair] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._first_at = 0.0
+        self._last_at = 0.0
+
+    def schedule(self, pairs: Iterable[Pair]) -> None:
+        """Queue pairs for evaluation (call from the event loop)"""
+        loop = asyncio.get_running_loop()
+        self._pending.update(pairs)
+        self._last_at = loop.time()
+        if self._task is None:
+            self._first_at = self._last_at
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = min(self._last_at + self.delay, self._first_at + self.max_delay) - loop.time()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        # Lo que llegue durante la evaluación abre una nueva espera
+        self._task = None
+        await self._evaluate()
+
+    async def _evaluate(self) -> None:
+        pairs, self._pending = self._pending, set()
+        if not pairs:
+            return
+        try:
+            await evaluate_goals(await get_supabase(), pairs)
+        except Exception:
+            logger.exception("Fallo al evaluar %d metas semanales", len(pairs))
+
+    async def flush(self) -> None:
+        """Evaluate whatever is pending right now (on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._evaluate()
+
+goal_evaluator = GoalEvaluator(settings.GOAL_EVALUATION_DELAY, settings.GOAL_EVALUATION_MAX_DELAY)
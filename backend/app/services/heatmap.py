@@ -0,0 +1,71 @@
+"""
+Mapa de calor anual (día x actividad) al estilo de GitHub.
+
+Una lectura de actividades y un único recorrido de las entradas del año
+(o el índice del historial si está cargado) se vuelcan en una matriz densa
+de NumPy. La respuesta lleva la fecha de inicio y un array por actividad
+con un valor por día (0 = sin entrada), o con levels > 0 un texto con un
+dígito de intensidad por día: unos pocos KB por actividad, sea cual sea el
+número de entradas.
+"""
+from datetime import date
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services.dashboard import ACTIVITY_COLUMNS, range_entries
+from app.services.entry_buffer import entry_buffer
+
+# Niveles de intensidad máximos (un dígito por día)
+MAX_LEVELS = 9
+
+def quantize(values: np.ndarray, levels: int) -> Tuple[str, List[float]]:
+    """
+    Intensity digit per day: 0 without activity, 1..levels by quantiles of
+    the days with value > 0. Returns the digits and the lower bound of
+    levels 2..levels.
+    """
+    positive = values[values > 0]
+    if positive.size == 0:
+        return "0" * values.size, []
+    thresholds = np.quantile(positive, [step / levels for step in range(1, levels)])
+    digits = np.where(values > 0, np.searchsorted(thresholds, values, side="right") + 1, 0)
+    return "".join(map(str, digits.tolist())), [float(threshold) for threshold in thresholds]
+
+async def build_heatmap(supabase, year: int, levels: int = 0) -> dict:
+    first_day, last_day = date(year, 1, 1), date(year, 12, 31)
+    first, last = first_day.isoformat(), last_day.isoformat()
+    n_days = (last_day - first_day).days + 1
+
+    activities = (await supabase.table("activities").select(ACTIVITY_COLUMNS).eq("is_active", True).order("created_at").execute()).data
+    activity_ids = [activity["id"] for activity in activities]
+    entries = []
+    if activity_ids:
+        entries = entry_buffer.overlay(await range_entries(supabase, activity_ids, first, last), activity_ids, first, last)
+
+    # PostgREST devuelve los uuid en minúsculas
+    rows_of = {activity_id.lower(): row for row, activity_id in enumerate(activity_ids)}
+    grid = np.zeros((len(activity_ids), n_days), dtype=np.float64)
+    if entries:
+        origin = first_day.toordinal()
+        columns = np.array([date.fromisoformat(entry["entry_date"]).toordinal() - origin for entry in entries], dtype=np.int64)
+        rows = np.array([rows_of[entry["activity_id"].lower()] for entry in entries], dtype=np.int64)
+        grid[rows, columns] = [entry["value_amount"] for entry in entries]
+
+    result = []
+    for row, activity in enumerate(activities):
+        item = {
+            "activity_id": activity["id"],
+            "name": activity["name"],
+            "activity_type": activity.get("activity_type", "time"),
+            "target_unit": activity.get("target_unit", "horas"),
+            "total": float(grid[row].sum()),
+            "days_active": int(np.count_nonzero(grid[row] > 0)),
+        }
+        if levels:
+            item["levels"], item["thresholds"] = quantize(grid[row], levels)
+        else:
+            item["values"] = grid[row].tolist()
+        result.append(item)
+
+    return {"year": year, "start_date": first, "days": n_days, "levels": levels, "activities": result}
@@ -0,0 +1,175 @@
+"""
+Índice en memoria del historial de entradas por actividad.
+
+Con HISTORY_INDEX=true se carga al arrancar todo daily_entries (un
+recorrido paginado) y cada actividad guarda sus value_amount en un
+array('d') contiguo indexado por días desde su primera entrada, con un
+bytearray que marca los días con entrada (0 no es lo mismo que sin
+entrada). Ocupa 9 bytes por día y actividad, frente a los cientos de una
+fila como dict.
+
+El dashboard y el análisis leen las entradas de aquí en lugar de
+consultarlas: el análisis copia los arrays tal cual a su matriz
+(EntryMatrix.from_history) y el dashboard toma un corte con los días de su
+rango, que convierte en filas para superponerles el buffer de escritura. Cada escritura de entradas de la API (POST, lote, buffer e
+importación) la registra también en el índice. El índice es por proceso: solo es
+correcto con un único proceso de la API y sin escrituras en daily_entries
+fuera de ella; si no, hay que dejarlo desactivado.
+"""
+import logging
+from array import array
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.database import iter_keyset_pages
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365.25
+
+def _ordinal(day: str) -> int:
+    return date.fromisoformat(day).toordinal()
+
+class ActivitySeries:
+    """Daily values of one activity from first_ordinal on, one slot per day"""
+
+    __slots__ = ("first_ordinal", "values", "present", "entries")
+
+    def __init__(self, first_ordinal: int):
+        self.first_ordinal = first_ordinal
+        self.values = array("d")
+        self.present = bytearray()
+        self.entries = 0
+
+    @property
+    def last_ordinal(self) -> int:
+        return self.first_ordinal + len(self.values) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.values) * self.values.itemsize + len(self.present)
+
+    def set(self, ordinal: int, value: float) -> None:
+        if not self.values:
+            self.first_ordinal = ordinal
+        offset = ordinal - self.first_ordinal
+        if offset < 0:
+            # Entrada anterior a la primera: se amplía por delante
+            self.values[0:0] = array("d", bytes(-offset * self.values.itemsize))
+            self.present[0:0] = bytes(-offset)
+            self.first_ordinal = ordinal
+            offset = 0
+        elif offset >= len(self.values):
+            grow = offset - len(self.values) + 1
+            self.values.frombytes(bytes(grow * self.values.itemsize))
+            self.present.extend(bytes(grow))
+        if not self.present[offset]:
+            self.present[offset] = 1
+            self.entries += 1
+        self.values[offset] = value
+
+    def _slice(self, first: int, last: int) -> slice:
+        """Offsets of the days first..last (ordinals, both included) clipped to the series"""
+        start = max(first - self.first_ordinal, 0)
+        stop = max(min(last - self.first_ordinal + 1, len(self.values)), start)
+        return slice(start, stop)
+
+    def days(self, first: int, last: int):
+        """(ordinal, value) of the days with an entry between first and last"""
+        window = self._slice(first, last)
+        present = self.present[window]
+        values = self.values[window]
+        base = self.first_ordinal + window.start
+        return [(base + offset, values[offset]) for offset, flag in enumerate(present) if flag]
+
+class HistoryIndex:
+    """Per-activity ActivitySeries kept in sync with the entry writes of this process"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.ready = False
+        self._series: Dict[str, ActivitySeries] = {}
+        self._during_load: Optional[List[dict]] = None
+
+    async def load(self, supabase) -> int:
+        """Read every daily entry into a fresh index (on startup)"""
+        series: Dict[str, ActivitySeries] = {}
+        self._during_load = []
+        try:
+            pages = iter_keyset_pages(
+                lambda: supabase.table("daily_entries").select("id,activity_id,entry_date,value_amount"),
+                ("entry_date", "id"),
+                desc=False,
+            )
+            async for page in pages:
+                self._store(series, page)
+            # Escrituras registradas mientras se leía: pueden ser posteriores a lo leído
+            self._store(series, self._during_load)
+        finally:
+            self._during_load = None
+        self._series = series
+        self.ready = True
+        return sum(item.entries for item in series.values())
+
+    @staticmethod
+    def _store(series: Dict[str, ActivitySeries], rows: Iterable[dict]) -> None:
+        for row in rows:
+            ordinal = _ordinal(row["entry_date"])
+            activity_id = row["activity_id"].lower()
+            if activity_id not in series:
+                series[activity_id] = ActivitySeries(ordinal)
+            series[activity_id].set(ordinal, float(row["value_amount"]))
+
+    def record(self, rows: Iterable[dict]) -> None:
+        """Apply saved daily_entries rows"""
+        if self._during_load is not None:
+            self._during_load.extend(rows)
+        elif self.ready:
+            self._store(self._series, rows)
+
+    def series(self, activity_id: str) -> Optional[ActivitySeries]:
+        return self._series.get(activity_id.lower())
+
+    def entries(self, activity_ids: Iterable[str], first_day: str, last_day: str) -> List[dict]:
+        """Entries of the given activities between two ISO dates, as daily_entries rows"""
+        first, last = _ordinal(first_day), _ordinal(last_day)
+        rows = []
+        for activity_id in activity_ids:
+            series = self.series(activity_id)
+            if series is not None:
+                rows.extend(
+                    {"activity_id": activity_id, "entry_date": date.fromordinal(ordinal).isoformat(), "value_amount": value}
+                    for ordinal, value in series.days(first, last)
+                )
+        return rows
+
+    def memory_bytes(self) -> int:
+        return sum(series.nbytes for series in self._series.values())
+
+    def stats(self) -> dict:
+        """Memory footprint of the index, overall and per activity-year"""
+        per_activity = [
+            {
+                "activity_id": activity_id,
+                "first_day": date.fromordinal(series.first_ordinal).isoformat(),
+                "days": len(series.values),
+                "entries": series.entries,
+                "bytes": series.nbytes,
+            }
+            for activity_id, series in self._series.items()
+        ]
+        days = sum(item["days"] for item in per_activity)
+        total_bytes = sum(item["bytes"] for item in per_activity)
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "activities": len(per_activity),
+            "entries": sum(item["entries"] for item in per_activity),
+            "days": days,
+            "bytes": total_bytes,
+            "bytes_per_activity_year": round(total_bytes / days * DAYS_PER_YEAR) if days else 0,
+            "per_activity": per_activity,
+        }
+
+history_index = HistoryIndex(enabled=settings.HISTORY_INDEX)
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import date, timedelta
+from app.core.database import fetch_all
+from app.services.goals import evaluate_goals
+
+async def rollover_week(supabase, week_date: date) -> dict:
+    """
+    Copia a la semana week_date lo pendiente de la semana anterior para todas
+    las actividades activas de una vez:
+
+    - weekly_goals: el target_value, solo si la actividad no tiene meta esta semana.
+    - activity_goals: las metas NO completadas, solo si la actividad no tiene
+      ninguna esta semana (se copian sin completar y con su display_order).
+
+    Son 5 lecturas en paralelo y como mucho 2 upserts, sin importar el número
+    de actividades. Los upserts ignoran duplicados sobre las claves UNIQUE, así
+    que repetir la llamada (o dos dispositivos abriendo la misma semana a la
+    vez) no crea filas repetidas. Las metas copiadas se evalúan al momento: la
+    semana puede tener ya entradas que las cumplan.
+    """
+    week_start_date = week_date.strftime("%Y-%m-%d")
+    previous_week = (week_date - timedelta(weeks=1)).strftime("%Y-%m-%d")
+
+    activities_response, current_goals_response, current_metas, previous_goals_response, previous_metas = await asyncio.gather(
+        supabase.table("activities").select("id").eq("is_active", True).execute(),
+        supabase.table("weekly_goals").select("activity_id").eq("week_start_date", week_start_date).execute(),
+        fetch_all(lambda: supabase.table("activity_goals").select("activity_id").eq("week_start_date", week_start_date).order("id")),
+        supabase.table("weekly_goals").select("activity_id,target_value").eq("week_start_date", previous_week).execute(),
+        fetch_all(lambda: supabase.table("activity_goals").select("activity_id,goal_text,display_order").eq("week_start_date", previous_week).eq("completed", False).order("display_order").order("id")),
+    )
+
+    active_ids = {activity["id"] for activity in activities_response.data}
+    with_goal = {goal["activity_id"] for goal in current_goals_response.data}
+    with_metas = {meta["activity_id"] for meta in current_metas}
+
+    new_goals = [
+        {"activity_id": goal["activity_id"], "week_start_date": week_start_date, "target_value": goal["target_value"]}
+        for goal in previous_goals_response.data
+        if goal["activity_id"] in active_ids and goal["activity_id"] not in with_goal
+    ]
+    new_metas = [
+        {
+            "activity_id": meta["activity_id"],
+            "week_start_date": week_start_date,
+            "goal_text": meta["goal_text"],
+            "completed": False,
+            "display_order": meta["display_order"],
+        }
+        for meta in previous_metas
+        if meta["activity_id"] in active_ids and meta["activity_id"] not in with_metas
+    ]
+
+    # Con ignore_duplicates solo se devuelven las filas realmente insertadas
+    goals_copied = 0
+    if new_goals:
+        response = await supabase.table("weekly_goals").upsert(
+            new_goals, on_conflict="activity_id,week_start_date", ignore_duplicates=True
+        ).execute()
+        goals_copied = len(response.data)
+        if response.data:
+            await evaluate_goals(supabase, [(goal["activity_id"], goal["week_start_date"]) for goal in response.data])
+
+    metas_copied = 0
+    if new_metas:
+        response = await supabase.table("activity_goals").upsert(
+            new_metas, on_conflict="activity_id,week_start_date,goal_text", ignore_duplicates=True
+        ).execute()
+        metas_copied = len(response.data)
+
+    return {
+        "week_start_date": week_start_date,
+        "goals_copied": goals_copied,
+        "activity_goals_copied": metas_copied,
+    }
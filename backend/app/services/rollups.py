@@ -0,0 +1,127 @@
+"""
+Agregados por (actividad, semana) y (actividad, mes) en activity_rollups.
+
+Sustituyen a las vistas weekly_activity_summary y monthly_trends, que
+recorren todo daily_entries en cada lectura. El trigger
+sync_daily_entries_rollups (20251204_rollup_triggers.sql) aplica en la
+misma transacción la diferencia de cada inserción, cambio o borrado de
+entradas, también de las que no pasan por la API, de modo que leer una
+tendencia cuesta O(periodos) filas. rebuild_rollups.py los reconstruye
+desde cero y los verifica.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import week_start_of
+from app.core.database import fetch_all, iter_keyset_pages
+from app.services.batch import BATCH_CHUNK_SIZE
+
+RollupKey = Tuple[str, str, str]  # (activity_id, period, period_start)
+
+# Tolerancia al comparar sumas acumuladas por deltas con las recalculadas
+TOTAL_TOLERANCE = 1e-6
+
+def period_starts(entry_date: str) -> Tuple[Tuple[str, str], Tuple[str, str]]:
+    """(("week", monday), ("month", first day)) of an ISO date"""
+    return ("week", week_start_of(entry_date)), ("month", entry_date[:8] + "01")
+
+def _accumulate(totals: Dict[RollupKey, List[float]], activity_id: str, entry_date: str, value: float, count: int, active: int) -> None:
+    for period, start in period_starts(entry_date):
+        bucket = totals.setdefault((activity_id, period, start), [0.0, 0, 0])
+        bucket[0] += value
+        bucket[1] += count
+        bucket[2] += active
+
+def _rows(totals: Dict[RollupKey, List[float]]) -> List[dict]:
+    return [
+        {
+            "activity_id": activity_id,
+            "period": period,
+            "period_start": start,
+            "total_value": total,
+            "entry_count": count,
+            "days_active": active,
+        }
+        for (activity_id, period, start), (total, count, active) in totals.items()
+    ]
+
+async def expected_rollups(supabase) -> Dict[RollupKey, List[float]]:
+    """Rollups recomputed from every daily entry (one keyset scan)"""
+    totals: Dict[RollupKey, List[float]] = {}
+    pages = iter_keyset_pages(
+        lambda: supabase.table("daily_entries").select("id,activity_id,entry_date,value_amount"),
+        ("entry_date", "id"),
+    )
+    async for page in pages:
+        for row in page:
+            value = float(row["value_amount"])
+            _accumulate(totals, row["activity_id"], row["entry_date"], value, 1, int(value > 0))
+    return totals
+
+async def stored_rollups(supabase) -> Dict[RollupKey, List[float]]:
+    rows = await fetch_all(
+        lambda: supabase.table("activity_rollups").select("activity_id,period,period_start,total_value,entry_count,days_active")
+        .order("activity_id").order("period").order("period_start")
+    )
+    return {
+        (row["activity_id"], row["period"], row["period_start"]): [float(row["total_value"]), row["entry_count"], row["days_active"]]
+        for row in rows
+    }
+
+def compare_rollups(expected: Dict[RollupKey, List[float]], stored: Dict[RollupKey, List[float]]) -> List[RollupKey]:
+    """Keys whose stored rollup is missing, stale or should not exist"""
+    empty = [0.0, 0, 0]
+    mismatched = []
+    for key in sorted(set(expected) | set(stored)):
+        want, have = expected.get(key, empty), stored.get(key, empty)
+        if abs(want[0] - have[0]) > TOTAL_TOLERANCE or want[1:] != have[1:]:
+            mismatched.append(key)
+    return mismatched
+
+async def rebuild_rollups(supabase, write: bool = True) -> dict:
+    """
+    Recompute activity_rollups from daily_entries and repair the rows that
+    differ. Writes that happen while it runs may be lost; run it while idle.
+    """
+    expected = await expected_rollups(supabase)
+    stored = await stored_rollups(supabase)
+    mismatched = compare_rollups(expected, stored)
+
+    if write and mismatched:
+        repaired = [key for key in mismatched if key in expected]
+        rows = _rows({key: expected[key] for key in repaired})
+        for start in range(0, len(rows), BATCH_CHUNK_SIZE):
+            await supabase.table("activity_rollups").upsert(
+                rows[start:start + BATCH_CHUNK_SIZE], on_conflict="activity_id,period,period_start"
+            ).execute()
+        for activity_id, period, start in (key for key in mismatched if key not in expected):
+            await supabase.table("activity_rollups").delete().eq("activity_id", activity_id).eq("period", period).eq("period_start", start).execute()
+        stored = await stored_rollups(supabase)
+
+    return {
+        "entries_periods": len(expected),
+        "mismatched": len(mismatched),
+        "remaining": len(compare_rollups(expected, stored)),
+    }
+
+async def read_trends(
+    supabase,
+    period: str,
+    activity_ids: List[str],
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> List[dict]:
+    """Rollup rows of the given activities and period, oldest first"""
+    if not activity_ids:
+        return []
+
+    def build_query():
+        query = supabase.table("activity_rollups").select("activity_id,period_start,total_value,entry_count,days_active").eq(
+            "period", period
+        ).in_("activity_id", activity_ids)
+        if start:
+            query = query.gte("period_start", start)
+        if end:
+            query = query.lte("period_start", end)
+        return query.order("period_start").order("activity_id")
+
+    return await fetch_all(build_query)
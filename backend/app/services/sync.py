@@ -0,0 +1,115 @@
+"""
+Cambios incrementales para GET /api/sync.
+
+Cada tabla sincronizada (y sync_deletions, el registro de borrados físicos)
+se lee en orden de (updated_at, id) a partir de la posición que guarda el
+cursor del cliente, con una búsqueda por índice en lugar de recargar todo.
+Las actividades desactivadas y las filas borradas salen como tombstones.
+
+updated_at se fija al empezar cada transacción, así que una escritura puede
+hacerse visible con un updated_at anterior a filas ya enviadas. Por eso el
+cursor nunca pasa de ahora - SYNC_OVERLAP_SECONDS (el horizonte): cada
+página lee primero hasta el horizonte y, solo si no se llena, añade las
+filas posteriores sin avanzar el cursor sobre ellas. Se reenvían en la
+siguiente llamada y el cliente las aplica como upserts idempotentes por id.
+Las entradas que aún esperan en el buffer de escritura diferida llegan
+cuando se escriben.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.database import decode_cursor, encode_cursor, keyset_query
+
+SYNC_TABLES = ("activities", "daily_entries", "weekly_goals", "weekly_reflections", "activity_goals")
+STREAMS = SYNC_TABLES + ("sync_deletions",)
+SYNC_KEYS = ("updated_at", "id")
+
+# Menor uuid posible: la posición (T, MIN_ID) incluye todas las filas con updated_at = T
+MIN_ID = "00000000-0000-0000-0000-000000000000"
+
+Position = Optional[Tuple[str, str]]
+
+def decode_sync_cursor(token: str) -> List[Position]:
+    """Positions of every stream (None = from the beginning); raises ValueError"""
+    values = decode_cursor(token, 2 * len(STREAMS))
+    positions: List[Position] = []
+    for index in range(0, len(values), 2):
+        updated_at, row_id = values[index], values[index + 1]
+        if updated_at:
+            datetime.fromisoformat(updated_at)
+            uuid.UUID(row_id)
+        positions.append((updated_at, row_id) if updated_at else None)
+    return positions
+
+def encode_sync_cursor(positions: Sequence[Position]) -> str:
+    return encode_cursor([value for position in positions for value in (position or ("", ""))])
+
+def _sort_key(position: Tuple[str, str]) -> Tuple[datetime, str]:
+    # Comparar instantes, no textos: PostgREST y SQLite formatean distinto
+    return datetime.fromisoformat(position[0]), position[1]
+
+def next_position(position: Position, settled: List[dict], limit: int, horizon: Tuple[str, str]) -> Position:
+    """
+    Where the next call resumes given the rows read up to the horizon: the
+    last of them when the page was full, else the horizon; never backwards.
+    """
+    if len(settled) == limit:
+        return settled[-1]["updated_at"], settled[-1]["id"]
+    if position is None:
+        return horizon
+    return max(position, horizon, key=_sort_key)
+
+async def _read_stream(supabase, table: str, position: Position, limit: int, horizon: Tuple[str, str]) -> Tuple[List[dict], List[dict]]:
+    """Rows after position up to the horizon and, if that page is not full, the rows after the horizon"""
+    after = list(position) if position else None
+    query = supabase.table(table).select("*").lte("updated_at", horizon[0])
+    settled = (await keyset_query(query, SYNC_KEYS, after, limit, desc=False).execute()).data
+    if len(settled) == limit:
+        return settled, []
+    query = supabase.table(table).select("*").gt("updated_at", horizon[0])
+    recent = (await keyset_query(query, SYNC_KEYS, after, limit - len(settled), desc=False).execute()).data
+    return settled, recent
+
+async def read_changes(supabase, positions: Sequence[Position], limit: int, overlap_seconds: float) -> dict:
+    """
+    Rows changed after each position (at most `limit` per table) plus
+    tombstones, with the cursor of the next call. has_more means some table
+    filled its page before the horizon: call again right away with the new
+    cursor.
+    """
+    now = datetime.now(timezone.utc)
+    # Milisegundos (truncados): la precisión de updated_at en SQLite
+    horizon = ((now - timedelta(seconds=overlap_seconds)).isoformat(timespec="milliseconds"), MIN_ID)
+
+    pages = await asyncio.gather(*(
+        _read_stream(supabase, stream, position, limit, horizon) for stream, position in zip(STREAMS, positions)
+    ))
+
+    changes: Dict[str, List[dict]] = {table: [] for table in SYNC_TABLES}
+    tombstones: List[dict] = []
+    for stream, (settled, recent) in zip(STREAMS, pages):
+        rows = settled + recent
+        if stream == "sync_deletions":
+            tombstones.extend(
+                {"table": row["table_name"], "id": row["row_id"], "deleted_at": row["updated_at"]} for row in rows
+            )
+        elif stream == "activities":
+            for row in rows:
+                if row.get("is_active", True):
+                    changes[stream].append(row)
+                else:
+                    tombstones.append({"table": stream, "id": row["id"], "deleted_at": row.get("deactivated_at") or row["updated_at"]})
+        else:
+            changes[stream] = rows
+
+    return {
+        "cursor": encode_sync_cursor([
+            next_position(position, settled, limit, horizon) for position, (settled, _) in zip(positions, pages)
+        ]),
+        "has_more": any(len(settled) == limit for settled, _ in pages),
+        "server_time": now.isoformat(),
+        "changes": changes,
+        "tombstones": tombstones,
+    }
@@ -0,0 +1,182 @@
+"""
+Estado de los cronómetros compartido entre dispositivos.
+
+El estado vive en memoria (cargado una vez desde timer_sync) y cada cambio
+se envía al momento a los dispositivos suscritos por Server-Sent Events: un
+dispositivo abre una sola conexión para todos sus cronómetros en lugar de
+consultar cada uno cada 30 segundos. Crear un cronómetro se escribe en el
+acto; pausas, reanudaciones y borrados se acumulan y se escriben juntos cada
+TIMER_SYNC_FLUSH_INTERVAL segundos (solo el último estado de cada uno).
+
+El estado es por proceso: con varios workers los dispositivos deben llegar
+al mismo (o ejecutar un solo worker para la API de cronómetros).
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.database import fetch_all, get_supabase
+from app.core.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Columnas de timer_sync que se guardan (created_at/updated_at los pone la base de datos)
+TIMER_COLUMNS = ("id", "activity_id", "activity_name", "for_date", "is_active", "start_time", "paused_time")
+
+# Eventos pendientes por suscriptor; si se llena se le reenvía el estado completo
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Comentario SSE periódico para que proxies y navegadores no cierren la conexión
+KEEPALIVE_SECONDS = 15.0
+
+_RESYNC = object()
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _sse(event: str, payload, event_id: int) -> bytes:
+    return f"event: {event}\nid: {event_id}\ndata: ".encode() + dumps(payload) + b"\n\n"
+
+class TimerHub:
+    """In-memory timers with push notifications and coalesced writes to timer_sync"""
+
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._timers: Dict[str, dict] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._create_lock = asyncio.Lock()
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._event_id = 0
+
+    async def load(self, supabase) -> None:
+        """Read timer_sync once per process"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            rows = await fetch_all(lambda: supabase.table("timer_sync").select("*").order("id"))
+            self._timers = {row["id"]: row for row in rows}
+            self._loaded = True
+
+    def list(self, for_date: Optional[str] = None) -> List[dict]:
+        return [timer for timer in self._timers.values() if for_date is None or timer["for_date"] == for_date]
+
+    def get(self, timer_id: str) -> Optional[dict]:
+        return self._timers.get(timer_id)
+
+    async def create(self, supabase, data: dict) -> dict:
+        """Timer of the activity and date, inserted right away if there is none"""
+        await self.load(supabase)
+        async with self._create_lock:
+            for timer in self._timers.values():
+                if timer["activity_id"].lower() == data["activity_id"].lower() and timer["for_date"] == data["for_date"]:
+                    return timer
+
+            row = {"id": str(uuid.uuid4()), **data}
+            # La inserción es síncrona para que una actividad inexistente falle aquí
+            response = await supabase.table("timer_sync").insert(row).execute()
+            timer = response.data[0]
+            self._timers[timer["id"]] = timer
+        self._publish("timer", timer)
+        return timer
+
+    def update(self, timer_id: str, changes: dict) -> Optional[dict]:
+        timer = self._timers.get(timer_id)
+        if timer is None:
+            return None
+        timer.update(changes, updated_at=_now())
+        self._dirty.add(timer_id)
+        self._publish("timer", timer)
+        self._schedule_flush()
+        return timer
+
+    def delete(self, timer_id: str) -> bool:
+        if self._timers.pop(timer_id, None) is None:
+            return False
+        self._dirty.discard(timer_id)
+        self._deleted.add(timer_id)
+        self._publish("deleted", {"id": timer_id})
+        self._schedule_flush()
+        return True
+
+    # --- escrituras acumuladas ---
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self._write()
+
+    async def _write(self) -> None:
+        dirty, self._dirty = self._dirty, set()
+        deleted, self._deleted = self._deleted, set()
+        rows = [{column: self._timers[timer_id][column] for column in TIMER_COLUMNS} for timer_id in dirty if timer_id in self._timers]
+        if not rows and not deleted:
+            return
+        try:
+            supabase = await get_supabase()
+            if rows:
+                await supabase.table("timer_sync").upsert(rows).execute()
+            if deleted:
+                await supabase.table("timer_sync").delete().in_("id", sorted(deleted)).execute()
+        except Exception:
+            # Se reintenta en la siguiente escritura (lo que cambió entretanto ya está incluido)
+            logger.exception("Fallo al guardar %d cronómetros en timer_sync", len(rows) + len(deleted))
+            self._dirty |= {row["id"] for row in rows if row["id"] in self._timers}
+            self._deleted |= deleted
+            self._schedule_flush()
+
+    async def flush(self) -> None:
+        """Write pending changes now (on shutdown)"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._write()
+
+    # --- suscripciones ---
+
+    def _publish(self, event: str, payload: dict) -> None:
+        self._event_id += 1
+        message = _sse(event, payload, self._event_id)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente lento: descartar lo pendiente y mandarle el estado completo
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+
+    def _snapshot(self) -> bytes:
+        return _sse("snapshot", {"timers": self.list()}, self._event_id)
+
+    async def stream(self, is_disconnected, keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[bytes]:
+        """SSE stream: a snapshot of every timer, then each change as it happens"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield self._snapshot()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                yield self._snapshot() if message is _RESYNC else message
+        finally:
+            self._subscribers.discard(queue)
+
+timer_hub = TimerHub(settings.TIMER_SYNC_FLUSH_INTERVAL)
@@ -0,0 +1,266 @@
+"""
+Exportación e importación del historial completo.
+
+La exportación recorre cada tabla por keyset (páginas de PAGE_SIZE filas en
+orden de id) y la entrega como NDJSON ({"table": ..., "data": {...}} por
+línea, todas las tablas) o CSV (una tabla), sin tener más de una página en
+memoria. No es una foto consistente: lo escrito durante la exportación
+puede salir o no.
+
+La importación lee el cuerpo de la petición a medida que llega, acumula
+filas por tabla y las escribe con upsert_batch en bloques de
+BATCH_CHUNK_SIZE, conservando los id exportados. Las entradas actualizan
+activity_rollups por el trigger de daily_entries, y las metas de las semanas
+tocadas se evalúan al terminar. El progreso se consulta con
+GET /api/import/{import_id} mientras dura.
+"""
+import codecs
+import csv
+import io
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.core.cache import dashboard_cache, week_start_of
+from app.core.database import iter_keyset_pages
+from app.core.responses import dumps
+from app.models.schemas import (
+    ActivityGoalImport,
+    ActivityImport,
+    DailyEntryImport,
+    WeeklyGoalImport,
+    WeeklyReflectionImport,
+)
+from app.services.batch import BATCH_CHUNK_SIZE, upsert_batch
+from app.services.entry_buffer import entry_buffer
+from app.services.goals import evaluate_goals
+from app.services.history_index import history_index
+
+# Tablas exportadas, las referenciadas primero (orden de importación)
+EXPORT_COLUMNS = {
+    "activities": ("id", "name", "is_active", "activity_type", "target_unit", "display_order", "created_at", "updated_at", "deactivated_at"),
+    "daily_entries": ("id", "activity_id", "entry_date", "value_amount", "created_at", "updated_at"),
+    "weekly_goals": ("id", "activity_id", "week_start_date", "target_value", "achieved", "achieved_at", "created_at", "updated_at"),
+    "weekly_reflections": ("id", "activity_id", "week_start_date", "reflection_text", "created_at", "updated_at"),
+    "activity_goals": ("id", "activity_id", "week_start_date", "goal_text", "completed", "display_order", "completed_at", "created_at", "updated_at"),
+}
+EXPORT_TABLES = tuple(EXPORT_COLUMNS)
+
+# Modelo y clave única de cada tabla al importar
+IMPORT_TARGETS = {
+    "activities": (ActivityImport, ("id",)),
+    "daily_entries": (DailyEntryImport, ("activity_id", "entry_date")),
+    "weekly_goals": (WeeklyGoalImport, ("activity_id", "week_start_date")),
+    "weekly_reflections": (WeeklyReflectionImport, ("activity_id", "week_start_date")),
+    "activity_goals": (ActivityGoalImport, ("activity_id", "week_start_date", "goal_text")),
+}
+
+# Errores por elemento que se guardan en el progreso (el resto solo se cuenta)
+MAX_REPORTED_ERRORS = 100
+
+# Importaciones recientes consultables por id
+MAX_TRACKED_IMPORTS = 20
+
+# --- exportación ---
+
+async def iter_export_pages(supabase, tables) -> AsyncIterator[Tuple[str, List[dict]]]:
+    for table in tables:
+        columns = ",".join(EXPORT_COLUMNS[table])
+        pages = iter_keyset_pages(lambda: supabase.table(table).select(columns), ("id",), desc=False)
+        async for page in pages:
+            yield table, page
+
+async def export_ndjson(supabase, tables) -> AsyncIterator[bytes]:
+    async for table, rows in iter_export_pages(supabase, tables):
+        yield b"".join(dumps({"table": table, "data": row}) + b"\n" for row in rows)
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+async def export_csv(supabase, table: str) -> AsyncIterator[bytes]:
+    columns = EXPORT_COLUMNS[table]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    async for _, rows in iter_export_pages(supabase, (table,)):
+        writer.writerows([_csv_value(row.get(column)) for column in columns] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Tabla vacía: solo la cabecera
+        yield buffer.getvalue().encode("utf-8")
+
+# --- lectura incremental del fichero importado ---
+
+Parsed = Tuple[int, Optional[str], Optional[dict]]  # (línea, tabla, fila); fila None = línea inválida
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Parsed]:
+    pending = b""
+    line_number = 0
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _ndjson_record(line_number, line)
+    if pending.strip():
+        yield _ndjson_record(line_number + 1, pending)
+
+def _ndjson_record(line_number: int, line: bytes) -> Parsed:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line_number, None, None
+    if not isinstance(record, dict) or not isinstance(record.get("data"), dict):
+        return line_number, None, None
+    return line_number, record.get("table"), record["data"]
+
+def _complete_prefix(text: str) -> int:
+    """Length of the longest prefix made of whole CSV records (quoted newlines included)"""
+    quoted = False
+    end = 0
+    for index, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif char == "\n" and not quoted:
+            end = index + 1
+    return end
+
+async def parse_csv(chunks: AsyncIterator[bytes], table: str) -> AsyncIterator[Parsed]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    header: Optional[List[str]] = None
+    record_number = 0
+
+    def records(text: str):
+        nonlocal header, record_number
+        for values in csv.reader(io.StringIO(text)):
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            record_number += 1
+            if len(values) != len(header):
+                yield record_number, table, None
+                continue
+            # Celdas vacías = NULL, como en la exportación
+            yield record_number, table, {name: value for name, value in zip(header, values) if value != ""}
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        end = _complete_prefix(pending)
+        if end:
+            for record in records(pending[:end]):
+                yield record
+            pending = pending[end:]
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        for record in records(pending):
+            yield record
+
+# --- importación ---
+
+class ImportJob:
+    """Chunked loader of one import, with the progress reported by the API"""
+
+    def __init__(self, supabase, job_id: str):
+        self.supabase = supabase
+        self.id = job_id
+        self.status = "running"
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.counts = {table: {"processed": 0, "succeeded": 0, "failed": 0} for table in EXPORT_TABLES}
+        self.rejected = 0  # líneas ilegibles o de tablas desconocidas
+        self.errors: List[dict] = []
+        self._pending: Dict[str, List[dict]] = {table: [] for table in EXPORT_TABLES}
+        self._goal_pairs: Set[Tuple[str, str]] = set()
+        self._weeks: Set[str] = set()
+
+    def _error(self, **details) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(details)
+
+    async def add(self, line: int, table: Optional[str], row: Optional[dict]) -> None:
+        if row is None or table not in self._pending:
+            self.rejected += 1
+            self._error(line=line, error="Línea inválida" if row is None else f"Tabla desconocida: {table}")
+            return
+        self._pending[table].append(row)
+        if len(self._pending[table]) >= BATCH_CHUNK_SIZE:
+            await self._flush(table)
+
+    async def _flush(self, table: str) -> None:
+        # Las actividades pendientes primero: el resto las referencia
+        if table != "activities" and self._pending["activities"]:
+            await self._flush("activities")
+        rows, self._pending[table] = self._pending[table], []
+        if not rows:
+            return
+
+        model, key_fields = IMPORT_TARGETS[table]
+        if table == "daily_entries":
+            # Como el batch de /api/entries: sustituye a lo pendiente en el buffer
+            result, saved = await entry_buffer.upsert_entries(self.supabase, rows, model)
+        else:
+            result, saved = await upsert_batch(self.supabase, table, rows, model, key_fields)
+
+        if table == "daily_entries" and saved:
+            history_index.record(saved)
+            self._goal_pairs.update((row["activity_id"], week_start_of(row["entry_date"])) for row in saved)
+        elif table == "weekly_goals":
+            self._goal_pairs.update((row["activity_id"], row["week_start_date"]) for row in saved)
+
+        counts = self.counts[table]
+        counts["processed"] += result.total
+        counts["succeeded"] += result.succeeded
+        counts["failed"] += result.failed
+        for item in result.results:
+            if item.status == "error":
+                self._error(table=table, row_id=rows[item.index].get("id"), error=item.error)
+
+    async def finish(self) -> None:
+        for table in EXPORT_TABLES:
+            await self._flush(table)
+        pairs = sorted(self._goal_pairs)
+        for start in range(0, len(pairs), BATCH_CHUNK_SIZE):
+            await evaluate_goals(self.supabase, pairs[start:start + BATCH_CHUNK_SIZE])
+        dashboard_cache.invalidate_all()
+        self.status = "completed"
+        self.finished_at = time.time()
+
+    def fail(self, error: str) -> None:
+        # Lo ya escrito se queda: volver a importar el fichero es idempotente
+        dashboard_cache.invalidate_all()
+        self.status = "failed"
+        self.finished_at = time.time()
+        self._error(error=error)
+
+    def progress(self) -> dict:
+        return {
+            "import_id": self.id,
+            "status": self.status,
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.started_at, 3),
+            "tables": self.counts,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+_jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+
+def start_import(supabase, job_id: Optional[str] = None) -> ImportJob:
+    job = ImportJob(supabase, job_id or str(uuid.uuid4()))
+    _jobs[job.id] = job
+    _jobs.move_to_end(job.id)
+    while len(_jobs) > MAX_TRACKED_IMPORTS:
+        _jobs.popitem(last=False)
+    return job
+
+def get_import(job_id: str) -> Optional[ImportJob]:
+    return _jobs.get(job_id)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia y carga de la API contra un PostgREST falso local.
+
+Para cada combinación de número de actividades y años de historial genera
+los datos (datagen.py), arranca stub_postgrest.py con la latencia indicada
+y lanza --requests peticiones con --concurrency en paralelo a cada
+escenario (dashboard, listados, escrituras...). Informa por escenario de
+p50/p95/p99, throughput, errores y llamadas al PostgREST falso por
+petición, y guarda todo en JSON para comparar entre commits:
+
+    python benchmarks/bench_api.py --activities 10,40 --years 1,3 --output base.json
+    git checkout otra-rama
+    python benchmarks/bench_api.py --activities 10,40 --years 1,3 --compare base.json
+
+Con --compare sale con código 1 si algún p50/p95 empeora más de --threshold.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datagen import generate_dataset, write_dataset
+from stub_postgrest import start_stub
+
+# JWT de prueba: el cliente de Supabase solo valida el formato
+DUMMY_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+class Scenario:
+    """Dataset facts the scenarios draw random requests from"""
+
+    def __init__(self, data: Dict[str, List[dict]], end_date: date, seed: int):
+        self.rng = random.Random(seed)
+        self.activity_ids = [activity["id"] for activity in data["activities"]]
+        self.weeks = sorted({goal["week_start_date"] for goal in data["weekly_goals"]})
+        self.end_date = end_date
+
+    def activity(self) -> str:
+        return self.rng.choice(self.activity_ids)
+
+    def week(self) -> str:
+        return self.rng.choice(self.weeks)
+
+    def recent_day(self) -> str:
+        return (self.end_date - timedelta(days=self.rng.randrange(14))).isoformat()
+
+def _plus_days(day: str, days: int) -> str:
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+# Escenarios: nombre -> petición (método, url, json) a partir de los datos
+SCENARIOS: Dict[str, Callable[[Scenario], tuple]] = {
+    "dashboard_week": lambda s: ("GET", f"/api/dashboard/{s.week()}", None),
+    "dashboard_range_12w": lambda s: ("GET", f"/api/dashboard/range?from={(w := s.week())}&to={_plus_days(w, 77)}", None),
+    "entries_page": lambda s: ("GET", f"/api/entries/?activity_id={s.activity()}&limit=100", None),
+    "entries_month": lambda s: ("GET", f"/api/entries/?activity_id={s.activity()}&start_date={(w := s.week())}&end_date={_plus_days(w, 30)}", None),
+    "analytics_trends": lambda s: ("GET", f"/api/analytics/trends?period=week&start_date={s.weeks[max(0, len(s.weeks) - 26)]}", None),
+    "entries_post": lambda s: ("POST", "/api/entries/", {"activity_id": s.activity(), "entry_date": s.recent_day(), "value_amount": round(s.rng.random() * 4, 2)}),
+    "entries_batch_50": lambda s: ("POST", "/api/entries/batch", [
+        {"activity_id": s.activity(), "entry_date": s.recent_day(), "value_amount": round(s.rng.random() * 4, 2)} for _ in range(50)
+    ]),
+    "goals_post": lambda s: ("POST", "/api/goals/", {"activity_id": s.activity(), "week_start_date": s.weeks[-1], "target_value": float(s.rng.randint(1, 20))}),
+}
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))]
+
+async def run_scenario(client: httpx.AsyncClient, stub: httpx.AsyncClient, name: str, scenario: Scenario, requests: int, concurrency: int, warmup: int) -> dict:
+    make_request = SCENARIOS[name]
+
+    async def send() -> tuple:
+        method, url, body = make_request(scenario)
+        started = time.perf_counter()
+        response = await client.request(method, url, json=body)
+        return time.perf_counter() - started, response.status_code < 400
+
+    for _ in range(warmup):
+        await send()
+    await stub.post("/__stats/reset")
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            elapsed, ok = await send()
+            latencies.append(elapsed)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    upstream = (await stub.get("/__stats")).json()
+
+    latencies.sort()
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "upstream_calls": upstream["requests"],
+        "upstream_calls_per_request": round(upstream["requests"] / requests, 2),
+        "upstream_by_route": upstream["by_route"],
+    }
+
+async def run_scale(args, n_activities: int, years: float, scenarios: List[str]) -> List[dict]:
+    from app.core.cache import dashboard_cache
+    from app.core.database import close_supabase
+    from app.main import app
+    from app.services.goals import goal_evaluator
+
+    end_date = date.fromisoformat(args.end_date)
+    data = generate_dataset(n_activities, int(years * 365), end_date, args.seed)
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    write_dataset(db_path, data)
+    scenario = Scenario(data, end_date, args.seed)
+
+    stub_process = start_stub(db_path, args.latency_ms, args.port, args.jitter_ms)
+    if args.no_cache:
+        dashboard_cache.max_entries = 0
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api", timeout=60) as client, \
+                httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}") as stub:
+            for name in scenarios:
+                result = await run_scenario(client, stub, name, scenario, args.requests, args.concurrency, args.warmup)
+                result.update(activities=n_activities, years=years, entries=len(data["daily_entries"]))
+                results.append(result)
+                print(
+                    f"   {name:<22} p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                    f"p99 {result['p99_ms']:>8.1f} ms  {result['throughput_rps']:>7.1f} req/s  "
+                    f"{result['upstream_calls_per_request']:>5.1f} upstream/req  errores {result['errors']}"
+                )
+            # Evaluaciones de metas pendientes de los POST sueltos, antes de parar el stub
+            await goal_evaluator.flush()
+    finally:
+        await close_supabase()
+        dashboard_cache.invalidate_all()
+        stub_process.terminate()
+        stub_process.join()
+    return results
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> int:
+    """Print p50/p95 changes against a previous run; number of regressions"""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {
+            (row["activities"], row["years"], row["endpoint"]): row
+            for row in json.load(baseline_file)["results"]
+        }
+    regressions = 0
+    print(f"\n📈 Comparación con {baseline_path} (umbral {threshold:.0%})")
+    for row in results:
+        old = baseline.get((row["activities"], row["years"], row["endpoint"]))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms"):
+            ratio = row[metric] / old[metric] if old[metric] else 1.0
+            regressed = ratio > 1 + threshold
+            regressions += regressed
+            changes.append(f"{metric[:3]} {old[metric]:.1f} -> {row[metric]:.1f} ms ({ratio - 1:+.0%}){' ❌' if regressed else ''}")
+        print(f"   {row['activities']}x{row['years']}a {row['endpoint']:<22} " + "  ".join(changes))
+    return regressions
+
+def _numbers(kind):
+    return lambda value: [kind(item) for item in value.split(",")]
+
+async def main(args) -> int:
+    scenarios = args.endpoints or list(SCENARIOS)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(sorted(unknown))} (disponibles: {', '.join(SCENARIOS)})")
+
+    results = []
+    for n_activities in args.activities:
+        for years in args.years:
+            print(f"📊 {n_activities} actividades x {years} años, latencia upstream {args.latency_ms} ms, concurrencia {args.concurrency}")
+            results += await run_scale(args, n_activities, years, scenarios)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "dashboard_cache": not args.no_cache,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"\n✅ Resultados guardados en {args.output}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de latencia de la API")
+    parser.add_argument("--activities", type=_numbers(int), default=[10, 40], help="lista separada por comas")
+    parser.add_argument("--years", type=_numbers(float), default=[1.0], help="lista separada por comas")
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), default=None, help=f"escenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--no-cache", action="store_true", help="desactivar la caché de dashboards")
+    parser.add_argument("--end-date", default="2025-11-23")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=54398)
+    parser.add_argument("--output", default="", help="fichero JSON de resultados")
+    parser.add_argument("--compare", default="", help="JSON de una ejecución anterior")
+    parser.add_argument("--threshold", type=float, default=0.10, help="empeoramiento tolerado con --compare")
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = "supabase"
+    # Trazas muestreadas como en producción (en desarrollo se trazan todas las peticiones)
+    os.environ.setdefault("ENVIRONMENT", "production")
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ["SUPABASE_KEY"] = DUMMY_KEY
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia del dashboard contra un PostgREST falso local.
+
+Genera una semana de datos, lanza el servidor de stub_postgrest.py en otro
+proceso, apunta la API a él y
+dispara N peticiones paralelas a /api/dashboard/{semana}. Con el cliente
+asíncrono las peticiones se solapan en el event loop, así que el tiempo
+total se acerca al de una sola petición en lugar de crecer con N. La caché
+de dashboards se desactiva: si no, todas salvo el calentamiento serían
+aciertos y se mediría la caché, no las llamadas al upstream.
+
+Uso:
+    python benchmarks/bench_concurrency.py --parallel 50 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datagen import generate_dataset, write_dataset
+from stub_postgrest import start_stub
+
+# JWT de prueba: el cliente de Supabase solo valida el formato
+DUMMY_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+async def run(args) -> None:
+    import httpx
+    from app.core.cache import dashboard_cache
+    from app.main import app
+
+    # Cada petición construye el dashboard contra el upstream
+    dashboard_cache.max_entries = 0
+    week = args.week
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        # Calentar: crea el cliente de Supabase y abre la conexión keep-alive
+        warmup = await client.get(f"/api/dashboard/{week}")
+        warmup.raise_for_status()
+
+        async def one_request():
+            started = time.perf_counter()
+            response = await client.get(f"/api/dashboard/{week}")
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            latencies += await asyncio.gather(*(one_request() for _ in range(args.parallel)))
+        elapsed = time.perf_counter() - started
+
+    total = args.parallel * args.rounds
+    latencies.sort()
+    print(f"📊 {total} peticiones ({args.parallel} en paralelo x {args.rounds} rondas)")
+    print(f"   actividades: {args.activities}, latencia upstream: {args.latency_ms} ms")
+    print(f"   throughput: {total / elapsed:.1f} req/s")
+    print(f"   p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"   p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"   tiempo total: {elapsed:.2f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia del dashboard")
+    parser.add_argument("--activities", type=int, default=40)
+    parser.add_argument("--parallel", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--week", default="2025-11-17")
+    parser.add_argument("--port", type=int, default=54399)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    week_end = date.fromisoformat(args.week) + timedelta(days=6)
+    write_dataset(db_path, generate_dataset(args.activities, 7, week_end, fill_ratio=1.0))
+    stub_process = start_stub(db_path, args.latency_ms, args.port)
+
+    os.environ.setdefault("ENVIRONMENT", "production")
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ["SUPABASE_KEY"] = DUMMY_KEY
+    # Sin el nivel compartido de la caché, que también respondería sin upstream
+    os.environ.pop("DASHBOARD_CACHE_SHARED_PATH", None)
+    try:
+        asyncio.run(run(args))
+    finally:
+        stub_process.terminate()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de listados (filas/segundo).
+
+Compara la ruta por defecto de FastAPI (validar cada fila contra
+response_model=List[DailyEntry], jsonable_encoder y json estándar) con la
+ruta rápida de app/core/responses.py (proyección de columnas sin validar y
+codificación con orjson) sobre filas con la forma que devuelve PostgREST.
+
+Uso:
+    python benchmarks/bench_serialization.py --rows 5000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import orjson, trusted_response
+from app.models.schemas import DailyEntry
+
+def generate_rows(n_rows: int) -> List[dict]:
+    """Filas de daily_entries tal como llegan de PostgREST (select *)"""
+    activity_ids = [str(uuid.uuid4()) for _ in range(20)]
+    first_day = date(2020, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "activity_id": activity_ids[i % len(activity_ids)],
+            "entry_date": (first_day + timedelta(days=i // len(activity_ids))).isoformat(),
+            "value_amount": (i % 17) * 0.25,
+            "created_at": "2025-11-17T08:30:00.123456+00:00",
+            "updated_at": "2025-11-17T08:30:00.123456+00:00",
+        }
+        for i in range(n_rows)
+    ]
+
+async def default_path(field, rows: List[dict]) -> bytes:
+    # Lo que hace FastAPI con un dict devuelto y response_model=List[DailyEntry]
+    content = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+    return JSONResponse(content).body
+
+async def fast_path(rows: List[dict]) -> bytes:
+    return trusted_response(DailyEntry, rows).body
+
+async def measure(label: str, make_body, n_rows: int, repeat: int) -> float:
+    await make_body()  # calentar cachés de pydantic/orjson
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = await make_body()
+    elapsed = time.perf_counter() - start
+    rate = n_rows * repeat / elapsed
+    print(f"   {label:<28} {rate:>12,.0f} filas/s  ({elapsed / repeat * 1000:.1f} ms por respuesta, {len(body):,} bytes)")
+    return rate
+
+async def run(args) -> None:
+    rows = generate_rows(args.rows)
+    field = create_model_field(name="Response_get_entries", type_=List[DailyEntry], mode="serialization")
+
+    print(f"📊 {args.rows} filas x {args.repeat} repeticiones (orjson: {'sí' if orjson else 'no'})")
+    before = await measure("antes (pydantic + json)", lambda: default_path(field, rows), args.rows, args.repeat)
+    after = await measure("después (trusted + orjson)", lambda: fast_path(rows), args.rows, args.repeat)
+    print(f"   mejora: x{after / before:.1f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos para los benchmarks.
+
+Crea N actividades con M años de historial: entradas diarias (con días
+vacíos), metas y reflexiones semanales; los agregados de activity_rollups
+los rellena el trigger de daily_entries al insertar. Los datos son
+deterministas para una misma semilla, de modo que dos commits se miden
+sobre exactamente los mismos datos.
+
+Uso:
+    python benchmarks/datagen.py --activities 40 --years 3 --output bench.db
+"""
+import argparse
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.sqlite_backend import SQLiteClient
+
+REFLECTIONS = ["Semana productiva", "Me costó arrancar", "Buen ritmo", "Poco tiempo libre", "Mejorando"]
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def generate_dataset(n_activities: int, days: int, end_date: date, seed: int = 42, fill_ratio: float = 0.7) -> Dict[str, List[dict]]:
+    """
+    Filas de cada tabla para n_activities con `days` días de historial
+    terminando en end_date. fill_ratio es la probabilidad de que un día
+    tenga entrada; metas en todas las semanas y reflexiones en la mitad.
+    """
+    rng = random.Random(seed)
+    first_day = end_date - timedelta(days=days - 1)
+    first_week = first_day - timedelta(days=first_day.weekday())
+    weeks = [first_week + timedelta(weeks=i) for i in range((end_date - first_week).days // 7 + 1)]
+
+    activities = [
+        {
+            "id": _uuid(rng),
+            "name": f"Actividad {i + 1}",
+            "is_active": True,
+            "activity_type": "time" if i % 3 else "count",
+            "target_unit": "horas" if i % 3 else "veces",
+            "display_order": i,
+            "created_at": f"2020-01-01T00:00:{i % 60:02d}.{i:06d}+00:00",
+        }
+        for i in range(n_activities)
+    ]
+
+    entries, goals, reflections = [], [], []
+    for activity in activities:
+        scale = 4 if activity["activity_type"] == "time" else 10
+        for offset in range(days):
+            if rng.random() < fill_ratio:
+                entries.append({
+                    "id": _uuid(rng),
+                    "activity_id": activity["id"],
+                    "entry_date": (first_day + timedelta(days=offset)).isoformat(),
+                    "value_amount": round(rng.random() * scale, 2),
+                })
+        for week in weeks:
+            goals.append({
+                "id": _uuid(rng),
+                "activity_id": activity["id"],
+                "week_start_date": week.isoformat(),
+                "target_value": float(rng.randint(1, 5 * scale)),
+            })
+            if rng.random() < 0.5:
+                reflections.append({
+                    "id": _uuid(rng),
+                    "activity_id": activity["id"],
+                    "week_start_date": week.isoformat(),
+                    "reflection_text": rng.choice(REFLECTIONS),
+                })
+
+    return {
+        "activities": activities,
+        "daily_entries": entries,
+        "weekly_goals": goals,
+        "weekly_reflections": reflections,
+    }
+
+def write_dataset(path: str, data: Dict[str, List[dict]]) -> None:
+    """Create a fresh SQLite database at path with the dataset and its rollups"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    client = SQLiteClient(path)
+    connection = client.connection
+    # Carga masiva: sin esperar a disco en cada commit
+    connection.execute("PRAGMA synchronous = OFF")
+    with connection:
+        for table, rows in data.items():
+            if not rows:
+                continue
+            columns = list(rows[0])
+            connection.executemany(
+                f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})',
+                [[row[column] for column in columns] for row in rows],
+            )
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generar datos sintéticos en SQLite")
+    parser.add_argument("--activities", type=int, default=40)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--end-date", default="2025-11-23")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench.db")
+    args = parser.parse_args()
+
+    data = generate_dataset(args.activities, int(args.years * 365), date.fromisoformat(args.end_date), args.seed)
+    write_dataset(args.output, data)
+    print(f"✅ {args.output}: " + ", ".join(f"{table}={len(rows)}" for table, rows in data.items()))
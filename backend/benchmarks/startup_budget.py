@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de arranque del backend.
+
+Mide, en procesos nuevos y con la mediana de --runs repeticiones:
+- el tiempo de importar app.main (python -X importtime), con los paquetes
+  que más pesan;
+- el arranque en frío: desde lanzar uvicorn hasta el primer /health con
+  200 (incluye el lifespan y la conexión de calentamiento), con SQLite.
+
+Sale con código 1 si alguno supera su presupuesto, para usarlo en CI:
+
+    python benchmarks/startup_budget.py --import-budget-ms 1500 --startup-budget-ms 3000
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuestos por defecto (ms); tests/test_startup_budget.py usa los mismos
+IMPORT_BUDGET_MS = 1500
+STARTUP_BUDGET_MS = 3000
+
+def measure_import() -> Tuple[float, Dict[str, float]]:
+    """Import time of app.main (ms) and the time spent in each top-level package"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # cabecera
+        # Se suma el tiempo propio de cada módulo: los acumulados se solapan
+        module = name.strip()
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(own) / 1000
+        if module == "app.main":
+            total = int(cumulative) / 1000
+    return total, packages
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_startup(db_path: str, timeout: float) -> float:
+    """Milliseconds from spawning uvicorn until /health answers 200"""
+    port = _free_port()
+    env = {**os.environ, "STORAGE_BACKEND": "sqlite", "SQLITE_PATH": db_path, "ENVIRONMENT": "production"}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"❌ uvicorn terminó al arrancar:\n{process.stderr.read().decode()}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return (time.perf_counter() - started) * 1000
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit(f"❌ /health no respondió en {timeout:g} s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main(args) -> int:
+    # Primera importación fuera de la medida: compila los .pyc
+    measure_import()
+
+    imports: List[float] = []
+    packages: Dict[str, List[float]] = {}
+    for _ in range(args.runs):
+        total, by_package = measure_import()
+        imports.append(total)
+        for package, ms in by_package.items():
+            packages.setdefault(package, []).append(ms)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        startups = [measure_startup(os.path.join(tmp, "startup.db"), args.timeout) for _ in range(args.runs)]
+
+    import_ms = statistics.median(imports)
+    startup_ms = statistics.median(startups)
+
+    print(f"📦 import app.main: {import_ms:.0f} ms (presupuesto {args.import_budget_ms:.0f} ms)")
+    heaviest = sorted(((statistics.median(values), package) for package, values in packages.items()), reverse=True)
+    for ms, package in heaviest[:args.top]:
+        print(f"   {package:<24} {ms:7.1f} ms")
+    print(f"🚀 arranque hasta /health: {startup_ms:.0f} ms (presupuesto {args.startup_budget_ms:.0f} ms)")
+
+    over = []
+    if import_ms > args.import_budget_ms:
+        over.append("import")
+    if startup_ms > args.startup_budget_ms:
+        over.append("arranque")
+    if over:
+        print(f"❌ Fuera de presupuesto: {', '.join(over)}")
+        return 1
+    print("✅ Dentro de presupuesto")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo de import y de arranque en frío del backend")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=8, help="paquetes más lentos de importar que se muestran")
+    parser.add_argument("--timeout", type=float, default=30, help="espera máxima de cada arranque (segundos)")
+    sys.exit(main(parser.parse_args()))
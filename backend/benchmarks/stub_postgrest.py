@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Servidor PostgREST falso para benchmarks locales.
+
+Sirve /rest/v1/<tabla> sobre una base de datos SQLite (el mismo
+SQLiteClient que STORAGE_BACKEND=sqlite): traduce los
+parámetros de PostgREST (select, filtros eq/neq/gt/gte/lt/lte/is/in, or,
+order, limit, offset, on_conflict) y las cabeceras Prefer (count,
+resolution) a su query builder, así que admite lecturas y escrituras.
+
+Cada respuesta espera --latency-ms (± --jitter-ms) para simular el salto de
+red a Supabase, y cuenta las llamadas por método y tabla: GET /__stats las
+devuelve y POST /__stats/reset las pone a cero.
+
+Uso:
+    python benchmarks/datagen.py --activities 40 --years 1 --output bench.db
+    python benchmarks/stub_postgrest.py --db bench.db --latency-ms 20
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import time
+from collections import Counter
+
+import uvicorn
+from postgrest.exceptions import APIError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.sqlite_backend import SQLiteClient
+
+RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+# Código HTTP con el que PostgREST responde a cada SQLSTATE
+ERROR_STATUS = {"23505": 409, "23503": 409, "23502": 400, "23514": 400, "42703": 400, "42P01": 404, "PGRST202": 404}
+
+def _coerce(raw: str):
+    # PostgreSQL acepta booleanos sin distinguir mayúsculas (postgrest-py envía "True")
+    if raw.lower() == "true":
+        return True
+    if raw.lower() == "false":
+        return False
+    if raw.lower() == "null":
+        return None
+    return raw
+
+def _in_values(raw: str) -> list:
+    # in.(a,"b,c") -> ["a", "b,c"]
+    return [_coerce(value) for value in next(csv.reader([raw[1:-1]], skipinitialspace=True))] if raw != "()" else []
+
+def apply_filters(builder, params):
+    for column, expression in params.multi_items():
+        if column in RESERVED:
+            continue
+        if column == "or":
+            builder = builder.or_(expression[1:-1])
+            continue
+        op, _, raw = expression.partition(".")
+        if op == "in":
+            builder = builder.in_(column, _in_values(raw))
+        elif op == "is":
+            builder = builder.is_(column, _coerce(raw))
+        elif op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+            builder = getattr(builder, op)(column, _coerce(raw))
+        else:
+            raise APIError({"message": f"operador no soportado: {op}", "code": "PGRST100", "hint": None, "details": None})
+    return builder
+
+def apply_modifiers(builder, params):
+    for clause in filter(None, params.get("order", "").split(",")):
+        column, *options = clause.split(".")
+        builder = builder.order(column, desc="desc" in options, nullsfirst="nullsfirst" in options)
+    offset = int(params.get("offset", 0))
+    if "limit" in params:
+        builder = builder.range(offset, offset + int(params["limit"]) - 1)
+    elif offset:
+        builder = builder.range(offset, sys.maxsize)
+    return builder
+
+def _prefer(request: Request) -> dict:
+    prefer = {}
+    for item in request.headers.get("prefer", "").split(","):
+        key, _, value = item.strip().partition("=")
+        if key:
+            prefer[key] = value
+    return prefer
+
+def create_app(db_path: str, latency_ms: float = 0.0, jitter_ms: float = 0.0) -> Starlette:
+    client = SQLiteClient(db_path)
+    stats = Counter()
+
+    async def upstream_delay():
+        delay = latency_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def error_response(error: APIError) -> JSONResponse:
+        body = {"message": error.message, "code": error.code, "hint": error.hint, "details": error.details}
+        return JSONResponse(body, status_code=ERROR_STATUS.get(error.code, 400))
+
+    async def table_endpoint(request: Request):
+        table = request.path_params["table"]
+        stats[f"{request.method} {table}"] += 1
+        await upstream_delay()
+
+        params = request.query_params
+        prefer = _prefer(request)
+        count = prefer.get("count")
+        try:
+            builder = client.table(table)
+            if request.method == "GET":
+                builder = apply_modifiers(apply_filters(builder.select(params.get("select", "*"), count=count), params), params)
+            elif request.method == "POST":
+                body = json.loads(await request.body())
+                resolution = prefer.get("resolution")
+                if resolution:
+                    builder = builder.upsert(body, count=count, on_conflict=params.get("on_conflict", ""), ignore_duplicates=resolution == "ignore-duplicates")
+                else:
+                    builder = builder.insert(body, count=count)
+            elif request.method == "PATCH":
+                builder = apply_filters(builder.update(json.loads(await request.body()), count=count), params)
+            else:
+                builder = apply_filters(builder.delete(count=count), params)
+            response = await builder.execute()
+        except APIError as error:
+            return error_response(error)
+
+        headers = {}
+        if response.count is not None:
+            last = f"0-{len(response.data) - 1}" if response.data else "*"
+            headers["Content-Range"] = f"{last}/{response.count}"
+        status = 201 if request.method == "POST" else 200
+        return Response(json.dumps(response.data), status_code=status, headers=headers, media_type="application/json")
+
+    async def get_stats(request: Request):
+        return JSONResponse({"requests": sum(stats.values()), "by_route": dict(stats)})
+
+    async def reset_stats(request: Request):
+        stats.clear()
+        return JSONResponse({"requests": 0})
+
+    app = Starlette(routes=[
+        Route("/__stats", get_stats, methods=["GET"]),
+        Route("/__stats/reset", reset_stats, methods=["POST"]),
+        Route("/rest/v1/{table}", table_endpoint, methods=["GET", "POST", "PATCH", "DELETE"]),
+    ])
+    app.state.stats = stats
+    return app
+
+def _serve(db_path: str, latency_ms: float, jitter_ms: float, port: int) -> None:
+    uvicorn.run(create_app(db_path, latency_ms, jitter_ms), host="127.0.0.1", port=port, log_level="warning")
+
+def start_stub(db_path: str, latency_ms: float, port: int, jitter_ms: float = 0.0) -> multiprocessing.Process:
+    """Arranca el PostgREST falso en otro proceso para no competir por el GIL"""
+    process = multiprocessing.Process(target=_serve, args=(db_path, latency_ms, jitter_ms, port), daemon=True)
+    process.start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("El servidor PostgREST falso no arrancó")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor PostgREST falso sobre SQLite")
+    parser.add_argument("--db", required=True, help="base de datos generada con datagen.py")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    _serve(args.db, args.latency_ms, args.jitter_ms, args.port)
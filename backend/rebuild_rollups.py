@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Reconstruye la tabla activity_rollups desde daily_entries y la verifica.
+
+Recalcula los agregados por semana y mes de todo el historial, corrige las
+filas que no coinciden (o sobran) y vuelve a comparar. Conviene ejecutarlo
+sin escrituras en curso. Usa el backend configurado en STORAGE_BACKEND.
+
+Uso:
+    python rebuild_rollups.py           # reconstruir y verificar
+    python rebuild_rollups.py --check   # solo comparar; sale con 1 si hay diferencias
+"""
+import argparse
+import asyncio
+import sys
+
+from app.core.database import close_supabase, get_supabase
+from app.services.rollups import rebuild_rollups
+
+async def main(check_only: bool) -> int:
+    supabase = await get_supabase()
+    try:
+        result = await rebuild_rollups(supabase, write=not check_only)
+    finally:
+        await close_supabase()
+
+    print(f"📊 Periodos con entradas: {result['entries_periods']}")
+    print(f"   Filas distintas antes: {result['mismatched']}")
+    if check_only:
+        return 1 if result["mismatched"] else 0
+
+    if result["remaining"]:
+        print(f"❌ Siguen distintas {result['remaining']} filas tras reconstruir")
+        return 1
+    print("✅ activity_rollups coincide con daily_entries")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruir y verificar activity_rollups")
+    parser.add_argument("--check", action="store_true", help="solo comparar, sin escribir")
+    sys.exit(asyncio.run(main(parser.parse_args().check)))
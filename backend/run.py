@@ -1,10 +1,67 @@
 #!/usr/bin/env python3
+"""
+Arranque del backend.
+
+    python run.py           # desarrollo: un proceso con recarga automática
+    python run.py --prod    # producción: sin recarga, uvloop/httptools
+
+El modo producción también se activa con ENVIRONMENT=production. El número
+de workers sale de --workers o WEB_CONCURRENCY (1 por defecto, 0 = uno por
+CPU); cada worker tiene su propio cliente, caché y métricas. El buffer de
+entradas (ENTRY_WRITE_BEHIND) y el índice del historial (HISTORY_INDEX) solo
+son correctos con un proceso, así que con ellos no se arranca más de uno; los
+cronómetros también son por proceso y con varios workers el proxy debe enviar
+cada dispositivo siempre al mismo.
+"""
+import argparse
+import os
+
 import uvicorn
 
-if __name__ == "__main__":
+from app.core.config import settings
+
+# Funciones cuyo estado vive en cada proceso y se rompe con varios workers
+SINGLE_PROCESS_SETTINGS = ("ENTRY_WRITE_BEHIND", "HISTORY_INDEX")
+
+def worker_count(requested: int) -> int:
+    return requested if requested > 0 else (os.cpu_count() or 1)
+
+def check_workers(workers: int) -> None:
+    """Refuse several workers while a single-process feature is enabled"""
+    if workers <= 1:
+        return
+    enabled = [name for name in SINGLE_PROCESS_SETTINGS if getattr(settings, name)]
+    if enabled:
+        raise SystemExit(f"❌ {', '.join(enabled)} solo es correcto con un proceso: usa --workers 1 o desactívalo")
+    print(f"⚠️  {workers} workers: los cronómetros (/api/timers y sus eventos) son por proceso; "
+          "cada dispositivo debe llegar siempre al mismo worker")
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de la API de Momentum Tracker")
+    parser.add_argument("--prod", action="store_true", help="modo producción (también con ENVIRONMENT=production)")
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="procesos en modo producción (1 por defecto, 0 = uno por CPU)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+
+    if not (args.prod or settings.ENVIRONMENT == "production"):
+        uvicorn.run("app.main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    workers = worker_count(args.workers)
+    check_workers(workers)
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        # "auto" usa uvloop y httptools si están instalados (uvicorn[standard])
+        loop="auto",
+        http="auto",
+        reload=False,
+        proxy_headers=True,
+        log_level="info",
     )
+
+if __name__ == "__main__":
+    main()
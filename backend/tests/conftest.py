@@ -0,0 +1,55 @@
+"""
+Configuración común de los tests: backend SQLite en memoria.
+
+Las variables se fijan antes de importar app (settings se lee al importar),
+así los tests nunca llegan a Supabase aunque exista un .env.
+"""
+import os
+
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = ":memory:"
+os.environ["ENVIRONMENT"] = "test"
+os.environ["ENTRY_WRITE_BEHIND"] = "false"
+os.environ["HISTORY_INDEX"] = "false"
+
+import httpx
+import pytest
+
+from app.core import database
+from app.core.database import InstrumentedClient
+from app.core.sqlite_backend import SQLiteClient
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def supabase(monkeypatch):
+    """Fresh in-memory database, also returned by get_supabase()"""
+    client = InstrumentedClient(SQLiteClient(":memory:"))
+    monkeypatch.setattr(database, "_instrumented", client)
+    return client
+
+async def create_activity(supabase, name: str, **fields) -> str:
+    response = await supabase.table("activities").insert(
+        {"name": name, "activity_type": "time", "target_unit": "horas", **fields}
+    ).execute()
+    return response.data[0]["id"]
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Tables of the queries run through the shared client during the test"""
+    seen = []
+    monkeypatch.setattr(database, "_query_observers", [lambda event: seen.append(event.table)])
+    return seen
+
+@pytest.fixture
+async def client(supabase):
+    """HTTP client for the app (without lifespan) on the test database"""
+    from app.core.cache import dashboard_cache
+    from app.main import app
+
+    dashboard_cache.invalidate_all()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+    dashboard_cache.invalidate_all()
@@ -0,0 +1,144 @@
+"""
+Traducción directa, fila a fila, de las funciones PL/pgSQL de
+supabase/migrations/20251129_analytics_enhancements.sql, con los tipos de
+PostgreSQL: value_amount es REAL (float4), sum(real) acumula en float4,
+avg(real) en double y las columnas de salida REAL se redondean a float4.
+
+Los tests comparan con ellas el motor vectorizado de app.services.analytics.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+WEEKDAY_NAMES = ("Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado")
+
+def real(value) -> float:
+    """Value of a REAL output column, as PostgREST prints it"""
+    return float(str(np.float32(value)))
+
+def entries_of(rows: List[dict], activity_id: str) -> List[dict]:
+    """daily_entries of one activity in entry_date order, value_amount stored as REAL"""
+    selected = [row for row in rows if row["activity_id"] == activity_id]
+    return [
+        {"entry_date": date.fromisoformat(row["entry_date"]), "value_amount": np.float32(row["value_amount"])}
+        for row in sorted(selected, key=lambda row: row["entry_date"])
+    ]
+
+def sum_real(values) -> np.float32:
+    total = np.float32(0)
+    for value in values:
+        total = np.float32(total + value)
+    return total
+
+def avg_real(values) -> float:
+    values = list(values)
+    return sum(float(value) for value in values) / len(values) if values else None
+
+def get_current_streak(entries: List[dict], current_date: date) -> int:
+    positive = {entry["entry_date"] for entry in entries if entry["value_amount"] > 0}
+    streak = 0
+    while current_date in positive:
+        streak += 1
+        current_date -= timedelta(days=1)
+    return streak
+
+def get_longest_streak(entries: List[dict]) -> dict:
+    current = best = 0
+    current_start = best_start = best_end = previous = None
+    for entry in (entry for entry in entries if entry["value_amount"] > 0):
+        day = entry["entry_date"]
+        if previous is None or day == previous + timedelta(days=1):
+            if current == 0:
+                current_start = day
+            current += 1
+        else:
+            if current > best:
+                best, best_start, best_end = current, current_start, previous
+            current, current_start = 1, day
+        previous = day
+    if current > best:
+        best, best_start, best_end = current, current_start, previous
+    return {
+        "longest_streak": best,
+        "streak_start_date": best_start.isoformat() if best_start else None,
+        "streak_end_date": best_end.isoformat() if best_end else None,
+    }
+
+def get_activity_stats(entries: List[dict], start: Optional[date] = None, end: Optional[date] = None) -> dict:
+    start_d = start or (entries[0]["entry_date"] if entries else None)
+    end_d = end or (entries[-1]["entry_date"] if entries else None)
+    selected = []
+    if start_d is not None and end_d is not None:
+        selected = [entry["value_amount"] for entry in entries if start_d <= entry["entry_date"] <= end_d]
+    total_days = (end_d - start_d).days + 1 if start_d is not None and end_d is not None else None
+    consistency = 0.0
+    if total_days is not None and total_days > 0:
+        consistency = real(np.float32(len(selected)) / np.float32(total_days) * np.float32(100))
+    return {
+        "total_value": real(sum_real(selected)),
+        "avg_daily_value": real(avg_real(selected) or 0),
+        "max_daily_value": real(max(selected)) if selected else 0.0,
+        "days_with_data": len(selected),
+        "total_days": total_days,
+        "consistency_rate": consistency,
+    }
+
+def get_weekday_patterns(entries: List[dict], start: Optional[date], end: date) -> List[dict]:
+    groups: Dict[int, list] = {}
+    for entry in entries:
+        if (start is None or entry["entry_date"] >= start) and entry["entry_date"] <= end:
+            # EXTRACT(DOW): 0 = domingo
+            groups.setdefault((entry["entry_date"].weekday() + 1) % 7, []).append(entry["value_amount"])
+    averages = {day: np.float32(avg_real(values)) for day, values in groups.items()}
+    best = max(averages.values()) if averages else None
+    return [
+        {
+            "weekday": day,
+            "weekday_name": WEEKDAY_NAMES[day],
+            "avg_value": real(averages[day]),
+            "total_entries": len(groups[day]),
+            "best_day": bool(averages[day] == best),
+        }
+        for day in sorted(groups)
+    ]
+
+def get_moving_average(entries: List[dict], days: int, end_date: date) -> List[dict]:
+    """
+    One row per entry up to end_date with the mean of the entries in
+    (entry_date - days, entry_date], the rows the LEFT JOIN selects (the
+    extra ROWS window of the SQL repeats each date per joined row and is
+    not deterministic, so it is not ported).
+    """
+    result = []
+    for entry in entries:
+        if entry["entry_date"] > end_date:
+            continue
+        window = [
+            other["value_amount"] for other in entries
+            if entry["entry_date"] - timedelta(days=days) < other["entry_date"] <= entry["entry_date"]
+        ]
+        result.append({
+            "entry_date": entry["entry_date"].isoformat(),
+            "daily_value": real(entry["value_amount"]),
+            "moving_avg": real(avg_real(window)),
+        })
+    return result
+
+def compare_periods(entries: List[dict], period1_start: date, period1_end: date, period2_start: date, period2_end: date) -> dict:
+    def period(start: date, end: date):
+        values = [entry["value_amount"] for entry in entries if start <= entry["entry_date"] <= end]
+        return sum_real(values), avg_real(values) or 0.0, len(values)
+
+    total1, avg1, days1 = period(period1_start, period1_end)
+    total2, avg2, days2 = period(period2_start, period2_end)
+    return {
+        "period1_total": real(total1),
+        "period1_avg": real(avg1),
+        "period1_days": days1,
+        "period2_total": real(total2),
+        "period2_avg": real(avg2),
+        "period2_days": days2,
+        "change_percentage": real((avg2 - avg1) / avg1 * 100) if avg1 > 0 else 0.0,
+        "trend": "improving" if avg2 > avg1 else "declining" if avg2 < avg1 else "stable",
+    }
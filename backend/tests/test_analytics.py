@@ -0,0 +1,117 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.services.analytics import build_analytics, build_moving_averages, build_period_comparison
+from tests import sql_ports
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+FIXTURE = Path(__file__).parent / "fixtures" / "analytics_entries.json"
+
+@pytest.fixture
+async def fixture_rows(supabase):
+    """Load the shared fixture; returns (activity ids by name, entry rows, fixture)"""
+    fixture = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    ids, rows = {}, []
+    for activity in fixture["activities"]:
+        activity_id = await create_activity(supabase, activity["name"])
+        ids[activity["name"]] = activity_id
+        rows += [{"activity_id": activity_id, "entry_date": day, "value_amount": value} for day, value in activity["entries"]]
+    await supabase.table("daily_entries").insert(rows).execute()
+    return ids, rows, fixture
+
+@pytest.mark.parametrize("with_range", [False, True])
+async def test_analytics_match_sql_functions(supabase, fixture_rows, with_range):
+    ids, rows, fixture = fixture_rows
+    as_of = date.fromisoformat(fixture["as_of"])
+    start = date.fromisoformat(fixture["start_date"]) if with_range else None
+    end = date.fromisoformat(fixture["end_date"]) if with_range else None
+
+    analytics = await build_analytics(supabase, as_of, start, end)
+
+    by_id = {item["activity_id"]: item for item in analytics["activities"]}
+    assert set(by_id) == set(ids.values())
+    for name, activity_id in ids.items():
+        entries = sql_ports.entries_of(rows, activity_id)
+        item = by_id[activity_id]
+        assert item["current_streak"] == sql_ports.get_current_streak(entries, as_of), name
+        assert item["longest_streak"] == sql_ports.get_longest_streak(entries), name
+        assert item["stats"] == sql_ports.get_activity_stats(entries, start, end), name
+        assert item["weekday_patterns"] == sql_ports.get_weekday_patterns(entries, start, end or as_of), name
+
+@pytest.mark.parametrize("days", [1, 7, 30])
+async def test_moving_averages_match_sql_function(supabase, fixture_rows, days):
+    ids, rows, fixture = fixture_rows
+    end_date = date.fromisoformat(fixture["end_date"])
+
+    result = await build_moving_averages(supabase, days, end_date)
+
+    for item in result["activities"]:
+        entries = sql_ports.entries_of(rows, item["activity_id"])
+        assert item["series"] == sql_ports.get_moving_average(entries, days, end_date), item["name"]
+
+async def test_stats_total_accumulates_in_float4(supabase):
+    # 32 entradas de [0.1, 0.7, 1.3, 2.9] suman 40.000004 en float4 y 40.0 en double
+    activity_id = await create_activity(supabase, "Decimales")
+    values = [0.1, 0.7, 1.3, 2.9] * 8
+    await supabase.table("daily_entries").insert([
+        {"activity_id": activity_id, "entry_date": date.fromordinal(date(2025, 1, 1).toordinal() + day).isoformat(), "value_amount": value}
+        for day, value in enumerate(values)
+    ]).execute()
+
+    analytics = await build_analytics(supabase, date(2025, 6, 1))
+
+    assert analytics["activities"][0]["stats"]["total_value"] == 40.000004
+
+PERIODS = [
+    (date(2024, 6, 1), date(2024, 10, 31)),
+    (date(2024, 11, 1), date(2024, 11, 30)),
+    (date(2024, 12, 1), date(2025, 1, 31)),
+    (date(2025, 2, 1), date(2025, 2, 28)),
+    (date(2025, 2, 15), date(2025, 4, 30)),
+    (date(2025, 6, 1), date(2025, 6, 30)),
+]
+
+async def test_period_comparison_matches_sql_function(supabase, fixture_rows):
+    ids, rows, _ = fixture_rows
+
+    result = await build_period_comparison(supabase, PERIODS)
+
+    assert {item["activity_id"] for item in result["activities"]} == set(ids.values())
+    for item in result["activities"]:
+        entries = sql_ports.entries_of(rows, item["activity_id"])
+        for (first, second), comparison in zip(zip(PERIODS, PERIODS[1:]), item["comparisons"]):
+            expected = sql_ports.compare_periods(entries, *first, *second)
+            assert {key: comparison[key] for key in expected} == expected, (item["name"], first, second)
+
+async def test_period_total_accumulates_in_float4(supabase, client):
+    activity_id = await create_activity(supabase, "Decimales")
+    values = [0.1, 0.7, 1.3, 2.9] * 8
+    await supabase.table("daily_entries").insert([
+        {"activity_id": activity_id, "entry_date": date.fromordinal(date(2025, 1, 1).toordinal() + day).isoformat(), "value_amount": value}
+        for day, value in enumerate(values)
+    ]).execute()
+
+    response = await client.get("/api/analytics/compare", params={"period": ["2024-12-01..2024-12-31", "2025-01-01..2025-02-28"]})
+
+    comparison = response.json()["activities"][0]["comparisons"][0]
+    assert comparison["period2_total"] == 40.000004
+    assert comparison["period2_avg"] == 1.25
+    assert comparison["period2_days"] == 32
+
+async def test_activity_filters_ignore_uuid_case(supabase, client):
+    activity_id = await create_activity(supabase, "Mayúsculas")
+    await supabase.table("daily_entries").insert({"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 2}).execute()
+    upper = activity_id.upper()
+
+    moving = (await client.get("/api/analytics/moving-average", params={"activity_id": upper, "days": 7, "end_date": "2025-03-09"})).json()
+    trends = (await client.get("/api/analytics/trends", params={"activity_id": upper, "period": "week"})).json()
+    compare = (await client.get("/api/analytics/compare", params={"activity_id": upper, "period": ["2025-03-03..2025-03-09", "2025-03-10..2025-03-16"]})).json()
+
+    assert [item["activity_id"] for item in moving["activities"]] == [activity_id]
+    assert [item["activity_id"] for item in trends["activities"]] == [activity_id]
+    assert [item["activity_id"] for item in compare["activities"]] == [activity_id]
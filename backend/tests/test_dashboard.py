@@ -0,0 +1,113 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.dashboard import build_dashboard
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+WEEK = date(2025, 1, 6)
+
+class CountingQuery:
+    """Chainable stand-in for a query builder; every filter returns itself"""
+
+    def __init__(self, client, table: str):
+        self._client = client
+        self._table = table
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        self._client.calls.append(self._table)
+        return SimpleNamespace(data=self._client.rows.get(self._table, []))
+
+class CountingClient:
+    """Client that answers every query of a table with fixed rows and counts the calls"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def table(self, name: str) -> CountingQuery:
+        return CountingQuery(self, name)
+
+def week_rows(n_activities: int) -> dict:
+    ids = [f"activity-{i}" for i in range(n_activities)]
+    return {
+        "activities": [{"id": activity_id, "name": activity_id, "activity_type": "time", "target_unit": "horas"} for activity_id in ids],
+        "weekly_goals": [{"activity_id": activity_id, "week_start_date": "2025-01-06", "target_value": 10} for activity_id in ids],
+        "weekly_reflections": [{"activity_id": activity_id, "week_start_date": "2025-01-06", "reflection_text": "ok"} for activity_id in ids],
+        "daily_entries": [
+            {"activity_id": activity_id, "entry_date": day, "value_amount": 2.5}
+            for activity_id in ids
+            for day in ("2025-01-06", "2025-01-08")
+        ],
+    }
+
+@pytest.mark.parametrize("n_activities", [1, 25])
+async def test_dashboard_query_count_does_not_grow_with_activities(n_activities):
+    client = CountingClient(week_rows(n_activities))
+
+    dashboard = await build_dashboard(client, WEEK)
+
+    assert sorted(client.calls) == ["activities", "daily_entries", "weekly_goals", "weekly_reflections"]
+    assert len(dashboard["activities"]) == n_activities
+    for activity in dashboard["activities"]:
+        assert activity["realized_value"] == 5.0
+        assert activity["percentage_complete"] == 50.0
+        assert activity["reflection_text"] == "ok"
+        assert activity["daily_values"]["2025-01-08"] == 2.5
+    assert dashboard["weekly_summary"]["total_target_hours"] == 10 * n_activities
+
+async def test_dashboard_without_reflections_skips_their_query():
+    client = CountingClient(week_rows(3))
+
+    dashboard = await build_dashboard(client, WEEK, include_reflections=False)
+
+    assert "weekly_reflections" not in client.calls
+    assert len(client.calls) == 3
+    assert all(activity["reflection_text"] == "" for activity in dashboard["activities"])
+
+async def test_dashboard_without_activities_makes_one_query():
+    client = CountingClient({})
+
+    dashboard = await build_dashboard(client, WEEK)
+
+    assert client.calls == ["activities"]
+    assert dashboard["activities"] == []
+
+async def test_cached_dashboard_skips_version_queries_within_ttl(client, supabase, queries, monkeypatch):
+    monkeypatch.setattr(settings, "DASHBOARD_VERSION_TTL", 60)
+    activity_id = await create_activity(supabase, "Leer")
+
+    first = await client.get("/api/dashboard/2025-01-06")
+    assert first.status_code == 200
+    queries.clear()
+
+    second = await client.get("/api/dashboard/2025-01-06")
+    assert second.json() == first.json()
+    assert queries == []
+    assert (await client.get("/api/dashboard/2025-01-06", headers={"If-None-Match": first.headers["ETag"]})).status_code == 304
+    assert queries == []
+
+    # Una escritura por la API invalida la semana: se reconstruye al momento
+    await client.post("/api/entries/", json={"activity_id": activity_id, "entry_date": "2025-01-07", "value_amount": 2})
+    updated = await client.get("/api/dashboard/2025-01-06")
+    assert updated.json()["activities"][0]["realized_value"] == 2
+    assert updated.headers["ETag"] != first.headers["ETag"]
+
+async def test_cached_dashboard_rechecks_watermark_after_ttl(client, supabase, queries, monkeypatch):
+    monkeypatch.setattr(settings, "DASHBOARD_VERSION_TTL", 0)
+    activity_id = await create_activity(supabase, "Leer")
+    await client.get("/api/dashboard/2025-01-06")
+
+    # Escritura directa (sin pasar por la API): la detecta la marca de agua
+    await supabase.table("daily_entries").insert({"activity_id": activity_id, "entry_date": "2025-01-08", "value_amount": 3}).execute()
+    queries.clear()
+    response = await client.get("/api/dashboard/2025-01-06")
+    assert response.json()["activities"][0]["realized_value"] == 3
+    assert "daily_entries" in queries
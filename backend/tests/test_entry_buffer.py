@@ -0,0 +1,155 @@
+"""Buffer de escritura diferida frente a escrituras directas y rechazos"""
+import asyncio
+import json
+
+import pytest
+
+from app.services.entry_buffer import EntryWriteBuffer
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def buffer(tmp_path):
+    return EntryWriteBuffer(enabled=True, flush_interval=60, max_pending=1000, spill_path=str(tmp_path / "spill.jsonl"))
+
+async def read_value(supabase, activity_id: str, entry_date: str):
+    response = await supabase.table("daily_entries").select("value_amount").eq("activity_id", activity_id).eq("entry_date", entry_date).execute()
+    return response.data[0]["value_amount"] if response.data else None
+
+async def test_batch_keeps_pending_writes_it_did_not_save(supabase, buffer):
+    activity_id = await create_activity(supabase, "Lectura")
+    buffer.put({"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 1.0})
+    buffer.put({"activity_id": activity_id, "entry_date": "2025-03-04", "value_amount": 2.0})
+
+    result, _ = await buffer.upsert_entries(supabase, [
+        {"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 5.0},
+        {"activity_id": activity_id, "entry_date": "2025-03-04", "value_amount": "no es un número"},
+    ])
+    assert (result.succeeded, result.failed) == (1, 1)
+    assert buffer.stats()["pending"] == 1
+
+    await buffer.flush()
+    assert await read_value(supabase, activity_id, "2025-03-03") == 5.0
+    assert await read_value(supabase, activity_id, "2025-03-04") == 2.0
+
+async def test_write_accepted_during_batch_is_not_discarded(supabase, buffer, monkeypatch):
+    activity_id = await create_activity(supabase, "Piano")
+    key_row = {"activity_id": activity_id, "entry_date": "2025-03-03"}
+    buffer.put({**key_row, "value_amount": 1.0})
+
+    from app.services import entry_buffer as module
+    original = module.upsert_batch
+
+    async def slow_upsert(*args, **kwargs):
+        # Un POST 202 de la misma clave llega mientras se escribe el lote
+        buffer.put({**key_row, "value_amount": 9.0})
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(module, "upsert_batch", slow_upsert)
+    await buffer.upsert_entries(supabase, [{**key_row, "value_amount": 5.0}])
+    monkeypatch.setattr(module, "upsert_batch", original)
+
+    assert buffer.stats()["pending"] == 1
+    await buffer.flush()
+    assert await read_value(supabase, activity_id, "2025-03-03") == 9.0
+
+async def test_flush_cannot_overwrite_a_newer_batch(supabase, buffer, monkeypatch):
+    activity_id = await create_activity(supabase, "Correr")
+    key_row = {"activity_id": activity_id, "entry_date": "2025-03-03"}
+    buffer.put({**key_row, "value_amount": 1.0})
+
+    from app.services import entry_buffer as module
+    original = module.upsert_batch
+    started = asyncio.Event()
+
+    async def slow_upsert(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(0.05)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(module, "upsert_batch", slow_upsert)
+    batch = asyncio.create_task(buffer.upsert_entries(supabase, [{**key_row, "value_amount": 5.0}]))
+    await started.wait()
+    # El flush espera al lote y ya no encuentra el valor antiguo pendiente
+    await buffer.flush()
+    await batch
+
+    assert await read_value(supabase, activity_id, "2025-03-03") == 5.0
+    assert buffer.stats()["pending"] == 0
+
+async def test_rejected_writes_are_counted_and_activity_rechecked(supabase, buffer):
+    activity_id = await create_activity(supabase, "Meditar")
+    assert await buffer.known_activity(supabase, activity_id)
+    buffer.put({"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 1.0})
+
+    # Borrada fuera de la API después de aceptar la escritura
+    await supabase.table("activities").delete().eq("id", activity_id).execute()
+    await buffer.flush()
+
+    assert buffer.stats()["rejected"] == 1
+    assert buffer.stats()["pending"] == 0
+    assert not await buffer.known_activity(supabase, activity_id)
+
+@pytest.fixture
+def stalled(monkeypatch):
+    """upsert_batch of the buffer hangs until the returned event is set"""
+    from app.services import entry_buffer as module
+    original = module.upsert_batch
+    release = asyncio.Event()
+    calls = []
+
+    async def stalled_upsert(*args, **kwargs):
+        calls.append(len(args[2]))
+        await release.wait()
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(module, "upsert_batch", stalled_upsert)
+    release.calls = calls
+    return release
+
+def running_tasks() -> int:
+    return sum(1 for task in asyncio.all_tasks() if not task.done())
+
+async def test_one_flush_in_flight_and_bounded_buffer_under_stalled_upstream(supabase, client, stalled, monkeypatch, tmp_path):
+    from app.api import entries
+
+    buffer = EntryWriteBuffer(enabled=True, flush_interval=60, max_pending=3, spill_path=str(tmp_path / "spill.jsonl"), max_buffered=10)
+    monkeypatch.setattr(entries, "entry_buffer", buffer)
+    activity_id = await create_activity(supabase, "Lectura")
+    baseline = running_tasks()
+
+    statuses = []
+    for day in range(15):
+        response = await client.post("/api/entries/", json={"activity_id": activity_id, "entry_date": f"2025-03-{day + 1:02d}", "value_amount": 1})
+        statuses.append(response.status_code)
+        await asyncio.sleep(0)
+
+    # Una sola escritura en curso, bloqueada, y el resto rechazado al llegar al tope
+    assert running_tasks() == baseline + 1
+    assert stalled.calls == [3]
+    assert statuses == [202] * 10 + [503] * 5
+    assert buffer.stats()["pending"] == 10
+    assert buffer.stats()["refused"] == 5
+
+    # Reescribir una clave pendiente no hace crecer el buffer
+    response = await client.post("/api/entries/", json={"activity_id": activity_id, "entry_date": "2025-03-01", "value_amount": 2})
+    assert response.status_code == 202
+
+    stalled.set()
+    await buffer.drain()
+    assert buffer.stats()["pending"] == 0
+    assert await read_value(supabase, activity_id, "2025-03-01") == 2.0
+    assert await read_value(supabase, activity_id, "2025-03-10") == 1.0
+
+async def test_recover_writes_spilled_entries_when_buffer_is_disabled(supabase, tmp_path):
+    activity_id = await create_activity(supabase, "Piano")
+    spill = tmp_path / "spill.jsonl"
+    spill.write_text(json.dumps({"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 4.0}) + "\n", encoding="utf-8")
+    buffer = EntryWriteBuffer(enabled=False, flush_interval=60, max_pending=100, spill_path=str(spill))
+
+    assert await buffer.recover() == 1
+
+    assert await read_value(supabase, activity_id, "2025-03-03") == 4.0
+    assert buffer.stats()["pending"] == 0
+    assert not spill.exists()
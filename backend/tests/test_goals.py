@@ -0,0 +1,150 @@
+"""Evaluación de metas semanales, hitos y GoalEvaluator"""
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.services import goals
+from app.services.goals import GoalEvaluator, evaluate_goals, goal_evaluator
+from app.services.rollover import rollover_week
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+WEEK = "2025-03-03"
+
+async def set_entry(supabase, activity_id: str, entry_date: str, value: float) -> None:
+    await supabase.table("daily_entries").upsert(
+        {"activity_id": activity_id, "entry_date": entry_date, "value_amount": value}, on_conflict="activity_id,entry_date"
+    ).execute()
+
+async def read_goal(supabase, activity_id: str) -> dict:
+    response = await supabase.table("weekly_goals").select("*").eq("activity_id", activity_id).eq("week_start_date", WEEK).execute()
+    return response.data[0]
+
+async def goal_milestones(supabase, activity_id: str) -> list:
+    response = await supabase.table("milestones").select("*").eq("activity_id", activity_id).eq("milestone_type", "goal").execute()
+    return response.data
+
+@pytest.fixture
+async def goal(supabase):
+    activity_id = await create_activity(supabase, "Lectura")
+    await supabase.table("weekly_goals").insert({"activity_id": activity_id, "week_start_date": WEEK, "target_value": 5}).execute()
+    return activity_id
+
+async def test_goal_flips_to_achieved_and_back(supabase, goal):
+    await set_entry(supabase, goal, "2025-03-04", 3)
+    assert await evaluate_goals(supabase, [(goal, WEEK)]) == {"evaluated": 1, "achieved": 0, "lost": 0}
+    assert (await read_goal(supabase, goal))["achieved"] is False
+
+    await set_entry(supabase, goal, "2025-03-09", 2)
+    assert await evaluate_goals(supabase, [(goal, WEEK)]) == {"evaluated": 1, "achieved": 1, "lost": 0}
+    row = await read_goal(supabase, goal)
+    assert row["achieved"] is True and row["achieved_at"] is not None
+
+    await set_entry(supabase, goal, "2025-03-09", 1.5)
+    assert await evaluate_goals(supabase, [(goal, WEEK)]) == {"evaluated": 1, "achieved": 0, "lost": 1}
+    row = await read_goal(supabase, goal)
+    assert row["achieved"] is False and row["achieved_at"] is None
+
+async def test_entries_outside_the_week_do_not_count(supabase, goal):
+    await set_entry(supabase, goal, "2025-03-02", 10)
+    await set_entry(supabase, goal, "2025-03-10", 10)
+    assert await evaluate_goals(supabase, [(goal, WEEK), (goal, "2025-02-24"), (goal, "2025-03-10")]) == {"evaluated": 1, "achieved": 0, "lost": 0}
+
+async def test_reevaluation_does_not_duplicate_milestones(supabase, goal):
+    await set_entry(supabase, goal, "2025-03-04", 6)
+    await evaluate_goals(supabase, [(goal, WEEK)])
+    await evaluate_goals(supabase, [(goal, WEEK)])
+    assert len(await goal_milestones(supabase, goal)) == 1
+
+    # Perder la meta y volver a cumplirla no repite el hito
+    await set_entry(supabase, goal, "2025-03-04", 1)
+    await evaluate_goals(supabase, [(goal, WEEK)])
+    await set_entry(supabase, goal, "2025-03-04", 8)
+    assert (await evaluate_goals(supabase, [(goal, WEEK)]))["achieved"] == 1
+    milestones = await goal_milestones(supabase, goal)
+    assert len(milestones) == 1
+    assert milestones[0]["metadata"] == {"week_start_date": WEEK, "target_value": 5.0}
+
+async def test_concurrent_evaluations_create_one_milestone(supabase, goal):
+    await set_entry(supabase, goal, "2025-03-04", 6)
+    results = await asyncio.gather(*(evaluate_goals(supabase, [(goal, WEEK)]) for _ in range(3)))
+    assert sum(result["achieved"] for result in results) == 1
+    assert len(await goal_milestones(supabase, goal)) == 1
+
+async def test_milestone_of_another_week_does_not_block_this_one(supabase, goal):
+    await supabase.table("weekly_goals").insert({"activity_id": goal, "week_start_date": "2025-03-10", "target_value": 2}).execute()
+    await set_entry(supabase, goal, "2025-03-11", 2)
+    await evaluate_goals(supabase, [(goal, "2025-03-10")])
+
+    await set_entry(supabase, goal, "2025-03-04", 5)
+    assert (await evaluate_goals(supabase, [(goal, WEEK)]))["achieved"] == 1
+    weeks = sorted(milestone["metadata"]["week_start_date"] for milestone in await goal_milestones(supabase, goal))
+    assert weeks == [WEEK, "2025-03-10"]
+
+async def test_rollover_evaluates_the_copied_goals(supabase):
+    activity_id = await create_activity(supabase, "Lectura")
+    await supabase.table("weekly_goals").insert({"activity_id": activity_id, "week_start_date": "2025-02-24", "target_value": 5}).execute()
+    # Entradas de la semana anteriores a la copia de la meta
+    await set_entry(supabase, activity_id, "2025-03-04", 6)
+
+    assert (await rollover_week(supabase, date(2025, 3, 3)))["goals_copied"] == 1
+    assert (await read_goal(supabase, activity_id))["achieved"] is True
+    assert len(await goal_milestones(supabase, activity_id)) == 1
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    """Pairs passed to each evaluate_goals() call made by GoalEvaluator"""
+    calls = []
+
+    async def record(supabase, pairs):
+        calls.append(set(pairs))
+        return {}
+
+    monkeypatch.setattr(goals, "evaluate_goals", record)
+    return calls
+
+async def test_debounce_coalesces_bursts(supabase, evaluations):
+    evaluator = GoalEvaluator(delay=0.05, max_delay=1.0)
+    for day in range(5):
+        evaluator.schedule([("a", WEEK), (f"b{day}", WEEK)])
+        await asyncio.sleep(0.01)
+    assert evaluations == []
+
+    await asyncio.sleep(0.1)
+    assert evaluations == [{("a", WEEK)} | {(f"b{day}", WEEK) for day in range(5)}]
+
+    # Una escritura posterior abre una nueva espera
+    evaluator.schedule([("c", WEEK)])
+    await asyncio.sleep(0.1)
+    assert evaluations[1:] == [{("c", WEEK)}]
+
+async def test_debounce_is_bounded_by_max_delay(supabase, evaluations):
+    evaluator = GoalEvaluator(delay=0.05, max_delay=0.12)
+    for _ in range(10):
+        evaluator.schedule([("a", WEEK)])
+        await asyncio.sleep(0.03)
+    # Las escrituras no dejaron de llegar, pero no se espera más de max_delay
+    assert len(evaluations) >= 2
+
+async def test_flush_evaluates_pending_pairs_now(supabase, evaluations):
+    evaluator = GoalEvaluator(delay=60, max_delay=60)
+    evaluator.schedule([("a", WEEK)])
+    await evaluator.flush()
+    assert evaluations == [{("a", WEEK)}]
+    await evaluator.flush()
+    assert len(evaluations) == 1
+
+async def test_shutdown_flushes_pending_goal_evaluations(supabase, goal, client):
+    from app.main import app, lifespan
+
+    async with lifespan(app):
+        response = await client.post("/api/entries/", json={"activity_id": goal, "entry_date": "2025-03-05", "value_amount": 5})
+        assert response.status_code == 200
+        # La evaluación sigue esperando a que dejen de llegar escrituras
+        assert (await read_goal(supabase, goal))["achieved"] is False
+
+    assert goal_evaluator._task is None
+    assert (await read_goal(supabase, goal))["achieved"] is True
+    assert len(await goal_milestones(supabase, goal)) == 1
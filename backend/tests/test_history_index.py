@@ -0,0 +1,65 @@
+"""Índice en memoria del historial: registro de escrituras y estadísticas"""
+import pytest
+
+from app.services.history_index import HistoryIndex
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+def row(activity_id: str, entry_date: str, value: float) -> dict:
+    return {"activity_id": activity_id, "entry_date": entry_date, "value_amount": value}
+
+@pytest.fixture
+async def index(supabase):
+    index = HistoryIndex(enabled=True)
+    await index.load(supabase)
+    return index
+
+async def test_load_reads_existing_entries(supabase):
+    activity_id = await create_activity(supabase, "Lectura")
+    await supabase.table("daily_entries").insert([row(activity_id, "2025-03-03", 1.5), row(activity_id, "2025-03-05", 0)]).execute()
+    index = HistoryIndex(enabled=True)
+
+    assert await index.load(supabase) == 2
+    assert index.ready
+    assert index.entries([activity_id.upper()], "2025-03-01", "2025-03-31") == [
+        row(activity_id.upper(), "2025-03-03", 1.5),
+        row(activity_id.upper(), "2025-03-05", 0.0),
+    ]
+
+async def test_record_overwrites_and_keeps_zero_entries_present(index):
+    index.record([row("a", "2025-03-03", 2.0)])
+    index.record([row("A", "2025-03-03", 0.0)])
+
+    # 0 sigue siendo una entrada; los días intermedios sin entrada no aparecen
+    index.record([row("a", "2025-03-06", 1.0)])
+    assert index.entries(["a"], "2025-03-01", "2025-03-31") == [row("a", "2025-03-03", 0.0), row("a", "2025-03-06", 1.0)]
+    assert index.series("a").entries == 2
+
+async def test_record_before_the_first_day_grows_the_series_in_front(index):
+    index.record([row("a", "2025-03-10", 1.0)])
+    index.record([row("a", "2025-03-08", 3.0)])
+
+    series = index.series("a")
+    assert series.first_ordinal == series.last_ordinal - 2
+    assert index.entries(["a"], "2025-03-09", "2025-03-10") == [row("a", "2025-03-10", 1.0)]
+    assert index.entries(["a"], "2025-03-01", "2025-03-08") == [row("a", "2025-03-08", 3.0)]
+
+async def test_record_is_ignored_until_loaded():
+    index = HistoryIndex(enabled=True)
+    index.record([row("a", "2025-03-03", 1.0)])
+    assert index.series("a") is None
+
+async def test_stats_report_the_memory_footprint(index):
+    index.record([row("a", "2025-03-01", 1.0), row("a", "2025-03-10", 2.0), row("b", "2025-03-05", 1.0)])
+
+    stats = index.stats()
+
+    assert (stats["activities"], stats["entries"], stats["days"]) == (2, 3, 11)
+    # 8 bytes del double y 1 de la marca por día
+    assert stats["bytes"] == index.memory_bytes() == 11 * 9
+    assert stats["bytes_per_activity_year"] == round(9 * 365.25)
+    assert {item["activity_id"]: (item["first_day"], item["days"], item["entries"]) for item in stats["per_activity"]} == {
+        "a": ("2025-03-01", 10, 2),
+        "b": ("2025-03-05", 1, 1),
+    }
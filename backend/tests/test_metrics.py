@@ -0,0 +1,28 @@
+"""MetricsMiddleware: latencia por ruta sin las conexiones SSE"""
+import httpx
+import pytest
+
+from app.core.metrics import REQUEST_DURATION, REQUESTS, MetricsMiddleware
+
+pytestmark = pytest.mark.anyio
+
+def respond(content_type: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b"data: {}\n\n"})
+    return MetricsMiddleware(app)
+
+def durations(method: str) -> int:
+    state = REQUEST_DURATION._values.get((method, "unmatched"))
+    return sum(state[0]) if state else 0
+
+@pytest.mark.parametrize("content_type, observed", [(b"application/json", 1), (b"text/event-stream; charset=utf-8", 0)])
+async def test_event_streams_stay_out_of_the_latency_histogram(content_type, observed):
+    transport = httpx.ASGITransport(app=respond(content_type))
+    before, requests = durations("PATCH"), REQUESTS._values.get(("PATCH", "unmatched", "200"), 0)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.patch("/stream")).status_code == 200
+
+    assert durations("PATCH") - before == observed
+    # El resto de métricas sí cuenta la petición
+    assert REQUESTS._values[("PATCH", "unmatched", "200")] == requests + 1
@@ -0,0 +1,28 @@
+"""POST /api/reflections sobre la misma (actividad, semana)"""
+import pytest
+
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+async def test_second_post_updates_the_reflection(supabase, client):
+    activity_id = await create_activity(supabase, "Lectura")
+    body = {"activity_id": activity_id, "week_start_date": "2025-03-03", "reflection_text": "Primera"}
+
+    first = await client.post("/api/reflections/", json=body)
+    second = await client.post("/api/reflections/", json={**body, "reflection_text": "Segunda"})
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    rows = (await supabase.table("weekly_reflections").select("*").eq("activity_id", activity_id).execute()).data
+    assert [row["reflection_text"] for row in rows] == ["Segunda"]
+
+async def test_single_and_batch_upserts_share_the_key(supabase, client):
+    activity_id = await create_activity(supabase, "Piano")
+    body = {"activity_id": activity_id, "week_start_date": "2025-03-03", "reflection_text": "Lote"}
+    assert (await client.post("/api/reflections/batch", json=[body])).json()["succeeded"] == 1
+
+    response = await client.post("/api/reflections/", json={**body, "reflection_text": "Suelta"})
+
+    assert response.status_code == 200
+    assert response.json()["reflection_text"] == "Suelta"
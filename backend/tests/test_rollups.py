@@ -0,0 +1,65 @@
+"""activity_rollups mantenido por el trigger de daily_entries"""
+import pytest
+
+from app.services.rollups import rebuild_rollups, read_trends, stored_rollups
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+async def assert_consistent(supabase):
+    result = await rebuild_rollups(supabase, write=False)
+    assert result["mismatched"] == 0
+
+async def test_api_writes_keep_rollups_consistent(supabase, client):
+    activity_id = await create_activity(supabase, "Lectura")
+    other_id = await create_activity(supabase, "Piano")
+
+    response = await client.post("/api/entries/", json={"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 2.0})
+    assert response.status_code == 200
+    response = await client.post("/api/entries/batch", json=[
+        {"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 0.5},
+        {"activity_id": activity_id, "entry_date": "2025-03-09", "value_amount": 1.5},
+        {"activity_id": other_id, "entry_date": "2025-03-31", "value_amount": 0},
+    ])
+    assert response.status_code == 200
+
+    stored = await stored_rollups(supabase)
+    assert stored[(activity_id, "week", "2025-03-03")] == [2.0, 2, 2]
+    assert stored[(activity_id, "month", "2025-03-01")] == [2.0, 2, 2]
+    assert stored[(other_id, "week", "2025-03-31")] == [0.0, 1, 0]
+    await assert_consistent(supabase)
+
+async def test_direct_writes_keep_rollups_consistent(supabase):
+    # Como el cliente web, que escribe daily_entries sin pasar por la API
+    activity_id = await create_activity(supabase, "Correr")
+    inserted = await supabase.table("daily_entries").insert([
+        {"activity_id": activity_id, "entry_date": "2025-01-30", "value_amount": 3.0},
+        {"activity_id": activity_id, "entry_date": "2025-02-02", "value_amount": 1.0},
+    ]).execute()
+    first, second = (row["id"] for row in inserted.data)
+    await assert_consistent(supabase)
+
+    # Cambio de valor, de fecha (otra semana y otro mes) y borrado
+    await supabase.table("daily_entries").update({"value_amount": 0}).eq("id", first).execute()
+    await supabase.table("daily_entries").update({"entry_date": "2025-02-03"}).eq("id", second).execute()
+    await assert_consistent(supabase)
+
+    trends = await read_trends(supabase, "month", [activity_id])
+    assert [(row["period_start"], row["total_value"], row["entry_count"], row["days_active"]) for row in trends] == [
+        ("2025-01-01", 0.0, 1, 0),
+        ("2025-02-01", 1.0, 1, 1),
+    ]
+
+    await supabase.table("daily_entries").delete().eq("id", first).execute()
+    await assert_consistent(supabase)
+    stored = await stored_rollups(supabase)
+    assert stored[(activity_id, "month", "2025-01-01")] == [0.0, 0, 0]
+
+async def test_unchanged_update_does_not_touch_rollups(supabase):
+    activity_id = await create_activity(supabase, "Meditar")
+    inserted = await supabase.table("daily_entries").insert({"activity_id": activity_id, "entry_date": "2025-05-05", "value_amount": 1.0}).execute()
+    before = (await supabase.table("activity_rollups").select("updated_at").execute()).data
+    await supabase.table("daily_entries").update({"value_amount": 1.0}).eq("id", inserted.data[0]["id"]).execute()
+    assert (await supabase.table("activity_rollups").select("updated_at").execute()).data == before
+    stored = await stored_rollups(supabase)
+    assert stored[(activity_id, "week", "2025-05-05")] == [1.0, 1, 1]
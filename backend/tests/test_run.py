@@ -0,0 +1,18 @@
+"""Número de workers de run.py"""
+import pytest
+
+import run
+from app.core.config import settings
+
+@pytest.mark.parametrize("setting", run.SINGLE_PROCESS_SETTINGS)
+def test_refuses_several_workers_with_per_process_state(monkeypatch, setting):
+    monkeypatch.setattr(settings, setting, True)
+    run.check_workers(1)
+    with pytest.raises(SystemExit, match=setting):
+        run.check_workers(4)
+
+def test_warns_about_timers_with_several_workers(monkeypatch, capsys):
+    for setting in run.SINGLE_PROCESS_SETTINGS:
+        monkeypatch.setattr(settings, setting, False)
+    run.check_workers(4)
+    assert "cronómetros" in capsys.readouterr().out
@@ -0,0 +1,28 @@
+"""Presupuesto de import y de arranque en frío (benchmarks/startup_budget.py)
+
+Lanzan subprocesos y dependen de la máquina: solo corren con RUN_BUDGET_TESTS=1.
+El control en CI es `python benchmarks/startup_budget.py`.
+"""
+import os
+import statistics
+
+import pytest
+
+from benchmarks.startup_budget import IMPORT_BUDGET_MS, STARTUP_BUDGET_MS, measure_import, measure_startup
+
+pytestmark = [
+    pytest.mark.budget,
+    pytest.mark.skipif(os.getenv("RUN_BUDGET_TESTS") != "1", reason="RUN_BUDGET_TESTS=1 para medir el arranque"),
+]
+
+RUNS = 3
+
+def test_import_within_budget():
+    # Primera importación fuera de la medida: compila los .pyc
+    measure_import()
+    import_ms = statistics.median(measure_import()[0] for _ in range(RUNS))
+    assert import_ms <= IMPORT_BUDGET_MS
+
+def test_startup_within_budget(tmp_path):
+    startup_ms = statistics.median(measure_startup(str(tmp_path / f"startup{run}.db"), timeout=30) for run in range(RUNS))
+    assert startup_ms <= STARTUP_BUDGET_MS
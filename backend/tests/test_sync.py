@@ -0,0 +1,83 @@
+"""Cursor, ventana de solape y tombstones de GET /api/sync"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.sync import STREAMS, decode_sync_cursor, read_changes
+from tests.conftest import create_activity
+
+pytestmark = pytest.mark.anyio
+
+OVERLAP = 5.0
+ACTIVITIES = STREAMS.index("activities")
+
+def ago(seconds: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat(timespec="milliseconds")
+
+async def add_activity(supabase, name: str, seconds_ago: float) -> str:
+    return await create_activity(supabase, name, updated_at=ago(seconds_ago))
+
+async def sync_all(supabase, cursor=None, limit=1000):
+    """Call read_changes until has_more is false; returns (activity names per call, last result)"""
+    positions = decode_sync_cursor(cursor) if cursor else [None] * len(STREAMS)
+    calls = []
+    while True:
+        result = await read_changes(supabase, positions, limit, OVERLAP)
+        calls.append([row["name"] for row in result["changes"]["activities"]])
+        positions = decode_sync_cursor(result["cursor"])
+        if not result["has_more"]:
+            return calls, result
+
+async def test_full_pages_advance_but_never_past_the_horizon(supabase):
+    for index in range(5):
+        await add_activity(supabase, f"antigua {index}", 100 - index)
+    for index in range(3):
+        await add_activity(supabase, f"reciente {index}", 1 - index / 10)
+
+    calls, result = await sync_all(supabase, limit=2)
+
+    # Las páginas llenas solo cubren filas anteriores al horizonte
+    assert calls[:2] == [["antigua 0", "antigua 1"], ["antigua 2", "antigua 3"]]
+    assert calls[2][0] == "antigua 4" and calls[2][1].startswith("reciente")
+    updated_at, _ = decode_sync_cursor(result["cursor"])[ACTIVITIES]
+    assert datetime.fromisoformat(updated_at) <= datetime.now(timezone.utc) - timedelta(seconds=OVERLAP)
+
+async def test_late_commit_inside_the_overlap_window_is_not_lost(supabase):
+    # Ráfaga que llenaría la página dentro de la ventana de solape
+    await add_activity(supabase, "ráfaga 1", 1.5)
+    await add_activity(supabase, "ráfaga 2", 1)
+    calls, result = await sync_all(supabase, limit=2)
+    assert calls == [["ráfaga 1", "ráfaga 2"]]
+    assert result["has_more"] is False
+
+    # Transacción que se hace visible después, con un updated_at anterior a la ráfaga
+    await add_activity(supabase, "tardía", 3)
+    calls, _ = await sync_all(supabase, result["cursor"], limit=2)
+    assert "tardía" in calls[0]
+
+async def test_settled_rows_are_not_sent_again(supabase):
+    await add_activity(supabase, "vieja", 60)
+    _, result = await sync_all(supabase)
+    calls, _ = await sync_all(supabase, result["cursor"])
+    assert calls == [[]]
+
+async def test_tombstones_for_deactivated_activities_and_deleted_rows(supabase, client):
+    activity_id = await create_activity(supabase, "Piano")
+    entry = await supabase.table("daily_entries").insert({"activity_id": activity_id, "entry_date": "2025-03-03", "value_amount": 1}).execute()
+    response = await client.get("/api/sync/")
+    assert [row["id"] for row in response.json()["changes"]["activities"]] == [activity_id]
+    cursor = response.json()["cursor"]
+
+    assert (await client.delete(f"/api/activities/{activity_id}")).status_code == 200
+    await supabase.table("daily_entries").delete().eq("id", entry.data[0]["id"]).execute()
+
+    body = (await client.get("/api/sync/", params={"since": cursor})).json()
+    assert body["changes"]["activities"] == []
+    tombstones = {(item["table"], item["id"]) for item in body["tombstones"]}
+    assert ("activities", activity_id) in tombstones
+    assert ("daily_entries", entry.data[0]["id"]) in tombstones
+    deactivated = next(item for item in body["tombstones"] if item["table"] == "activities")
+    assert deactivated["deleted_at"] is not None
+
+async def test_invalid_cursor_is_rejected(client):
+    assert (await client.get("/api/sync/", params={"since": "basura"})).status_code == 400
@@ -0,0 +1,68 @@
+-- ================================================
+-- AGREGADOS INCREMENTALES POR SEMANA Y MES
+-- ================================================
+-- Sustituyen a las vistas weekly_activity_summary y monthly_trends, que
+-- recorren todo daily_entries en cada lectura. Desde
+-- 20251204_rollup_triggers.sql la mantiene el trigger
+-- sync_daily_entries_rollups (apply_rollup_deltas, la función que usaba
+-- la API, se elimina allí) y backend/rebuild_rollups.py la reconstruye y
+-- verifica desde cero.
+
+CREATE TABLE IF NOT EXISTS activity_rollups (
+    activity_id UUID NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    period TEXT NOT NULL CHECK (period IN ('week', 'month')),
+    period_start DATE NOT NULL,
+    total_value DOUBLE PRECISION NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    days_active INTEGER NOT NULL DEFAULT 0, -- días con value_amount > 0
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (activity_id, period, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_rollups_period ON activity_rollups(period, period_start);
+
+-- Suma atómica de deltas: [{activity_id, period, period_start, total_value, entry_count, days_active}, ...]
+-- Cada clave debe aparecer una sola vez en p_deltas.
+CREATE OR REPLACE FUNCTION apply_rollup_deltas(p_deltas JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    INSERT INTO activity_rollups AS r (activity_id, period, period_start, total_value, entry_count, days_active)
+    SELECT
+        (d->>'activity_id')::UUID,
+        d->>'period',
+        (d->>'period_start')::DATE,
+        (d->>'total_value')::DOUBLE PRECISION,
+        (d->>'entry_count')::INTEGER,
+        (d->>'days_active')::INTEGER
+    FROM jsonb_array_elements(p_deltas) d
+    ON CONFLICT (activity_id, period, period_start) DO UPDATE SET
+        total_value = r.total_value + EXCLUDED.total_value,
+        entry_count = r.entry_count + EXCLUDED.entry_count,
+        days_active = r.days_active + EXCLUDED.days_active,
+        updated_at = CURRENT_TIMESTAMP;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial desde el historial existente
+INSERT INTO activity_rollups (activity_id, period, period_start, total_value, entry_count, days_active)
+SELECT activity_id, 'week', DATE_TRUNC('week', entry_date)::DATE,
+       SUM(value_amount), COUNT(*), COUNT(*) FILTER (WHERE value_amount > 0)
+FROM daily_entries
+GROUP BY activity_id, DATE_TRUNC('week', entry_date)
+ON CONFLICT (activity_id, period, period_start) DO NOTHING;
+
+INSERT INTO activity_rollups (activity_id, period, period_start, total_value, entry_count, days_active)
+SELECT activity_id, 'month', DATE_TRUNC('month', entry_date)::DATE,
+       SUM(value_amount), COUNT(*), COUNT(*) FILTER (WHERE value_amount > 0)
+FROM daily_entries
+GROUP BY activity_id, DATE_TRUNC('month', entry_date)
+ON CONFLICT (activity_id, period, period_start) DO NOTHING;
+
+ALTER TABLE activity_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all for activity_rollups" ON activity_rollups FOR ALL USING (true) WITH CHECK (true);
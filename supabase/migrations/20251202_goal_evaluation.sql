@@ -0,0 +1,28 @@
+-- ================================================
+-- EVALUACIÓN DE METAS FUERA DEL TRIGGER POR FILA
+-- ================================================
+-- check_goal_achievement() se ejecutaba por cada fila escrita en
+-- daily_entries, volvía a sumar la semana y comparaba weekly_goals.id con
+-- activity_id, así que nunca marcaba la meta correcta. Ahora la API evalúa
+-- en bloque los pares (actividad, semana) afectados por cada lote de
+-- escrituras (backend/app/services/goals.py) y crea los hitos 'goal'.
+
+DROP TRIGGER IF EXISTS check_goal_after_entry ON daily_entries;
+DROP FUNCTION IF EXISTS check_goal_achievement();
+
+-- Recalcular una vez el estado de todas las metas con la regla correcta
+UPDATE weekly_goals wg
+SET achieved = s.achieved,
+    achieved_at = CASE WHEN s.achieved THEN COALESCE(wg.achieved_at, CURRENT_TIMESTAMP) END
+FROM (
+    SELECT g.id,
+           g.target_value > 0 AND COALESCE(SUM(de.value_amount), 0) >= g.target_value AS achieved
+    FROM weekly_goals g
+    LEFT JOIN daily_entries de
+        ON de.activity_id = g.activity_id
+        AND de.entry_date >= g.week_start_date
+        AND de.entry_date < g.week_start_date + 7
+    GROUP BY g.id, g.target_value
+) s
+WHERE wg.id = s.id
+AND wg.achieved IS DISTINCT FROM s.achieved;
@@ -0,0 +1,68 @@
+-- ================================================
+-- SINCRONIZACIÓN INCREMENTAL (GET /api/sync)
+-- ================================================
+-- Los clientes piden solo las filas cambiadas desde su cursor, ordenadas
+-- por (updated_at, id). activity_goals no tenía updated_at ni trigger, y
+-- los borrados físicos no dejaban rastro: sync_deletions los registra para
+-- enviarlos como tombstones (las actividades se desactivan con is_active).
+
+-- updated_at en activity_goals
+ALTER TABLE activity_goals ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+UPDATE activity_goals SET updated_at = COALESCE(completed_at, created_at, CURRENT_TIMESTAMP);
+
+DROP TRIGGER IF EXISTS update_activity_goals_updated_at ON activity_goals;
+CREATE TRIGGER update_activity_goals_updated_at BEFORE UPDATE ON activity_goals
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Actividades desactivadas antes de que DELETE /api/activities rellenara deactivated_at
+UPDATE activities SET deactivated_at = updated_at WHERE is_active = false AND deactivated_at IS NULL;
+
+-- Índices para leer los cambios en orden de cursor
+CREATE INDEX IF NOT EXISTS idx_activities_sync ON activities(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_sync ON daily_entries(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_weekly_goals_sync ON weekly_goals(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_weekly_reflections_sync ON weekly_reflections(updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_activity_goals_sync ON activity_goals(updated_at, id);
+
+-- Registro de borrados físicos
+CREATE TABLE IF NOT EXISTS sync_deletions (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    row_id UUID NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP -- momento del borrado
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_deletions_sync ON sync_deletions(updated_at, id);
+
+CREATE OR REPLACE FUNCTION record_sync_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_deletions (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS record_activities_deletion ON activities;
+CREATE TRIGGER record_activities_deletion AFTER DELETE ON activities
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+DROP TRIGGER IF EXISTS record_daily_entries_deletion ON daily_entries;
+CREATE TRIGGER record_daily_entries_deletion AFTER DELETE ON daily_entries
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+DROP TRIGGER IF EXISTS record_weekly_goals_deletion ON weekly_goals;
+CREATE TRIGGER record_weekly_goals_deletion AFTER DELETE ON weekly_goals
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+DROP TRIGGER IF EXISTS record_weekly_reflections_deletion ON weekly_reflections;
+CREATE TRIGGER record_weekly_reflections_deletion AFTER DELETE ON weekly_reflections
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+DROP TRIGGER IF EXISTS record_activity_goals_deletion ON activity_goals;
+CREATE TRIGGER record_activity_goals_deletion AFTER DELETE ON activity_goals
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+ALTER TABLE sync_deletions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all for sync_deletions" ON sync_deletions FOR ALL USING (true) WITH CHECK (true);
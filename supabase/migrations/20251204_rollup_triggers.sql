@@ -0,0 +1,87 @@
+-- ================================================
+-- AGREGADOS MANTENIDOS POR TRIGGER
+-- ================================================
+-- activity_rollups se actualizaba desde la API: leía los valores anteriores
+-- de las entradas, escribía y luego llamaba a apply_rollup_deltas. Eran dos
+-- idas y vueltas más por escritura, no era atómico con el upsert y las
+-- escrituras directas (el cliente escribe daily_entries con supabase-js)
+-- dejaban los agregados desfasados. Ahora un trigger por fila resta la
+-- contribución de OLD y suma la de NEW en la misma transacción.
+
+-- Suma (o resta, con valores negativos) la contribución de una entrada
+-- a su semana y a su mes
+CREATE OR REPLACE FUNCTION add_entry_to_rollups(
+    p_activity_id UUID,
+    p_entry_date DATE,
+    p_value DOUBLE PRECISION,
+    p_count INTEGER,
+    p_active INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO activity_rollups AS r (activity_id, period, period_start, total_value, entry_count, days_active)
+    VALUES
+        (p_activity_id, 'week', DATE_TRUNC('week', p_entry_date)::DATE, p_value, p_count, p_active),
+        (p_activity_id, 'month', DATE_TRUNC('month', p_entry_date)::DATE, p_value, p_count, p_active)
+    ON CONFLICT (activity_id, period, period_start) DO UPDATE SET
+        total_value = r.total_value + EXCLUDED.total_value,
+        entry_count = r.entry_count + EXCLUDED.entry_count,
+        days_active = r.days_active + EXCLUDED.days_active,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_entry_rollups()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.activity_id = OLD.activity_id
+       AND NEW.entry_date = OLD.entry_date
+       AND NEW.value_amount = OLD.value_amount THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- Solo UPDATE: al borrar una actividad, ON DELETE CASCADE puede
+        -- haber eliminado ya sus agregados y no hay que recrearlos
+        UPDATE activity_rollups SET
+            total_value = total_value - OLD.value_amount,
+            entry_count = entry_count - 1,
+            days_active = days_active - (OLD.value_amount > 0)::INTEGER,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE activity_id = OLD.activity_id
+          AND ((period = 'week' AND period_start = DATE_TRUNC('week', OLD.entry_date)::DATE)
+            OR (period = 'month' AND period_start = DATE_TRUNC('month', OLD.entry_date)::DATE));
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM add_entry_to_rollups(NEW.activity_id, NEW.entry_date, NEW.value_amount, 1, (NEW.value_amount > 0)::INTEGER);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcular desde cero sin escrituras concurrentes entre la carga y el trigger
+LOCK TABLE daily_entries IN SHARE ROW EXCLUSIVE MODE;
+
+DELETE FROM activity_rollups;
+
+INSERT INTO activity_rollups (activity_id, period, period_start, total_value, entry_count, days_active)
+SELECT activity_id, 'week', DATE_TRUNC('week', entry_date)::DATE,
+       SUM(value_amount), COUNT(*), COUNT(*) FILTER (WHERE value_amount > 0)
+FROM daily_entries
+GROUP BY activity_id, DATE_TRUNC('week', entry_date);
+
+INSERT INTO activity_rollups (activity_id, period, period_start, total_value, entry_count, days_active)
+SELECT activity_id, 'month', DATE_TRUNC('month', entry_date)::DATE,
+       SUM(value_amount), COUNT(*), COUNT(*) FILTER (WHERE value_amount > 0)
+FROM daily_entries
+GROUP BY activity_id, DATE_TRUNC('month', entry_date);
+
+DROP TRIGGER IF EXISTS sync_daily_entries_rollups ON daily_entries;
+CREATE TRIGGER sync_daily_entries_rollups AFTER INSERT OR UPDATE OR DELETE ON daily_entries
+    FOR EACH ROW EXECUTE FUNCTION sync_entry_rollups();
+
+-- La API ya no aplica deltas
+DROP FUNCTION IF EXISTS apply_rollup_deltas(JSONB);